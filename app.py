@@ -4,19 +4,37 @@ import os
 import json
 import asyncio
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
-import requests
+from typing import Callable, Dict, List, Optional, Tuple
 import hmac
 import hashlib
 import time
 from collections import deque
+from contextlib import asynccontextmanager
 from enum import Enum
-from fastapi import FastAPI, HTTPException
+import httpx
+import numpy as np
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 import uvicorn
 import logging
+from candle_store import CandleStore
+from columnar import CandleArray
+from zones import Zone, ZoneIndex
+from streaming import StreamRegistry, SymbolState
+from market_feed import MarketFeed
+from scanner import SessionScanner
+from telegram_alert import get_queue
+from events import EventHub
+from journal import TradeJournal
+from timeframes import SECONDS, MultiTimeframe
+from coalesce import MISS, BarCache, SignalDeduper, SingleFlight, last_closed_bar
+from shared_state import SharedDeduper, SharedState, SharedTrades
+from risk import MANUAL, Position, RiskEngine
+from scheduler import LANES, LIVE, ORDERS, SCAN, RequestScheduler
+from execution import ExecutionQueue, OrderRejected, bracket_orders
+from metrics import ANALYSIS_SKIPPED, POSITIONS_CLOSED, REGISTRY, SCANNER_CACHE, SIGNALS_EMITTED, STAGE_LATENCY, UPSTREAM_REQUESTS
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -31,6 +49,10 @@ class SessionType(str, Enum):
     NEW_YORK = "NEW_YORK"
     CRYPTO_PRIME = "CRYPTO_PRIME"
 
+class OrderSide(str, Enum):
+    BUY = "buy"
+    SELL = "sell"
+
 class MarketBias(str, Enum):
     BULLISH = "BULLISH"
     BEARISH = "BEARISH"
@@ -40,12 +62,61 @@ class MarketBias(str, Enum):
 class Config:
     DELTA_API_KEY = os.getenv("DELTA_API_KEY", "")
     DELTA_API_SECRET = os.getenv("DELTA_API_SECRET", "")
+    DELTA_BASE_URL = os.getenv("DELTA_BASE_URL", "https://api.delta.exchange")
+    DELTA_MAX_CONNECTIONS = int(os.getenv("DELTA_MAX_CONNECTIONS", "20"))
+    DELTA_RATE_LIMIT = float(os.getenv("DELTA_RATE_LIMIT", "20"))
+    DELTA_RATE_BURST = float(os.getenv("DELTA_RATE_BURST", "40"))
+    DELTA_MAX_RETRIES = int(os.getenv("DELTA_MAX_RETRIES", "3"))
+    WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    WATCHLIST = [s.strip() for s in os.getenv("WATCHLIST", "BTCUSD,ETHUSD").split(",") if s.strip()]
+    SCAN_CONCURRENCY = int(os.getenv("SCAN_CONCURRENCY", "8"))
+    SCAN_TIMEOUT = float(os.getenv("SCAN_TIMEOUT", "15"))
+    BATCH_MAX_SYMBOLS = int(os.getenv("BATCH_MAX_SYMBOLS", "100"))
+    CANDLE_CACHE_SIZE = int(os.getenv("CANDLE_CACHE_SIZE", "500"))
+    CANDLE_CACHE_TTL = float(os.getenv("CANDLE_CACHE_TTL", "3600"))
+    CANDLE_CACHE_MAX_STALE = float(os.getenv("CANDLE_CACHE_MAX_STALE", "300"))
+    VECTORIZED_DETECTORS = os.getenv("VECTORIZED_DETECTORS", "true").lower() == "true"
+    USE_ZONE_INDEX = os.getenv("USE_ZONE_INDEX", "true").lower() == "true"
+    MARKET_FEED_ENABLED = os.getenv("MARKET_FEED_ENABLED", "false").lower() == "true"
+    DELTA_WS_URL = os.getenv("DELTA_WS_URL", "wss://socket.delta.exchange")
+    FEED_STALE_AFTER = float(os.getenv("FEED_STALE_AFTER", "30"))
+    SCANNER_ENABLED = os.getenv("SCANNER_ENABLED", "true").lower() == "true"
+    SCAN_INTERVAL_MINUTES = int(os.getenv("SCAN_INTERVAL_MINUTES", "60"))
     TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
     TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
+    TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
     TOTAL_CAPITAL = float(os.getenv("TOTAL_CAPITAL", "500"))
+    MTF_ENABLED = os.getenv("MTF_ENABLED", "false").lower() == "true"
+    MTF_BASE_RESOLUTION = os.getenv("MTF_BASE_RESOLUTION", "5")
+    MTF_ENTRY_RESOLUTION = os.getenv("MTF_ENTRY_RESOLUTION", "60")
+    MTF_BIAS_RESOLUTIONS = [r.strip() for r in os.getenv("MTF_BIAS_RESOLUTIONS", "240,D").split(",") if r.strip()]
+    MTF_BASE_BARS = int(os.getenv("MTF_BASE_BARS", "2000"))
+    MTF_BIAS_LENGTH = int(os.getenv("MTF_BIAS_LENGTH", "5"))
+    SIGNAL_DEDUP_TTL = float(os.getenv("SIGNAL_DEDUP_TTL", "86400"))
+    HISTORY_DIR = os.getenv("HISTORY_DIR", "history")
+    STATE_BACKEND = os.getenv("STATE_BACKEND", "memory").lower()
+    STATE_PATH = os.getenv("STATE_PATH", "state.db")
+    LEADER_LEASE_SECONDS = float(os.getenv("LEADER_LEASE_SECONDS", "30"))
+    JOURNAL_PATH = os.getenv("JOURNAL_PATH", "journal.db")
+    JOURNAL_SNAPSHOT_EVERY = int(os.getenv("JOURNAL_SNAPSHOT_EVERY", "500"))
+    JOURNAL_RETAIN_EVENTS = int(os.getenv("JOURNAL_RETAIN_EVENTS", "100000"))
+    EXECUTION_ENABLED = os.getenv("EXECUTION_ENABLED", "false").lower() == "true"
+    AUTO_EXECUTE = os.getenv("AUTO_EXECUTE", "false").lower() == "true"
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+    EXECUTION_WORKERS = int(os.getenv("EXECUTION_WORKERS", "4"))
+    ORDER_TIMEOUT = float(os.getenv("ORDER_TIMEOUT", "10"))
+    # Base-asset quantity of one contract per symbol; positions are sized in whole contracts
+    CONTRACT_VALUES = {
+        symbol.strip(): float(value)
+        for symbol, value in (
+            item.split(":") for item in os.getenv("CONTRACT_VALUES", "BTCUSD:0.001,ETHUSD:0.01").split(",") if item.strip()
+        )
+    }
     FUTURES_LEVERAGE = 10
     MAX_RISK_PER_TRADE = 0.02
     MIN_RISK_REWARD = 2.0
+    MIN_DISPLACEMENT = 0.01
+    MIN_FVG_SIZE = 0.002
     DAILY_LOSS_LIMIT = 0.05
 
 # MODELS
@@ -59,8 +130,25 @@ class FuturesSignal(BaseModel):
     leverage: int
     session: SessionType
     reasons: List[str]
+    size: Optional[float] = None
     timestamp: datetime = Field(default_factory=datetime.now)
 
+class BatchAnalyzeRequest(BaseModel):
+    # Every symbol is an upstream fetch: one request cannot queue an unbounded number of them
+    symbols: List[str] = Field(default_factory=lambda: list(Config.WATCHLIST), max_length=Config.BATCH_MAX_SYMBOLS)
+    concurrency: Optional[int] = Field(default=None, ge=1, le=100)
+    timeout: Optional[float] = Field(default=None, gt=0, le=60)
+
+class WebhookOrder(BaseModel):
+    product_id: Optional[int] = None
+    product_symbol: Optional[str] = None
+    size: int = Field(gt=0)
+    side: OrderSide
+    entry: Optional[float] = Field(default=None, ge=0)
+    stop: Optional[float] = Field(default=None, ge=0)
+    target: Optional[float] = Field(default=None, ge=0)
+    tick_time: Optional[float] = None
+
 class OrderBlock(BaseModel):
     price_high: float
     price_low: float
@@ -82,9 +170,13 @@ class ClaudeAIBrain:
         self.trade_history = deque(maxlen=100)
         self.consecutive_losses = 0
         self.dynamic_multiplier = 1.0
+        self.total_pnl = 0.0
 
-    def record_trade(self, was_profitable: bool, session: str):
+    def record_trade(self, was_profitable: bool, session: str, pnl: Optional[float] = None):
         self.total_trades += 1
+        if pnl is not None:
+            self.total_pnl += pnl
+        self.trade_history.append({"session": session, "profitable": was_profitable, "pnl": pnl})
         if was_profitable:
             self.profitable_trades += 1
             self.consecutive_losses = 0
@@ -106,12 +198,62 @@ class ClaudeAIBrain:
             return False, "4+ losses - Paused"
         return True, "All systems go"
 
+    def state(self) -> Dict:
+        return {
+            "total_trades": self.total_trades,
+            "profitable_trades": self.profitable_trades,
+            "success_rate": self.success_rate,
+            "trade_history": list(self.trade_history),
+            "consecutive_losses": self.consecutive_losses,
+            "dynamic_multiplier": self.dynamic_multiplier,
+            "total_pnl": self.total_pnl
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "ClaudeAIBrain":
+        brain = cls()
+        brain.total_trades = state["total_trades"]
+        brain.profitable_trades = state["profitable_trades"]
+        brain.success_rate = state["success_rate"]
+        brain.trade_history.extend(state["trade_history"])
+        brain.consecutive_losses = state["consecutive_losses"]
+        brain.dynamic_multiplier = state["dynamic_multiplier"]
+        brain.total_pnl = state.get("total_pnl", 0.0)
+        return brain
+
+class SharedBrain(ClaudeAIBrain):
+    """ClaudeAIBrain whose counters live in SharedState, so every worker sees one win rate and pause state."""
+    KEY = "brain"
+
+    def __init__(self, store: SharedState):
+        self.store = store
+
+    def _state(self) -> Dict:
+        return self.store.get(self.KEY) or ClaudeAIBrain().state()
+
+    total_trades = property(lambda self: self._state()["total_trades"])
+    profitable_trades = property(lambda self: self._state()["profitable_trades"])
+    success_rate = property(lambda self: self._state()["success_rate"])
+    trade_history = property(lambda self: self._state()["trade_history"])
+    consecutive_losses = property(lambda self: self._state()["consecutive_losses"])
+    dynamic_multiplier = property(lambda self: self._state()["dynamic_multiplier"])
+    total_pnl = property(lambda self: self._state().get("total_pnl", 0.0))
+
+    def record_trade(self, was_profitable: bool, session: str, pnl: Optional[float] = None):
+        def apply(state: Optional[Dict]) -> Dict:
+            brain = ClaudeAIBrain.from_state(state) if state else ClaudeAIBrain()
+            brain.record_trade(was_profitable, session, pnl)
+            return brain.state()
+        self.store.update(self.KEY, apply)
+
 # ICT DETECTOR
 class ICTDetector:
     def __init__(self):
         pass
 
     def detect_order_block(self, candles: List[Dict]) -> Optional[OrderBlock]:
+        if isinstance(candles, CandleArray):
+            return self._detect_order_block_np(candles)
         if len(candles) < 20:
             return None
         for i in range(len(candles) - 5, max(0, len(candles) - 20), -1):
@@ -120,7 +262,7 @@ class ICTDetector:
                 next_c = candles[i + 1]
                 if next_c["close"] > next_c["open"]:
                     displacement = (next_c["close"] - next_c["open"]) / next_c["open"]
-                    if displacement > 0.01:
+                    if displacement > Config.MIN_DISPLACEMENT:
                         return OrderBlock(
                             price_high=candle["high"],
                             price_low=candle["low"],
@@ -130,6 +272,8 @@ class ICTDetector:
         return None
 
     def detect_fvg(self, candles: List[Dict]) -> Optional[FairValueGap]:
+        if isinstance(candles, CandleArray):
+            return self._detect_fvg_np(candles)
         if len(candles) < 3:
             return None
         for i in range(len(candles) - 1, max(2, len(candles) - 10), -1):
@@ -137,7 +281,7 @@ class ICTDetector:
             gap_top = candles[i]["low"]
             if gap_top > gap_bottom:
                 gap_size = (gap_top - gap_bottom) / gap_bottom
-                if gap_size > 0.002:
+                if gap_size > Config.MIN_FVG_SIZE:
                     return FairValueGap(
                         top=gap_top,
                         bottom=gap_bottom,
@@ -146,40 +290,237 @@ class ICTDetector:
                     )
         return None
 
+    def detect_zones(
+        self,
+        candles: CandleArray,
+        price: float
+    ) -> Tuple[Optional[OrderBlock], Optional[FairValueGap]]:
+        # Most recent live order block containing price, plus the nearest live FVG in its direction
+        zones = ZoneIndex.build(candles, Config.MIN_DISPLACEMENT, Config.MIN_FVG_SIZE)
+        return self.zone_models(*zones.entry(price))
+
+    @staticmethod
+    def zone_models(zone: Optional[Zone], gap: Optional[Zone]) -> Tuple[Optional[OrderBlock], Optional[FairValueGap]]:
+        if zone is None:
+            return None, None
+        ob = OrderBlock(
+            price_high=zone.top,
+            price_low=zone.bottom,
+            bias=MarketBias(zone.bias),
+            strength=min(zone.size * 10, 1.0)
+        )
+        fvg = None
+        if gap:
+            fvg = FairValueGap(
+                top=gap.top,
+                bottom=gap.bottom,
+                bias=MarketBias(gap.bias),
+                size_percentage=gap.size * 100
+            )
+        return ob, fvg
+
+    # Vectorized equivalents: same windows, same "most recent match wins" rule
+    def _detect_order_block_np(self, candles: CandleArray) -> Optional[OrderBlock]:
+        n = len(candles)
+        if n < 20:
+            return None
+        idx = np.arange(max(0, n - 20) + 1, n - 4)
+        o, c = candles.open, candles.close
+        displacement = (c[idx + 1] - o[idx + 1]) / o[idx + 1]
+        hits = np.flatnonzero((c[idx] < o[idx]) & (c[idx + 1] > o[idx + 1]) & (displacement > Config.MIN_DISPLACEMENT))
+        if hits.size == 0:
+            return None
+        i = idx[hits[-1]]
+        d = float(displacement[hits[-1]])
+        return OrderBlock(
+            price_high=float(candles.high[i]),
+            price_low=float(candles.low[i]),
+            bias=MarketBias.BULLISH,
+            strength=min(d * 10, 1.0)
+        )
+
+    def _detect_fvg_np(self, candles: CandleArray) -> Optional[FairValueGap]:
+        n = len(candles)
+        if n < 3:
+            return None
+        idx = np.arange(max(2, n - 10) + 1, n)
+        gap_bottom = candles.high[idx - 2]
+        gap_top = candles.low[idx]
+        gap_size = (gap_top - gap_bottom) / gap_bottom
+        hits = np.flatnonzero((gap_top > gap_bottom) & (gap_size > Config.MIN_FVG_SIZE))
+        if hits.size == 0:
+            return None
+        j = hits[-1]
+        return FairValueGap(
+            top=float(gap_top[j]),
+            bottom=float(gap_bottom[j]),
+            bias=MarketBias.BULLISH,
+            size_percentage=float(gap_size[j]) * 100
+        )
+
 # DELTA CLIENT
-class DeltaClient:
+class AsyncDeltaClient:
+    """Non-blocking Delta client; one pooled keep-alive connection set per process."""
     BASE_URL = "https://api.delta.exchange"
-    def __init__(self, api_key: str, api_secret: str):
+    def __init__(
+        self,
+        api_key: str,
+        api_secret: str,
+        base_url: Optional[str] = None,
+        timeout: float = 10.0,
+        max_connections: int = 20,
+        scheduler: Optional[RequestScheduler] = None
+    ):
         self.api_key = api_key
         self.api_secret = api_secret
+        self.base_url = base_url or self.BASE_URL
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.scheduler = scheduler or RequestScheduler()
+        self._client: Optional[httpx.AsyncClient] = None
 
-    def get_candles(self, symbol: str, resolution: str = "60", limit: int = 100) -> List[Dict]:
-        endpoint = f"/v2/history/candles"
-        params = {"symbol": symbol, "resolution": resolution, "limit": limit}
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so the pool binds to the running event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self._client
+
+    async def get_candles(
+        self,
+        symbol: str,
+        resolution: str = "60",
+        limit: int = 100,
+        start: Optional[int] = None,
+        end: Optional[int] = None
+    ) -> List[Dict]:
         try:
-            response = requests.get(f"{self.BASE_URL}{endpoint}", params=params, timeout=10)
-            if response.status_code == 200:
-                return response.json().get("result", [])
+            return await self.fetch_candles(symbol, resolution, limit, start, end)
         except Exception as e:
             logger.error(f"Error fetching candles: {e}")
         return []
 
-    def get_ticker(self, symbol: str) -> Optional[Dict]:
-        endpoint = f"/v2/tickers/{symbol}"
+    async def fetch_candles(
+        self,
+        symbol: str,
+        resolution: str = "60",
+        limit: int = 100,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        lane: str = SCAN
+    ) -> List[Dict]:
+        """Like get_candles but raises, so bulk downloads can tell an empty range from a failed one."""
+        params = {"symbol": symbol, "resolution": resolution, "limit": limit}
+        if start is not None:
+            params["start"] = start
+        if end is not None:
+            params["end"] = end
         try:
-            response = requests.get(f"{self.BASE_URL}{endpoint}", timeout=10)
+            response = await self.scheduler.send(lane, lambda: self.client.get("/v2/history/candles", params=params))
+        except httpx.HTTPError:
+            UPSTREAM_REQUESTS.inc("delta", "candles", "error")
+            raise
+        UPSTREAM_REQUESTS.inc("delta", "candles", str(response.status_code))
+        response.raise_for_status()
+        return response.json().get("result", [])
+
+    async def get_ticker(self, symbol: str) -> Optional[Dict]:
+        try:
+            response = await self.scheduler.send(LIVE, lambda: self.client.get(f"/v2/tickers/{symbol}"))
+            UPSTREAM_REQUESTS.inc("delta", "ticker", str(response.status_code))
             if response.status_code == 200:
                 return response.json().get("result", {})
         except Exception as e:
+            UPSTREAM_REQUESTS.inc("delta", "ticker", "error")
             logger.error(f"Error fetching ticker: {e}")
         return None
 
+    async def get_snapshot(
+        self,
+        symbol: str,
+        resolution: str = "60",
+        limit: int = 100
+    ) -> Tuple[List[Dict], Optional[Dict]]:
+        candles, ticker = await asyncio.gather(
+            self.get_candles(symbol, resolution, limit),
+            self.get_ticker(symbol)
+        )
+        return candles, ticker
+
+    def sign(self, method: str, path: str, query: str = "", body: str = "") -> Dict[str, str]:
+        # Delta auth: hex HMAC-SHA256 of method + timestamp + path + query string + body
+        timestamp = str(int(time.time()))
+        message = method + timestamp + path + query + body
+        return {
+            "api-key": self.api_key,
+            "timestamp": timestamp,
+            "signature": hmac.new(self.api_secret.encode(), message.encode(), hashlib.sha256).hexdigest(),
+            "Content-Type": "application/json",
+            "User-Agent": "python-rest-client"
+        }
+
+    @staticmethod
+    def order_result(response) -> Dict:
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {}
+        if response.status_code == 200 and payload.get("success", True):
+            return payload.get("result", {})
+        raise OrderRejected(f"{response.status_code}: {payload.get('error') or response.text}")
+
+    async def place_order(self, order: Dict) -> Dict:
+        body = json.dumps(order, separators=(",", ":"))
+        try:
+            response = await self.scheduler.send(ORDERS, lambda: self.client.post(
+                "/v2/orders", content=body, headers=self.sign("POST", "/v2/orders", body=body)
+            ))
+        except httpx.HTTPError:
+            UPSTREAM_REQUESTS.inc("delta", "order", "error")
+            raise
+        UPSTREAM_REQUESTS.inc("delta", "order", str(response.status_code))
+        return self.order_result(response)
+
+    async def cancel_order(
+        self,
+        order_id: int,
+        product_id: Optional[int] = None,
+        product_symbol: Optional[str] = None
+    ) -> Dict:
+        payload = {"id": order_id}
+        if product_id is not None:
+            payload["product_id"] = product_id
+        else:
+            payload["product_symbol"] = product_symbol
+        body = json.dumps(payload, separators=(",", ":"))
+        try:
+            response = await self.scheduler.send(ORDERS, lambda: self.client.request(
+                "DELETE", "/v2/orders", content=body, headers=self.sign("DELETE", "/v2/orders", body=body)
+            ))
+        except httpx.HTTPError:
+            UPSTREAM_REQUESTS.inc("delta", "cancel", "error")
+            raise
+        UPSTREAM_REQUESTS.inc("delta", "cancel", str(response.status_code))
+        return self.order_result(response)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
 # TELEGRAM
 class TelegramNotifier:
-    def __init__(self, bot_token: str, chat_id: str):
+    def __init__(self, bot_token: str, chat_id: str, base_url: str = "https://api.telegram.org"):
         self.bot_token = bot_token
         self.chat_id = chat_id
-        self.base_url = f"https://api.telegram.org/bot{bot_token}"
+        self.queue = get_queue(bot_token, base_url)
 
     def send_signal(self, signal: FuturesSignal):
         message = f"""
@@ -200,15 +541,16 @@ Reasons:
             message += f"\n✓ {reason}"
         self._send(message)
 
+    def send_alert(self, text: str):
+        self._send(text)
+
     def _send(self, text: str):
-        try:
-            requests.post(
-                f"{self.base_url}/sendMessage",
-                json={"chat_id": self.chat_id, "text": text},
-                timeout=5
-            )
-        except:
-            pass
+        # Queued for the background worker; the request path never waits on Telegram
+        if not self.bot_token or not self.chat_id:
+            logger.warning("Telegram not configured, alert not sent")
+            return
+        with STAGE_LATENCY.time("telegram_enqueue"):
+            self.queue.submit(self.chat_id, text)
 
 # TRADING ENGINE
 class TradingEngine:
@@ -216,34 +558,322 @@ class TradingEngine:
         self.config = Config()
         self.ai_brain = ClaudeAIBrain()
         self.ict_detector = ICTDetector()
-        self.delta_client = DeltaClient(self.config.DELTA_API_KEY, self.config.DELTA_API_SECRET)
-        self.telegram = TelegramNotifier(self.config.TELEGRAM_BOT_TOKEN, self.config.TELEGRAM_CHAT_ID)
+        # The exchange limits the account, and every uvicorn worker runs its own bucket: each gets a share
+        self.scheduler = RequestScheduler(
+            rate=self.config.DELTA_RATE_LIMIT / self.config.WEB_CONCURRENCY,
+            burst=max(1.0, self.config.DELTA_RATE_BURST / self.config.WEB_CONCURRENCY),
+            max_retries=self.config.DELTA_MAX_RETRIES
+        )
+        self.async_delta_client = AsyncDeltaClient(
+            self.config.DELTA_API_KEY,
+            self.config.DELTA_API_SECRET,
+            base_url=self.config.DELTA_BASE_URL,
+            max_connections=self.config.DELTA_MAX_CONNECTIONS,
+            scheduler=self.scheduler
+        )
+        self.candle_store = CandleStore(
+            self.async_delta_client,
+            capacity=max(self.config.CANDLE_CACHE_SIZE, self.config.MTF_BASE_BARS if self.config.MTF_ENABLED else 0),
+            idle_ttl=self.config.CANDLE_CACHE_TTL,
+            max_stale=self.config.CANDLE_CACHE_MAX_STALE
+        )
+        self.timeframes = MultiTimeframe(
+            self.config.MTF_BASE_RESOLUTION,
+            [self.config.MTF_ENTRY_RESOLUTION] + self.config.MTF_BIAS_RESOLUTIONS,
+            bias_length=self.config.MTF_BIAS_LENGTH
+        )
+        self.inflight = SingleFlight()
+        self.entry_resolution = self.config.MTF_ENTRY_RESOLUTION if self.config.MTF_ENABLED else "60"
+        self.results = BarCache(SECONDS[self.entry_resolution])
+        self.deduper = SignalDeduper(self.config.SIGNAL_DEDUP_TTL)
+        self.risk = RiskEngine(
+            self.config.TOTAL_CAPITAL,
+            max_risk_per_trade=self.config.MAX_RISK_PER_TRADE,
+            daily_loss_limit=self.config.DAILY_LOSS_LIMIT,
+            leverage=self.config.FUTURES_LEVERAGE,
+            lots=self.config.CONTRACT_VALUES
+        )
+        # Zone state per symbol at the entry resolution, advanced by closed bars instead of rebuilt
+        self.streams = StreamRegistry(
+            period=SECONDS[self.entry_resolution],
+            min_displacement=self.config.MIN_DISPLACEMENT,
+            min_gap=self.config.MIN_FVG_SIZE
+        )
+        self._tick_zones: Dict[str, Tuple] = {}
+        self.on_signal: Optional[Callable[[FuturesSignal], None]] = None
+        self.market_feed = MarketFeed(
+            self.config.DELTA_WS_URL,
+            self.config.WATCHLIST,
+            self.candle_store,
+            resolution=self.entry_resolution,
+            stale_after=self.config.FEED_STALE_AFTER,
+            on_bar_close=self.on_bar,
+            on_ticker=self.on_ticker
+        )
+        self.telegram = TelegramNotifier(
+            self.config.TELEGRAM_BOT_TOKEN,
+            self.config.TELEGRAM_CHAT_ID,
+            base_url=self.config.TELEGRAM_API_URL
+        )
+
+    def on_bar(self, symbol: str, candle: Dict):
+        self.streams.on_bar(symbol, candle)
+
+    def on_ticker(self, symbol: str, ticker: Dict):
+        self.risk.mark(symbol, self.ticker_price(ticker))
+        signal = self.on_tick(symbol, float(ticker.get("close") or 0), self.market_feed.forming(symbol))
+        if signal is not None and self.on_signal is not None:
+            self.on_signal(signal)
+
+    @staticmethod
+    def ticker_price(ticker: Dict) -> float:
+        # Open positions are valued at the mark price, as the exchange does for liquidation
+        return float(ticker.get("mark_price") or ticker.get("close") or 0)
+
+    def on_tick(self, symbol: str, price: float, forming: Optional[Dict] = None) -> Optional[FuturesSignal]:
+        # Constant-time evaluation from streamed state, no candle window rescan
+        state = self.streams.states.get(symbol)
+        if state is None or not state.count or price <= 0 or symbol in self.risk.positions:
+            return None
+        if self.config.USE_ZONE_INDEX:
+            ob, fvg = self.ict_detector.zone_models(*state.entry(price, forming))
+        else:
+            tick = state.on_tick(price)
+            ob = OrderBlock(**tick["order_block"]) if tick["order_block"] else None
+            fvg = FairValueGap(**tick["fvg"]) if tick["fvg"] else None
+        if ob is None or not ob.price_low <= price <= ob.price_high:
+            return None
+        # A zone signals once from ticks; the deduper would drop the repeats anyway, at a cost per tick
+        zone = (ob.bias, ob.price_low, ob.price_high)
+        if self._tick_zones.get(symbol) == zone:
+            return None
+        # Gated quietly: _can_analyze logs and counts, once per tick would flood both
+        if not self.ai_brain.should_trade()[0] or not self._is_valid_session():
+            return None
+        signal = self._signal(symbol, price, ob, fvg, self.htf_bias(symbol))
+        if signal is not None:
+            self._tick_zones[symbol] = zone
+        return signal
+
+    def sync_stream(self, symbol: str, candles) -> Tuple[SymbolState, Optional[Dict]]:
+        """Advance the symbol's streamed state to the last closed bar of candles; also returns the forming bar."""
+        return self.streams.sync(symbol, candles, last_closed_bar(candles, self.streams.period))
+
+    async def seed_streams(self, symbols: List[str]):
+        # Ticks are evaluated against streamed state only: build it from stored history at startup
+        limiter = asyncio.Semaphore(self.config.SCAN_CONCURRENCY)
+
+        async def seed(symbol: str):
+            async with limiter:
+                try:
+                    candles, _ = await self._fetch_market(symbol)
+                except Exception as e:
+                    logger.error(f"Could not seed streamed state for {symbol}: {e}")
+                    return
+                if len(candles):
+                    self.sync_stream(symbol, candles)
+
+        await asyncio.gather(*(seed(symbol) for symbol in symbols))
+
+    async def analyze_async(self, symbol: str) -> Optional[FuturesSignal]:
+        if not self._can_analyze():
+            return None
+        return (await self._analyze_shared(symbol))["signal"]
+
+    async def _analyze_shared(self, symbol: str) -> Dict:
+        # Reused until the next bar closes; concurrent misses for a symbol share one computation
+        cached = self.results.get(symbol)
+        if cached is not MISS:
+            return dict(cached, cached=True)
+        return await self.inflight.run(symbol, self._analyze_fresh, symbol)
+
+    async def _analyze_fresh(self, symbol: str) -> Dict:
+        started = time.perf_counter()
+        candles, ticker = await self._fetch_market(symbol)
+        fetched = time.perf_counter()
+        signal = self._evaluate(symbol, candles, ticker, self.htf_bias(symbol))
+        result = {
+            "signal": signal,
+            "fetch_ms": round((fetched - started) * 1000, 3),
+            "detect_ms": round((time.perf_counter() - fetched) * 1000, 3)
+        }
+        if ticker:
+            self.risk.mark(symbol, self.ticker_price(ticker))
+            self.results.put(symbol, last_closed_bar(candles, self.results.period), result)
+        return result
+
+    @staticmethod
+    def setup_key(signal: FuturesSignal) -> Tuple:
+        # Same zone gives the same stop; entry drifts with price, so it is not part of the key
+        return signal.symbol, signal.trade_type.value, round(signal.stop_loss, 8)
 
-    def analyze(self, symbol: str) -> Optional[FuturesSignal]:
+    async def _fetch_market(self, symbol: str) -> Tuple[List[Dict], Optional[Dict]]:
+        if self.config.MTF_ENABLED:
+            return await self._fetch_timeframes(symbol)
+        # Streamed state first; REST only when the feed is off, stale or not yet seeded
+        if self.market_feed.connected:
+            ticker = self.market_feed.ticker(symbol)
+            candles = self.candle_store.peek(symbol) if ticker else []
+            if candles:
+                return candles, ticker
+        candles, ticker = await asyncio.gather(
+            self._timed("candles", self.candle_store.get_candles(symbol)),
+            self._timed("ticker", self.async_delta_client.get_ticker(symbol))
+        )
+        return candles, ticker
+
+    async def _fetch_timeframes(self, symbol: str) -> Tuple[CandleArray, Optional[Dict]]:
+        # One base series per symbol; entry and bias timeframes are resampled from it locally
+        ticker = self.market_feed.ticker(symbol) if self.market_feed.connected else None
+        base_request = self._timed(
+            "candles",
+            self.candle_store.get_candles(symbol, self.config.MTF_BASE_RESOLUTION, self.config.MTF_BASE_BARS)
+        )
+        if ticker:
+            base = await base_request
+        else:
+            base, ticker = await asyncio.gather(
+                base_request,
+                self._timed("ticker", self.async_delta_client.get_ticker(symbol))
+            )
+        if not base:
+            return [], ticker
+        with STAGE_LATENCY.time("resample"):
+            frames = self.timeframes.update(symbol, base)
+        entry = frames[self.config.MTF_ENTRY_RESOLUTION]
+        return entry[max(0, len(entry) - 100):], ticker
+
+    def htf_bias(self, symbol: str) -> Optional[MarketBias]:
+        """Agreed bias of every MTF_BIAS_RESOLUTIONS timeframe, NEUTRAL if they differ; None when MTF is off."""
+        if not self.config.MTF_ENABLED:
+            return None
+        biases = {self.timeframes.bias(symbol, r) for r in self.config.MTF_BIAS_RESOLUTIONS}
+        if len(biases) == 1 and None not in biases:
+            return MarketBias(biases.pop())
+        return MarketBias.NEUTRAL
+
+    @staticmethod
+    async def _timed(stage: str, coro):
+        started = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            STAGE_LATENCY.observe(stage, value=time.perf_counter() - started)
+
+    async def analyze_many(
+        self,
+        symbols: List[str],
+        concurrency: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> List[Dict]:
+        limiter = asyncio.Semaphore(concurrency or self.config.SCAN_CONCURRENCY)
+        timeout = timeout or self.config.SCAN_TIMEOUT
+
+        async def run(symbol: str) -> Dict:
+            async with limiter:
+                return await self._analyze_timed(symbol, timeout)
+
+        unique = list(dict.fromkeys(symbols))
+        return await asyncio.gather(*(run(symbol) for symbol in unique))
+
+    async def _analyze_timed(self, symbol: str, timeout: float) -> Dict:
+        # Never raises: one bad symbol is reported, not propagated to the batch
+        result = {"symbol": symbol, "status": "no_signal", "signal": None}
+        started = time.perf_counter()
+        try:
+            if not self._can_analyze():
+                result["status"] = "skipped"
+            else:
+                shared = await asyncio.wait_for(self._analyze_shared(symbol), timeout)
+                signal = shared["signal"]
+                result["fetch_ms"] = shared["fetch_ms"]
+                result["detect_ms"] = shared["detect_ms"]
+                result["cached"] = shared.get("cached", False)
+                if signal:
+                    result["status"] = "signal"
+                    result["signal"] = signal
+        except asyncio.TimeoutError:
+            result["status"] = "timeout"
+        except Exception as e:
+            logger.error(f"Error analyzing {symbol}: {e}")
+            result["status"] = "error"
+            result["error"] = str(e)
+        result["total_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+    def _can_analyze(self) -> bool:
         can_trade, msg = self.ai_brain.should_trade()
         if not can_trade:
             logger.warning(f"Trading paused: {msg}")
-            return None
+            ANALYSIS_SKIPPED.inc("paused")
+            return False
         if not self._is_valid_session():
-            return None
-        candles = self.delta_client.get_candles(symbol)
-        if not candles:
-            return None
-        ticker = self.delta_client.get_ticker(symbol)
-        if not ticker:
+            ANALYSIS_SKIPPED.inc("out_of_session")
+            return False
+        return True
+
+    def _evaluate(
+        self,
+        symbol: str,
+        candles: List[Dict],
+        ticker: Optional[Dict],
+        bias: Optional[MarketBias] = None
+    ) -> Optional[FuturesSignal]:
+        if not len(candles) or not ticker:
+            ANALYSIS_SKIPPED.inc("no_candles" if not len(candles) else "no_ticker")
             return None
         current_price = float(ticker.get("close", 0))
-        order_block = self.ict_detector.detect_order_block(candles)
-        fvg = self.ict_detector.detect_fvg(candles)
-        return self._generate_signal(symbol, current_price, order_block, fvg)
+        if self.config.USE_ZONE_INDEX:
+            # Same state the ticks read: only bars it has not seen yet are processed
+            with STAGE_LATENCY.time("zones"):
+                state, forming = self.sync_stream(symbol, candles)
+                order_block, fvg = self.ict_detector.zone_models(*state.entry(current_price, forming))
+            return self._signal(symbol, current_price, order_block, fvg, bias)
+        if self.config.VECTORIZED_DETECTORS and not isinstance(candles, CandleArray):
+            candles = CandleArray.from_candles(candles)
+        with STAGE_LATENCY.time("order_block"):
+            order_block = self.ict_detector.detect_order_block(candles)
+        with STAGE_LATENCY.time("fvg"):
+            fvg = self.ict_detector.detect_fvg(candles)
+        return self._signal(symbol, current_price, order_block, fvg, bias)
+
+    def _signal(
+        self,
+        symbol: str,
+        price: float,
+        ob: Optional[OrderBlock],
+        fvg: Optional[FairValueGap],
+        bias: Optional[MarketBias] = None
+    ) -> Optional[FuturesSignal]:
+        # Higher-timeframe filter: the entry zone must point the way the HTF bias does
+        if bias is not None and ob is not None and ob.bias != bias:
+            ANALYSIS_SKIPPED.inc("htf_disagree")
+            return None
+        with STAGE_LATENCY.time("signal"):
+            signal = self._generate_signal(symbol, price, ob, fvg)
+        if signal:
+            size, reason = self.risk.size(symbol, signal.entry_price, signal.stop_loss)
+            if size is None:
+                self.risk.reject(reason)
+                ANALYSIS_SKIPPED.inc(f"risk_{reason}")
+                return None
+            signal.size = size
+            SIGNALS_EMITTED.inc(signal.trade_type.value)
+        return signal
 
     def _is_valid_session(self) -> bool:
-        now = datetime.now()
-        hour = now.hour
+        return self.current_session() is not None
+
+    def current_session(self) -> Optional[SessionType]:
+        hour = datetime.now().hour
         # Tokyo: 5:30-13:30, NY: 19:00-01:00, Crypto Prime: 15:30-18:30
-        if (5 <= hour < 13) or (15 <= hour < 18) or (hour >= 19) or (hour <= 1):
-            return True
-        return False
+        if 5 <= hour < 13:
+            return SessionType.TOKYO
+        if 15 <= hour < 18:
+            return SessionType.CRYPTO_PRIME
+        if hour >= 19 or hour <= 1:
+            return SessionType.NEW_YORK
+        return None
 
     def _generate_signal(
         self,
@@ -277,10 +907,78 @@ class TradingEngine:
                         session=SessionType.CRYPTO_PRIME,
                         reasons=reasons
                     )
+        elif ob and ob.bias == MarketBias.BEARISH:
+            if ob.price_low <= price <= ob.price_high:
+                reasons.append("📦 Bearish Order Block")
+                confidence += 0.25
+                if fvg and fvg.bias == MarketBias.BEARISH and fvg.top < price:
+                    reasons.append("⬇️ FVG Target Below")
+                    confidence += 0.25
+                    target = fvg.top
+                else:
+                    risk = ob.price_high - price
+                    target = price - (risk * Config.MIN_RISK_REWARD)
+                if confidence > 0.65:
+                    return FuturesSignal(
+                        symbol=symbol,
+                        trade_type=TradeType.FUTURES_SHORT,
+                        entry_price=price,
+                        stop_loss=ob.price_high * 1.002,
+                        target_price=target,
+                        confidence=confidence,
+                        leverage=Config.FUTURES_LEVERAGE,
+                        session=SessionType.CRYPTO_PRIME,
+                        reasons=reasons
+                    )
         return None
 
 # FASTAPI APP
-app = FastAPI(title="ICT+SMC+Claude Futures Trading")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if shared_state is None and Config.WEB_CONCURRENCY > 1:
+        # Each worker would keep its own trades, dedup and loss ledger: alerts repeat and risk limits multiply
+        raise RuntimeError("WEB_CONCURRENCY > 1 needs STATE_BACKEND=sqlite; in-memory state is per worker")
+    if shared_state is None:
+        restore_state(journal.replay())
+    else:
+        trading_engine.risk.sync(active_trades.items())
+    journal.start()
+    seeding = None
+    if Config.MARKET_FEED_ENABLED:
+        seeding = asyncio.create_task(trading_engine.seed_streams(Config.WATCHLIST))
+        trading_engine.market_feed.start()
+    trading_engine.telegram.queue.start()
+    if Config.EXECUTION_ENABLED:
+        if not Config.WEBHOOK_SECRET:
+            logger.error("EXECUTION_ENABLED without WEBHOOK_SECRET: /webhook will refuse every order")
+        execution.start()
+    leadership = None
+    if Config.SCANNER_ENABLED:
+        if shared_state is None:
+            scanner.start()
+        else:
+            leadership = asyncio.create_task(lead_scanner())
+    session_watcher = asyncio.create_task(watch_session())
+    position_sync = asyncio.create_task(sync_positions()) if shared_state is not None else None
+    yield
+    if seeding is not None:
+        seeding.cancel()
+    session_watcher.cancel()
+    if position_sync is not None:
+        position_sync.cancel()
+    if leadership is not None:
+        leadership.cancel()
+        await asyncio.gather(leadership, return_exceptions=True)
+    await scanner.stop()
+    if shared_state is not None:
+        shared_state.release("scanner")
+    await trading_engine.telegram.queue.stop()
+    await execution.stop()
+    await trading_engine.market_feed.stop()
+    await trading_engine.async_delta_client.aclose()
+    await asyncio.to_thread(journal.stop)
+
+app = FastAPI(title="ICT+SMC+Claude Futures Trading", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -290,151 +988,139 @@ app.add_middleware(
 
 trading_engine = TradingEngine()
 active_trades = {}
+shared_state = None
+if Config.STATE_BACKEND == "sqlite":
+    # Every worker opens the same file: trades, brain counters and alert dedup are shared
+    shared_state = SharedState(Config.STATE_PATH)
+    active_trades = SharedTrades(shared_state)
+    trading_engine.ai_brain = SharedBrain(shared_state)
+    trading_engine.deduper = SharedDeduper(shared_state, Config.SIGNAL_DEDUP_TTL)
+    trading_engine.risk.store = shared_state
+trading_engine.risk.on_exit = lambda symbol, price, reason: close_from_tick(symbol, price, reason)
+trading_engine.on_signal = lambda signal: publish_from_tick(signal)
+# Shared mode: state lives in SharedState and the journal is an audit log trimmed to its newest events
+journal = TradeJournal(
+    Config.JOURNAL_PATH,
+    snapshot_every=Config.JOURNAL_SNAPSHOT_EVERY if shared_state is None else 0,
+    retain=Config.JOURNAL_RETAIN_EVENTS if shared_state is not None else 0
+)
+scanner = SessionScanner(
+    trading_engine,
+    Config.WATCHLIST,
+    period_seconds=Config.SCAN_INTERVAL_MINUTES * 60,
+    publish=lambda signal: publish_signal(signal)
+)
+event_hub = EventHub()
+# Shares the analysis client's keep-alive pool: an order never waits on a TLS handshake
+execution = ExecutionQueue(
+    trading_engine.async_delta_client,
+    workers=Config.EXECUTION_WORKERS,
+    alert=trading_engine.telegram.send_alert
+)
+
+# Strong references: the loop only keeps weak ones to running tasks
+tick_tasks = set()
+
+def publish_from_tick(signal: FuturesSignal):
+    # Called inside the feed's message loop: publish without holding it up
+    task = asyncio.get_running_loop().create_task(publish_signal(signal))
+    tick_tasks.add(task)
+    task.add_done_callback(tick_tasks.discard)
+
+def close_from_tick(symbol: str, price: float, reason: str):
+    # Called inside mark(): the position leaves the book now so the next tick cannot exit it again,
+    # the store writes follow in a task
+    position = trading_engine.risk.discard(symbol)
+    task = asyncio.get_running_loop().create_task(finish_close(symbol, price, reason, position))
+    tick_tasks.add(task)
+    task.add_done_callback(tick_tasks.discard)
+
+def restore_state(state: Dict):
+    active_trades.clear()
+    active_trades.update(state["active_trades"])
+    if state["brain"] is not None:
+        trading_engine.ai_brain = ClaudeAIBrain.from_state(state["brain"])
+    trading_engine.risk.restore(state.get("risk"), active_trades.items())
 
 # -------------------
 #   WEB DASHBOARD (MAIN PAGE) - Hindi + English
 # -------------------
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "dashboard.html"), encoding="utf-8") as f:
+    DASHBOARD_HTML = f.read()
+
+SESSION_LABELS = {
+    SessionType.TOKYO: '🌅 टोक्यो',
+    SessionType.CRYPTO_PRIME: '🏮 क्रिप्टो प्राइम',
+    SessionType.NEW_YORK: '🌃 न्यूयॉर्क'
+}
+
 @app.get("/", response_class=HTMLResponse)
 def dashboard():
-    current_hour = datetime.now().hour
-    session_label = (
-        '🌅 टोक्यो' if 5 <= current_hour < 13
-        else '🏮 क्रिप्टो प्राइम' if 15 <= current_hour < 18
-        else '🌃 न्यूयॉर्क' if current_hour >= 19 or current_hour <= 1
-        else '😴 बंद'
+    # Static shell, rendered once at import; live values arrive over /events
+    return DASHBOARD_HTML
+
+@app.get("/events")
+async def events():
+    return StreamingResponse(
+        event_hub.stream(snapshot=dashboard_snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
-    return f"""<!DOCTYPE html>
-<html lang="hi">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>ICT + SMC + Claude AI Futures Trading Dashboard</title>
-    <style>
-        body {{ font-family:'Arial',sans-serif;background:linear-gradient(135deg,#667eea 0%,#764ba2 100%);min-height:100vh;color:white;margin:0 }}
-        .container{{ max-width:1200px;margin:0 auto;padding:20px; }}
-        .header{{ text-align:center;margin-bottom:30px; }}
-        .header h1{{ font-size:2.5em;margin-bottom:10px;text-shadow:2px 2px 4px rgba(0,0,0,0.3); }}
-        .header p{{ font-size:1.2em;opacity:0.9; }}
-        .stats-grid{{display:grid;grid-template-columns:repeat(auto-fit,minmax(250px,1fr));gap:20px;margin-bottom:30px;}}
-        .stat-card{{background:rgba(255,255,255,0.1);backdrop-filter:blur(10px);border-radius:15px;padding:20px;text-align:center; border:1px solid rgba(255,255,255,0.2);}}
-        .stat-card h3{{font-size:1.1em;margin-bottom:10px;opacity:0.8;}}
-        .stat-card .value{{font-size:2em;font-weight:bold;}}
-        .status-running{{color:#4CAF50}}
-        .action-buttons{{display:flex;gap:15px;justify-content:center;margin:30px 0;}}
-        .btn{{padding:12px 30px;background:rgba(255,255,255,0.2);border:none;border-radius:25px;color:white;cursor:pointer;transition:all 0.3s;}}
-        .btn:hover{{background:rgba(255,255,255,0.3);transform:translateY(-2px);}}
-        .trade-log{{background:rgba(0,0,0,0.2);border-radius:15px;padding:20px;margin-top:30px}}
-        .trade-log h3{{margin-bottom:15px}}
-        .log-entry{{background:rgba(255,255,255,0.1);padding:10px;margin:10px 0;border-radius:8px;}}
-        .refresh{{animation:spin 1s linear infinite;}}
-        @keyframes spin{{from{{transform:rotate(0deg);}}to{{transform:rotate(360deg);}}}}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🚀 ICT + SMC + Claude AI</h1>
-            <p>Futures Trading Dashboard | राहुल यादव Strategy</p>
-        </div>
-
-        <div class="stats-grid">
-            <div class="stat-card">
-                <h3>सिस्टम स्थिति</h3>
-                <div class="value status-running" id="system-status">●️ चल रहा है</div>
-            </div>
-            <div class="stat-card">
-                <h3>सफलता दर</h3>
-                <div class="value" id="success-rate">{trading_engine.ai_brain.success_rate:.1f}%</div>
-            </div>
-            <div class="stat-card">
-                <h3>कुल ट्रेड्स</h3>
-                <div class="value" id="total-trades">{trading_engine.ai_brain.total_trades}</div>
-            </div>
-            <div class="stat-card">
-                <h3>सक्रिय ट्रेड्स</h3>
-                <div class="value" id="active-trades">{len(active_trades)}</div>
-            </div>
-            <div class="stat-card">
-                <h3>AI कॉन्फिडेंस</h3>
-                <div class="value" id="ai-confidence">{trading_engine.ai_brain.dynamic_multiplier*100:.0f}%</div>
-            </div>
-            <div class="stat-card">
-                <h3>वर्तमान सत्र</h3>
-                <div class="value" id="current-session">{session_label}</div>
-            </div>
-        </div>
-        <div class="action-buttons">
-            <button class="btn" onclick="analyzeMarket()">📊 मार्केट का विश्लेषण करें</button>
-            <button class="btn" onclick="refreshStats()">🔄 डेटा रिफ्रेश करें</button>
-            <button class="btn" onclick="viewTrades()">📋 ट्रेड्स देखें</button>
-        </div>
-        <div class="trade-log">
-            <h3>🎯 लाइव सिग्नल्स</h3>
-            <div id="signal-log"><div class="log-entry">💡 सिस्टम तैयार है - BTC/USDT का विश्लेषण करने के लिए ऊपर का बटन दबाएं</div></div>
-        </div>
-    </div>
-    <script>
-        async function analyzeMarket() {{
-            const btn = event.target;
-            btn.innerHTML = '🔄 विश्लेषण कर रहे हैं...';
-            btn.classList.add('refresh');
-            try {{
-                const response = await fetch('/analyze/BTCUSD');
-                const data = await response.json();
-                const logDiv = document.getElementById('signal-log');
-                const now = new Date().toLocaleString('hi-IN');
-                if (data.status === 'signal') {{
-                    logDiv.innerHTML = `
-                        <div class="log-entry" style="border-left: 4px solid #4CAF50;">
-                            <strong>🎯 NEW SIGNAL - ${{data.data.symbol}}</strong><br>
-                            📈 Type: ${{data.data.trade_type}}<br>
-                            💰 Entry: $${{data.data.entry_price}}<br>
-                            🛑 Stop: $${{data.data.stop_loss}}<br>
-                            🎯 Target: $${{data.data.target_price}}<br>
-                            🔥 Confidence: ${{(data.data.confidence*100).toFixed(1)}}%<br>
-                            ⏰ Time: ${{now}}
-                        </div>
-                    `;
-                }} else {{
-                    logDiv.innerHTML = `
-                        <div class="log-entry" style="border-left: 4px solid #FF9800;">
-                            <strong>⏳ कोई सिग्नल नहीं</strong><br>
-                            Current conditions don't meet ICT criteria<br>
-                            ⏰ Checked: ${{now}}
-                        </div>
-                    `;
-                }}
-            }} catch (error) {{
-                document.getElementById('signal-log').innerHTML = `
-                    <div class="log-entry" style="border-left: 4px solid #F44336;">
-                        <strong>❌ Error</strong><br>
-                        ${{error.message}}<br>
-                        Check API connection
-                    </div>
-                `;
-            }}
-            btn.innerHTML = '📊 मार्केट का विश्लेषण करें';
-            btn.classList.remove('refresh');
-        }}
-        async function refreshStats() {{
-            try {{
-                const response = await fetch('/stats');
-                const stats = await response.json();
-                document.getElementById('total-trades').textContent = stats.total_trades;
-                document.getElementById('success-rate').textContent = stats.success_rate.toFixed(1) + '%';
-                document.getElementById('active-trades').textContent = stats.active_trades;
-            }} catch (error) {{
-                console.error('Failed to refresh stats:', error);
-            }}
-        }}
-        function viewTrades() {{
-            window.open('/stats', '_blank');
-        }}
-        setInterval(refreshStats, 30000);
-    </script>
-</body>
-</html>
-    """
+
+def session_label(session: Optional[SessionType]) -> str:
+    return SESSION_LABELS.get(session, '😴 बंद')
+
+def dashboard_stats() -> Dict:
+    return {
+        "total_trades": trading_engine.ai_brain.total_trades,
+        "success_rate": trading_engine.ai_brain.success_rate,
+        "active_trades": len(active_trades),
+        "ai_confidence": trading_engine.ai_brain.dynamic_multiplier * 100,
+        "unrealized_pnl": trading_engine.risk.unrealized,
+        "realized_today": trading_engine.risk.ledger()["realized_today"]
+    }
+
+def dashboard_snapshot() -> Dict:
+    return {
+        "stats": dashboard_stats(),
+        "session": session_label(trading_engine.current_session()),
+        "signals": list(active_trades.values())
+    }
+
+async def lead_scanner():
+    # One worker holds the scanner lease and scans; the others keep trying in case it dies
+    interval = Config.LEADER_LEASE_SECONDS / 3
+    while True:
+        try:
+            leading = await asyncio.to_thread(shared_state.acquire, "scanner", Config.LEADER_LEASE_SECONDS)
+        except Exception as e:
+            logger.error(f"Scanner lease check failed: {e}")
+            leading = False
+        if leading and not scanner.stats()["running"]:
+            logger.info(f"Worker {shared_state.owner} is now the scanner leader")
+            scanner.start()
+        elif not leading and scanner.stats()["running"]:
+            logger.info(f"Worker {shared_state.owner} lost the scanner lease")
+            await scanner.stop()
+        await asyncio.sleep(interval)
+
+async def sync_positions(interval: float = 5.0):
+    # Other workers open trades too; refresh the mark-to-market index off the tick path
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            trading_engine.risk.sync(await asyncio.to_thread(active_trades.items))
+        except Exception as e:
+            logger.error(f"Position sync failed: {e}")
+
+async def watch_session(interval: float = 30.0):
+    current = trading_engine.current_session()
+    while True:
+        await asyncio.sleep(interval)
+        session = trading_engine.current_session()
+        if session != current:
+            current = session
+            event_hub.publish("session", {"session": session_label(session)})
 
 @app.get("/api/status")
 def api_status():
@@ -442,37 +1128,271 @@ def api_status():
         "status": "running",
         "system": "ICT+SMC+Claude Futures AI",
         "success_rate": f"{trading_engine.ai_brain.success_rate:.1f}%",
-        "trades": trading_engine.ai_brain.total_trades
+        "trades": trading_engine.ai_brain.total_trades,
+        # A dead writer keeps accepting events it will never persist: say so here
+        "journal": "running" if journal.running else f"stopped ({journal.last_error or 'not started'})"
+    }
+
+async def publish_signal(signal: FuturesSignal) -> bool:
+    # Coalesced callers, the scanner and batch runs can all hold the same setup: alert it once
+    if not await shared_call(trading_engine.deduper.first, trading_engine.setup_key(signal)):
+        return False
+    # Limits are rechecked here: a cached signal may predate a position or loss taken since
+    direction = 1 if signal.trade_type == TradeType.FUTURES_LONG else -1
+    position = trading_engine.risk.open(
+        signal.symbol, direction, signal.entry_price, signal.stop_loss, signal.target_price
+    )
+    if position is None:
+        return False
+    signal.size = position.size
+    trade = signal.model_dump()
+    if not await shared_call(claim_trade, signal.symbol, trade):
+        # Another worker opened this symbol since our last position sync: theirs stands, nothing is sent
+        trading_engine.risk.discard(signal.symbol)
+        trading_engine.risk.reject("position_open")
+        return False
+    trading_engine.telegram.send_signal(signal)
+    journal.record_signal(trade)
+    journal.record_open(signal.symbol, trade)
+    if Config.EXECUTION_ENABLED and Config.AUTO_EXECUTE:
+        execute_signal(signal, position)
+    event_hub.publish("signal", trade)
+    event_hub.publish("stats", dashboard_stats())
+    return True
+
+async def shared_call(fn, *args):
+    # SQLite claims wait up to busy_timeout on another worker's write lock: never on the loop
+    if shared_state is not None:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+def claim_trade(symbol: str, trade: Dict) -> bool:
+    if isinstance(active_trades, SharedTrades):
+        return active_trades.add(symbol, trade)
+    # Single event loop: nothing runs between the check and the insert
+    if symbol in active_trades:
+        return False
+    active_trades[symbol] = trade
+    return True
+
+def execute_signal(signal: FuturesSignal, position: Position):
+    # The risk engine sized the position in whole contracts, so this is exactly what the ledger holds
+    lot = Config.CONTRACT_VALUES.get(signal.symbol)
+    contracts = int(round(position.size / lot)) if lot else 0
+    if contracts < 1:
+        logger.error(f"{signal.symbol}: no contract value configured or size below one contract, not executed")
+        return
+    legs = bracket_orders(
+        contracts,
+        OrderSide.BUY.value if signal.trade_type == TradeType.FUTURES_LONG else OrderSide.SELL.value,
+        entry=signal.entry_price,
+        stop=signal.stop_loss,
+        target=signal.target_price,
+        product_symbol=signal.symbol
+    )
+    try:
+        # The signal's timestamp is when its tick was evaluated: tick-to-submit covers alerting and queueing
+        execution.submit(legs, tick_time=signal.timestamp.timestamp())
+    except asyncio.QueueFull:
+        logger.error(f"Order queue full, {signal.symbol} signal not executed")
+
+@app.post("/webhook")
+async def webhook(order: WebhookOrder, wait: bool = True, x_webhook_secret: Optional[str] = Header(default=None)):
+    received = time.time()
+    if not Config.EXECUTION_ENABLED:
+        raise HTTPException(503, "Order execution is disabled")
+    # No secret, no orders: the route places real signed orders and CORS lets any page post to it
+    if not Config.WEBHOOK_SECRET:
+        raise HTTPException(503, "WEBHOOK_SECRET is not configured")
+    if not hmac.compare_digest((x_webhook_secret or "").encode(), Config.WEBHOOK_SECRET.encode()):
+        raise HTTPException(401, "Invalid webhook secret")
+    if order.product_id is None and not order.product_symbol:
+        raise HTTPException(422, "product_id or product_symbol is required")
+    legs = bracket_orders(
+        order.size,
+        order.side.value,
+        entry=order.entry,
+        stop=order.stop,
+        target=order.target,
+        product_id=order.product_id,
+        product_symbol=order.product_symbol
+    )
+    try:
+        submitted = execution.submit(legs, tick_time=order.tick_time or received)
+    except asyncio.QueueFull:
+        raise HTTPException(503, "Order queue full")
+    if wait:
+        try:
+            await asyncio.wait_for(asyncio.shield(submitted.done), Config.ORDER_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+    return submitted.to_dict()
+
+@app.get("/orders")
+def orders(limit: int = 50):
+    return {"execution": execution.stats(), "orders": execution.recent(limit)}
+
+@app.post("/analyze/batch")
+async def analyze_batch(request: BatchAnalyzeRequest):
+    started = time.perf_counter()
+    results = await trading_engine.analyze_many(
+        request.symbols,
+        concurrency=request.concurrency,
+        timeout=request.timeout
+    )
+    for result in results:
+        signal = result["signal"]
+        if signal:
+            await publish_signal(signal)
+            result["signal"] = signal.model_dump()
+    return {
+        "status": "ok",
+        "signals": [r["signal"] for r in results if r["signal"]],
+        "results": results,
+        "total_ms": round((time.perf_counter() - started) * 1000, 3)
     }
 
+@app.get("/signals")
+def latest_signals():
+    return {"scanner": scanner.stats(), "results": scanner.results}
+
 @app.get("/analyze/{symbol}")
-def analyze(symbol: str):
+async def analyze(symbol: str):
+    # Precomputed by the background scanner for the current bar: no upstream work
+    cached = scanner.latest(symbol)
+    # Timeouts, errors and skipped scans are not answers: retry live rather than hide them until the next bar
+    if cached is not None and cached["status"] not in ("signal", "no_signal"):
+        cached = None
+    SCANNER_CACHE.inc("hit" if cached is not None else "miss")
+    if cached is not None:
+        if cached["signal"]:
+            return {"status": "signal", "data": cached["signal"], "cached": True}
+        return {"status": "no_signal", "message": "No setup found", "cached": True}
     try:
-        signal = trading_engine.analyze(symbol)
+        signal = await trading_engine.analyze_async(symbol)
         if signal:
-            trading_engine.telegram.send_signal(signal)
-            active_trades[symbol] = signal.dict()
-            return {"status": "signal", "data": signal.dict()}
+            await publish_signal(signal)
+            return {"status": "signal", "data": signal.model_dump()}
         return {"status": "no_signal", "message": "No setup found"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def settle_trade(symbol: str, exit_price: float, position: Optional[Position]) -> Optional[Tuple[float, Dict, Dict]]:
+    """Store side of a close: claim the trade, book its PnL, count it; blocks on SQLite in shared mode."""
+    # pop, not check-then-delete: with shared state another worker may be closing it too
+    trade = active_trades.pop(symbol, None)
+    if trade is None:
+        return None
+    if position is not None:
+        pnl = position.pnl_at(exit_price)
+    else:
+        # Opened before sizing existed: one unit, booked all the same
+        direction = 1 if trade["trade_type"] == TradeType.FUTURES_LONG.value else -1
+        pnl = (exit_price - trade["entry_price"]) * direction * (trade.get("size") or 1)
+    ledger = trading_engine.risk.book(pnl)
+    trading_engine.ai_brain.record_trade(pnl > 0, trade.get("session", SessionType.CRYPTO_PRIME.value), pnl)
+    return pnl, trading_engine.ai_brain.state(), ledger
+
+async def finish_close(symbol: str, exit_price: float, reason: str, position: Optional[Position]) -> Optional[float]:
+    settled = await shared_call(settle_trade, symbol, exit_price, position)
+    if settled is None:
+        return None
+    pnl, brain, ledger = settled
+    journal.record_close(symbol, exit_price, pnl > 0, brain, pnl=pnl, risk=ledger)
+    POSITIONS_CLOSED.inc(reason)
+    event_hub.publish("close", {"symbol": symbol, "exit_price": exit_price, "pnl": pnl, "reason": reason})
+    event_hub.publish("stats", await shared_call(dashboard_stats))
+    return pnl
+
+async def close_position(symbol: str, exit_price: float, reason: str) -> Optional[float]:
+    return await finish_close(symbol, exit_price, reason, trading_engine.risk.discard(symbol))
+
 @app.post("/close/{symbol}")
-def close_trade(symbol: str, exit_price: float, profitable: bool):
-    if symbol in active_trades:
-        trading_engine.ai_brain.record_trade(profitable, "CRYPTO_PRIME")
-        del active_trades[symbol]
-        return {"status": "closed", "success_rate": trading_engine.ai_brain.success_rate}
-    raise HTTPException(404, "Trade not found")
+async def close_trade(symbol: str, exit_price: float):
+    # On the loop, like stop / target exits from ticks: the risk totals and event queues are not thread-safe
+    # PnL comes from the stored entry and size, not from the caller
+    pnl = await close_position(symbol, exit_price, MANUAL)
+    if pnl is None:
+        raise HTTPException(404, "Trade not found")
+    success_rate = await shared_call(lambda: trading_engine.ai_brain.success_rate)
+    return {"status": "closed", "pnl": pnl, "success_rate": success_rate}
+
+@app.get("/risk")
+def risk():
+    return {
+        "risk": trading_engine.risk.stats(),
+        "positions": [p.to_dict() for p in trading_engine.risk.positions.values()]
+    }
 
 @app.get("/stats")
 def stats():
     return {
         "total_trades": trading_engine.ai_brain.total_trades,
         "success_rate": trading_engine.ai_brain.success_rate,
-        "active_trades": len(active_trades)
+        "active_trades": len(active_trades),
+        "candle_cache": trading_engine.candle_store.stats(),
+        "market_feed": trading_engine.market_feed.stats(),
+        "streams": trading_engine.streams.stats(),
+        "scanner": scanner.stats(),
+        "telegram": trading_engine.telegram.queue.stats(),
+        "events": event_hub.stats(),
+        "journal": journal.stats(),
+        "execution": execution.stats(),
+        "risk": trading_engine.risk.stats(),
+        "scheduler": trading_engine.scheduler.stats(),
+        "state": {
+            "backend": Config.STATE_BACKEND,
+            "worker": shared_state.owner if shared_state is not None else None,
+            "scanner_leader": shared_state.leader("scanner") if shared_state is not None else None
+        },
+        "analysis": {
+            "single_flight": trading_engine.inflight.stats(),
+            "result_cache": trading_engine.results.stats(),
+            "dedup": trading_engine.deduper.stats()
+        }
     }
 
+def runtime_metrics() -> List[Tuple[str, str, str, List[Tuple[Dict, float]]]]:
+    # Read from the components' own counters at scrape time: nothing extra on the hot path
+    cache = trading_engine.candle_store.stats()
+    telegram = trading_engine.telegram.queue.stats()
+    scheduler = trading_engine.scheduler.stats()
+    return [
+        ("trading_candle_cache_hits_total", "counter", "Candle cache hits", [({}, cache["hits"])]),
+        ("trading_candle_cache_misses_total", "counter", "Candle cache misses", [({}, cache["misses"])]),
+        ("trading_candle_cache_evictions_total", "counter", "Candle cache evictions", [({}, cache["evictions"])]),
+        ("trading_candle_cache_fetch_errors_total", "counter", "Failed candle cache refreshes",
+         [({}, cache["fetch_errors"])]),
+        ("trading_result_cache_hits_total", "counter", "Analyses answered from the bar-keyed result cache",
+         [({}, trading_engine.results.hits)]),
+        ("trading_coalesced_requests_total", "counter", "Analyses that joined an in-flight computation",
+         [({}, trading_engine.inflight.followers)]),
+        ("trading_signals_suppressed_total", "counter", "Repeat alerts for an already published setup",
+         [({}, trading_engine.deduper.suppressed)]),
+        ("trading_scheduler_queue_depth", "gauge", "Delta requests waiting for a rate-limit token",
+         [({"lane": lane}, scheduler["lanes"][lane]["queue_depth"]) for lane in LANES]),
+        ("trading_scheduler_granted_total", "counter", "Delta requests let through by the scheduler",
+         [({"lane": lane}, scheduler["lanes"][lane]["granted"]) for lane in LANES]),
+        ("trading_scheduler_throttled_total", "counter", "429 responses that paused the scheduler",
+         [({"lane": lane}, scheduler["lanes"][lane]["throttled"]) for lane in LANES]),
+        ("trading_telegram_queue_depth", "gauge", "Telegram messages waiting to send", [({}, telegram["queue_depth"])]),
+        ("trading_journal_writer_up", "gauge", "1 while the journal writer thread is running",
+         [({}, 1 if journal.running else 0)]),
+        ("trading_journal_failed_total", "counter", "Journal events that could not be written",
+         [({}, journal.failed)]),
+        ("trading_active_trades", "gauge", "Open trades", [({}, len(active_trades))]),
+        ("trading_unrealized_pnl", "gauge", "Mark-to-market PnL of open positions", [({}, trading_engine.risk.unrealized)]),
+        ("trading_open_risk", "gauge", "Loss if every open stop is hit", [({}, trading_engine.risk.open_risk)]),
+        ("trading_realized_pnl_today", "gauge", "Realized PnL for the current UTC day",
+         [({}, trading_engine.risk.ledger()["realized_today"])])
+    ]
+
+REGISTRY.add_collector(runtime_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
     uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,402 @@
+""" Event-driven backtester - replays candles through the live signal rules with fills, fees and leverage """
+
+from typing import Dict, List, Optional
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from columnar import CandleArray
+from smc_indicator import get_zero_to_millionaire_signal
+from streaming import LiveZones
+from zones import BULLISH, ZoneIndex
+import indicators
+
+ENGINE = "engine"      # TradingEngine._generate_signal on the zones TradingEngine._evaluate detects
+FUSION = "fusion"      # smc_indicator.get_zero_to_millionaire_signal
+
+
+# ---------- signal generation ----------
+def _engine_signals_loop(candles: CandleArray, engine, symbol: str, leverage: int, use_zone_index: bool) -> List[Optional[Dict]]:
+    # Reference: the batch detectors over every bar so far, as _evaluate would see them at that bar's close
+    detector = engine.ict_detector
+    out = []
+    for i, bar in enumerate(candles.to_candles()):
+        if use_zone_index:
+            ob, fvg = detector.detect_zones(candles[:i + 1], bar["close"])
+        else:
+            # Both legacy detectors look at the last 20 bars at most
+            window = candles[max(0, i - 19):i + 1]
+            if not engine.config.VECTORIZED_DETECTORS:
+                window = window.to_candles()
+            ob, fvg = detector.detect_order_block(window), detector.detect_fvg(window)
+        signal = engine._generate_signal(symbol, bar["close"], ob, fvg)
+        out.append(None if signal is None else {
+            "side": 1 if signal.trade_type.value == "FUTURES_LONG" else -1,
+            "entry": signal.entry_price,
+            "stop": signal.stop_loss,
+            "target": signal.target_price,
+            "leverage": leverage
+        })
+    return out
+
+
+def _fusion_signals_loop(candles: CandleArray, config: Dict, leverage: int) -> List[Optional[Dict]]:
+    # Reference: the live rule itself over every bar so far, not one of its ports
+    out = []
+    for i in range(len(candles)):
+        fused = get_zero_to_millionaire_signal(candles[:i + 1], config)
+        out.append(None if fused["side"] == "hold" else {
+            "side": 1 if fused["side"] == "buy" else -1,
+            "entry": fused["entry"],
+            "stop": fused["stop"],
+            "target": fused["target"],
+            "leverage": leverage
+        })
+    return out
+
+
+def _engine_signals_np(
+    candles: CandleArray,
+    risk_reward: float,
+    leverage: int,
+    min_displacement: float,
+    min_gap: float
+) -> Dict[str, np.ndarray]:
+    # Vectorized detect_order_block / detect_fvg / _generate_signal for every window end e
+    o, h, l, c = candles.open, candles.high, candles.low, candles.close
+    n = len(candles)
+    idx = np.arange(n)
+    ob_hit = np.zeros(n, dtype=bool)
+    if n >= 2:
+        ob_hit[:-1] = (c[:-1] < o[:-1]) & (c[1:] > o[1:]) & ((c[1:] - o[1:]) / o[1:] > min_displacement)
+    last_ob = np.maximum.accumulate(np.where(ob_hit, idx, -1))
+    fvg_hit = np.zeros(n, dtype=bool)
+    if n >= 3:
+        fvg_hit[2:] = (l[2:] > h[:-2]) & ((l[2:] - h[:-2]) / h[:-2] > min_gap)
+    last_fvg = np.maximum.accumulate(np.where(fvg_hit, idx, -1))
+
+    ob = np.full(n, -1)
+    if n >= 20:
+        ends = idx[19:]
+        cand = last_ob[ends - 4]
+        ob[19:] = np.where(cand >= ends - 18, cand, -1)
+    fvg = np.where(last_fvg >= np.maximum(3, idx - 8), last_fvg, -1)
+
+    has_ob = ob >= 0
+    ob_low = np.where(has_ob, l[np.maximum(ob, 0)], np.nan)
+    ob_high = np.where(has_ob, h[np.maximum(ob, 0)], np.nan)
+    mask = has_ob & (ob_low <= c) & (c <= ob_high)
+    fvg_bottom = np.where(fvg >= 0, h[np.maximum(fvg, 2) - 2], -np.inf)
+    target = np.where(fvg_bottom > c, fvg_bottom, c + (c - ob_low) * risk_reward)
+    return {
+        "mask": mask,
+        "side": np.ones(n, dtype=np.int64),
+        "entry": c,
+        "stop": ob_low * 0.998,
+        "target": target,
+        "leverage": np.full(n, leverage, dtype=np.float64)
+    }
+
+
+def _engine_signals_zones(
+    candles: CandleArray,
+    risk_reward: float,
+    leverage: int,
+    min_displacement: float,
+    min_gap: float
+) -> Dict[str, np.ndarray]:
+    # ZoneIndex.entry at every bar close, then _generate_signal's rules. The batch build
+    # knows when each zone forms and is mitigated, so bars without either only query
+    n = len(candles)
+    mask = np.zeros(n, dtype=bool)
+    side = np.ones(n, dtype=np.int64)
+    stop = np.full(n, np.nan)
+    target = np.full(n, np.nan)
+    zones = ZoneIndex.build(candles, min_displacement, min_gap).zones
+    mitigating = np.zeros(n, dtype=bool)
+    mitigating[[z.mitigated_at for z in zones if not z.live]] = True
+    live = LiveZones()
+    highs, lows, closes = candles.high.tolist(), candles.low.tolist(), candles.close.tolist()
+    mitigating = mitigating.tolist()
+    j = 0
+    for i in range(n):
+        if mitigating[i]:
+            live.mitigate(highs[i], lows[i])
+        while j < len(zones) and zones[j].formed_at == i:
+            live.add(zones[j])
+            j += 1
+        price = closes[i]
+        ob, gap = live.entry(price)
+        if ob is None:
+            continue
+        mask[i] = True
+        if ob.bias == BULLISH:
+            stop[i] = ob.bottom * 0.998
+            target[i] = gap.bottom if gap else price + ((price - ob.bottom) * risk_reward)
+        else:
+            side[i] = -1
+            stop[i] = ob.top * 1.002
+            target[i] = gap.top if gap else price - ((ob.top - price) * risk_reward)
+    return {
+        "mask": mask,
+        "side": side,
+        "entry": candles.close,
+        "stop": stop,
+        "target": target,
+        "leverage": np.full(n, leverage, dtype=np.float64)
+    }
+
+
+def _rolling_sum_sequential(values: np.ndarray, window: int) -> np.ndarray:
+    # Left-to-right like sum(list) so thresholds compare exactly as the list version does
+    total = np.zeros(len(values) - window + 1)
+    for k in range(window):
+        total = total + values[k:len(values) - window + 1 + k]
+    return total
+
+
+def _fusion_signals_np(candles: CandleArray, config: Dict, leverage: int) -> Dict[str, np.ndarray]:
+    # Vectorized get_zero_to_millionaire_signal for every window end e
+    h, l, c, v = candles.high, candles.low, candles.close, candles.volume
+    n = len(candles)
+    length = config.get("ailength", 10)
+    multiplier = config.get("aimultiplier", 3.0)
+    is_prime = config.get("session_active", True)
+
+    bos_up = np.zeros(n, dtype=bool)
+    bos_down = np.zeros(n, dtype=bool)
+    fvg_up = np.zeros(n, dtype=bool)
+    fvg_down = np.zeros(n, dtype=bool)
+    if n >= 3:
+        bos_up[2:] = (c[1:-1] < c[:-2]) & (c[2:] > c[1:-1])
+        bos_down[2:] = (c[1:-1] > c[:-2]) & (c[2:] < c[1:-1])
+        fvg_up[2:] = l[2:] > h[:-2]
+        fvg_down[2:] = h[2:] < l[:-2]
+    buy = bos_up | fvg_up
+    sell = ~buy & (bos_down | fvg_down)
+
+    hl2 = (h + l) / 2
+    if config.get("atr_mode") == "wilder":
+        st = indicators.supertrend(h, l, c, length, multiplier)
+        warm = np.arange(n) >= length - 1
+        upper = np.where(warm, st["upper"], hl2)
+        lower = np.where(warm, st["lower"], hl2)
+        trend = st["trend"]
+    else:
+        atr = np.zeros(n)
+        if 0 < length <= n:
+            atr[length - 1:] = sliding_window_view(h - l, length).max(axis=1)
+        upper = hl2 + multiplier * atr
+        lower = hl2 - multiplier * atr
+        trend = np.where(c < lower, -1, np.where(c > upper, 1, 0))
+
+    avg_vol = np.zeros(n)
+    if n >= 21:
+        avg_vol[20:] = _rolling_sum_sequential(v[:-1], 19)[1:] / 19
+    vp = (avg_vol != 0) & (v > 1.5 * avg_vol)
+    ai = (trend == 1) & vp & bool(is_prime)
+
+    stop = np.where(trend == 1, lower, upper)
+    target = np.where(trend == 1, h, np.where(trend == -1, l, c))
+    return {
+        "mask": (buy | sell) & ai,
+        "side": np.where(buy, 1, -1),
+        "entry": c,
+        "stop": stop,
+        "target": target,
+        "leverage": np.full(n, leverage, dtype=np.float64)
+    }
+
+
+# ---------- execution ----------
+def _bracket_valid(side: int, entry: float, stop: float, target: float) -> bool:
+    if side > 0:
+        return stop < entry < target
+    return target < entry < stop
+
+
+def _exit_on_bar(side, stop, target, o, h, l):
+    # Stop is checked first when both levels sit inside one bar (conservative)
+    if side > 0:
+        if l <= stop:
+            return min(o, stop), "stop"
+        if h >= target:
+            return max(o, target), "target"
+    else:
+        if h >= stop:
+            return max(o, stop), "stop"
+        if l <= target:
+            return min(o, target), "target"
+    return None, None
+
+
+def _trade_return(side, entry, exit, leverage, allocation, fee_rate) -> float:
+    exposure = allocation * leverage
+    r = exposure * side * (exit - entry) / entry - exposure * fee_rate * (1 + exit / entry)
+    return max(r, -allocation)  # isolated margin: at most the posted margin is lost
+
+
+def _scan_exit(candles: CandleArray, start: int, side: int, stop: float, target: float):
+    o, h, l = candles.open, candles.high, candles.low
+    n = len(candles)
+    j, chunk = start, 64
+    while j < n:
+        end = min(n, j + chunk)
+        if side > 0:
+            stop_hit, target_hit = l[j:end] <= stop, h[j:end] >= target
+        else:
+            stop_hit, target_hit = h[j:end] >= stop, l[j:end] <= target
+        hit = stop_hit | target_hit
+        k = int(np.argmax(hit))
+        if hit[k]:
+            i = j + k
+            return i, _exit_on_bar(side, stop, target, o[i], h[i], l[i])
+        j, chunk = end, chunk * 2
+    return -1, (None, None)
+
+
+def _simulate_loop(candles: CandleArray, signals: List[Optional[Dict]], allocation: float, fee_rate: float) -> List[Dict]:
+    o, h, l, c = candles.open.tolist(), candles.high.tolist(), candles.low.tolist(), candles.close.tolist()
+    trades, position = [], None
+    for i in range(len(candles)):
+        if position is not None:
+            price, reason = _exit_on_bar(position["side"], position["stop"], position["target"], o[i], h[i], l[i])
+            if price is not None:
+                trades.append(_close(position, i, price, reason, allocation, fee_rate))
+                position = None
+        signal = signals[i]
+        if position is None and signal and _bracket_valid(signal["side"], signal["entry"], signal["stop"], signal["target"]):
+            position = dict(signal, entry_index=i)
+    if position is not None:
+        trades.append(_close(position, len(candles) - 1, c[-1], "end", allocation, fee_rate))
+    return trades
+
+
+def _simulate_fast(candles: CandleArray, signals: Dict[str, np.ndarray], allocation: float, fee_rate: float) -> List[Dict]:
+    side, entry, stop, target = signals["side"], signals["entry"], signals["stop"], signals["target"]
+    valid = signals["mask"] & np.where(side > 0, (stop < entry) & (entry < target), (target < entry) & (entry < stop))
+    candidates = np.flatnonzero(valid)
+    trades, i, n = [], 0, len(candles)
+    while True:
+        k = np.searchsorted(candidates, i)
+        if k >= candidates.size:
+            break
+        s = int(candidates[k])
+        position = {
+            "side": int(side[s]), "entry": float(entry[s]), "stop": float(stop[s]),
+            "target": float(target[s]), "leverage": float(signals["leverage"][s]), "entry_index": s
+        }
+        exit_index, (price, reason) = _scan_exit(candles, s + 1, position["side"], position["stop"], position["target"])
+        if exit_index < 0:
+            trades.append(_close(position, n - 1, float(candles.close[-1]), "end", allocation, fee_rate))
+            break
+        trades.append(_close(position, exit_index, float(price), reason, allocation, fee_rate))
+        i = exit_index
+    return trades
+
+
+def _close(position: Dict, index: int, price: float, reason: str, allocation: float, fee_rate: float) -> Dict:
+    return {
+        "side": "long" if position["side"] > 0 else "short",
+        "entry_index": position["entry_index"],
+        "exit_index": index,
+        "entry": position["entry"],
+        "stop": position["stop"],
+        "target": position["target"],
+        "exit": price,
+        "reason": reason,
+        "return": _trade_return(position["side"], position["entry"], price, position["leverage"], allocation, fee_rate)
+    }
+
+
+# ---------- results ----------
+def _equity_curve(trades: List[Dict], n: int, capital: float) -> np.ndarray:
+    if not trades:
+        return np.full(n, capital)
+    exits = np.array([t["exit_index"] for t in trades])
+    balance = capital * np.cumprod(1 + np.array([t["return"] for t in trades]))
+    last = np.searchsorted(exits, np.arange(n), side="right") - 1
+    return np.where(last >= 0, balance[np.maximum(last, 0)], capital)
+
+
+def _stats(trades: List[Dict], equity: np.ndarray, capital: float) -> Dict:
+    returns = np.array([t["return"] for t in trades])
+    wins = returns[returns > 0]
+    losses = returns[returns <= 0]
+    peak = np.maximum.accumulate(equity) if equity.size else equity
+    return {
+        "trades": len(trades),
+        "wins": int(wins.size),
+        "win_rate": float(wins.size / returns.size) if returns.size else 0.0,
+        "expectancy": float(returns.mean()) if returns.size else 0.0,
+        "profit_factor": float(wins.sum() / -losses.sum()) if losses.sum() < 0 else float("inf") if wins.size else 0.0,
+        "total_return": float(equity[-1] / capital - 1) if equity.size else 0.0,
+        "max_drawdown": float((1 - equity / peak).max()) if equity.size else 0.0,
+        "final_equity": float(equity[-1]) if equity.size else capital
+    }
+
+
+def run_backtest(
+    candles,
+    strategy: str = ENGINE,
+    config: Optional[Dict] = None,
+    capital: float = 500.0,
+    leverage: int = 10,
+    allocation: float = 0.1,
+    fee_rate: float = 0.0005,
+    risk_reward: Optional[float] = None,
+    min_displacement: Optional[float] = None,
+    min_gap: Optional[float] = None,
+    use_zone_index: Optional[bool] = None,
+    fast: bool = True,
+    engine=None,
+    symbol: str = "BACKTEST"
+) -> Dict:
+    """Backtest one strategy over a candle history.
+
+    fast=False replays bar by bar through the live rules (the engine's batch detectors and
+    _generate_signal, or get_zero_to_millionaire_signal) and is the reference; fast=True
+    produces the same trades from incremental or vectorized detectors (Wilder fusion stops
+    may differ in the last bit). The engine strategy follows TradingEngine._evaluate:
+    use_zone_index selects the full-history zone index (bullish and bearish) over the
+    legacy 20 / 10 bar detectors.
+
+    engine is a TradingEngine, passed in rather than built here: building one reads the
+    live configuration and opens clients. Engine parameters left as None come from
+    engine.config; the reference path always uses the engine's own Config thresholds.
+    """
+    if not isinstance(candles, CandleArray):
+        candles = CandleArray.from_candles(candles)
+    config = config or {}
+    if strategy not in (ENGINE, FUSION):
+        raise ValueError(f"Unknown strategy: {strategy}")
+    if strategy == ENGINE:
+        if engine is not None:
+            risk_reward = engine.config.MIN_RISK_REWARD if risk_reward is None else risk_reward
+            min_displacement = engine.config.MIN_DISPLACEMENT if min_displacement is None else min_displacement
+            min_gap = engine.config.MIN_FVG_SIZE if min_gap is None else min_gap
+            use_zone_index = engine.config.USE_ZONE_INDEX if use_zone_index is None else use_zone_index
+        elif not fast or None in (risk_reward, min_displacement, min_gap, use_zone_index):
+            raise ValueError(
+                "The engine strategy needs engine=, or risk_reward, min_displacement, "
+                "min_gap and use_zone_index with fast=True"
+            )
+    if fast:
+        if strategy == ENGINE and use_zone_index:
+            signals = _engine_signals_zones(candles, risk_reward, leverage, min_displacement, min_gap)
+        elif strategy == ENGINE:
+            signals = _engine_signals_np(candles, risk_reward, leverage, min_displacement, min_gap)
+        else:
+            signals = _fusion_signals_np(candles, config, leverage)
+        trades = _simulate_fast(candles, signals, allocation, fee_rate)
+    else:
+        if strategy == ENGINE:
+            signals = _engine_signals_loop(candles, engine, symbol, leverage, use_zone_index)
+        else:
+            signals = _fusion_signals_loop(candles, config, leverage)
+        trades = _simulate_loop(candles, signals, allocation, fee_rate)
+    equity = _equity_curve(trades, len(candles), capital)
+    return {
+        "strategy": strategy,
+        "trades": trades,
+        "equity": equity,
+        "stats": _stats(trades, equity, capital)
+    }
@@ -0,0 +1,66 @@
+""" Benchmark: legacy get_rahulyadav_ai rescans vs indicators.py full series and incremental updates
+
+    python benchmarks/bench_indicators.py [bars]
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import indicators
+from columnar import CandleArray
+from smc_indicator import get_rahulyadav_ai
+
+
+def synthetic(n: int, seed: int = 7) -> CandleArray:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = np.r_[100.0, close[:-1]]
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.003, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.003, n)))
+    return CandleArray(open_, high, low, close, rng.uniform(1, 10, n), np.arange(n) * 3600)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main(n: int = 100_000, window: int = 100, length: int = 10):
+    candles = synthetic(n)
+    rows = candles.to_candles()
+    config = {"ailength": length, "aimultiplier": 3.0}
+
+    def legacy():
+        # How the live path evaluates: rebuild lists and rescan the window on every bar
+        for i in range(window, n + 1):
+            get_rahulyadav_ai(rows[i - window:i], config)
+
+    def full_series():
+        indicators.supertrend(candles.high, candles.low, candles.close, length, 3.0)
+        indicators.sma(candles.volume, 19)
+
+    def incremental():
+        st, vol = indicators.SuperTrend(length, 3.0), indicators.SMA(19)
+        for h, l, c, v in zip(candles.high.tolist(), candles.low.tolist(),
+                              candles.close.tolist(), candles.volume.tolist()):
+            st.update(h, l, c)
+            vol.update(v)
+
+    results = {
+        "legacy_rescan": timed(legacy),
+        "full_series": timed(full_series),
+        "incremental": timed(incremental)
+    }
+    base = results["legacy_rescan"]
+    print(f"{n} bars, window {window}, length {length}")
+    for name, seconds in results.items():
+        print(f"  {name:<14} {seconds * 1000:10.1f} ms  {seconds / n * 1e6:8.2f} us/bar  x{base / seconds:7.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,269 @@
+""" Benchmark suite - signal path over synthetic regimes, JSON baselines, regression gate
+
+    python benchmarks/run.py                       # compare against benchmarks/baseline.json
+    python benchmarks/run.py --save                # record a new baseline
+    python benchmarks/run.py --sizes 100,10000000 --cases backtest_engine,zero_to_millionaire_np
+    python benchmarks/run.py --full --threshold 0.15 --output results.json
+
+Exits 1 when any case is slower than its baseline by more than --threshold.
+Baselines are machine specific: record them on the machine that compares.
+No baseline is committed for that reason, and without one the gate passes;
+--require-baseline makes a missing baseline exit 2 instead.
+
+CI records the baseline from the target branch on the same runner, then gates
+the change against it (only cases and sizes present in both runs are compared):
+
+    git worktree add ../base origin/main
+    python ../base/benchmarks/run.py --save --baseline bench-baseline.json
+    python benchmarks/run.py --baseline bench-baseline.json --require-baseline
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from columnar import CandleArray
+from synthetic import REGIMES, generate
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+DEFAULT_SIZES = (100, 10_000, 100_000)
+FULL_SIZES = (100, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+class Case(NamedTuple):
+    name: str
+    setup: Callable[[CandleArray], Callable[[], object]]
+    max_size: int
+
+
+# ---------- cases ----------
+def _detector():
+    from app import ICTDetector
+    return ICTDetector()
+
+
+def detect_order_block_list(candles: CandleArray):
+    detector, rows = _detector(), candles.to_candles()
+    return lambda: detector.detect_order_block(rows)
+
+
+def detect_order_block_np(candles: CandleArray):
+    detector = _detector()
+    return lambda: detector.detect_order_block(candles)
+
+
+def detect_fvg_list(candles: CandleArray):
+    detector, rows = _detector(), candles.to_candles()
+    return lambda: detector.detect_fvg(rows)
+
+
+def detect_fvg_np(candles: CandleArray):
+    detector = _detector()
+    return lambda: detector.detect_fvg(candles)
+
+
+def detect_zones(candles: CandleArray):
+    detector, price = _detector(), float(candles.close[-1])
+    return lambda: detector.detect_zones(candles, price)
+
+
+def zero_to_millionaire_list(candles: CandleArray):
+    from smc_indicator import get_zero_to_millionaire_signal
+    rows, config = candles.to_candles(), {"ailength": 10, "aimultiplier": 3.0}
+    return lambda: get_zero_to_millionaire_signal(rows, config)
+
+
+def zero_to_millionaire_np(candles: CandleArray):
+    from smc_indicator import get_zero_to_millionaire_signal
+    config = {"ailength": 10, "aimultiplier": 3.0}
+    return lambda: get_zero_to_millionaire_signal(candles, config)
+
+
+def backtest_engine(candles: CandleArray):
+    # Legacy 20 / 10 bar detectors: the fully vectorized path
+    from smc_fusion import run_smc_backtest
+    rules = {"risk_reward": 2.0, "min_displacement": 0.01, "min_gap": 0.002}
+    return lambda: run_smc_backtest(candles, "engine", use_zone_index=False, **rules)
+
+
+def backtest_engine_zones(candles: CandleArray):
+    # Full-history zone index, streamed bar by bar
+    from smc_fusion import run_smc_backtest
+    rules = {"risk_reward": 2.0, "min_displacement": 0.01, "min_gap": 0.002}
+    return lambda: run_smc_backtest(candles, "engine", use_zone_index=True, **rules)
+
+
+def backtest_fusion(candles: CandleArray):
+    from smc_fusion import run_smc_backtest
+    return lambda: run_smc_backtest(candles, "fusion", config={"ailength": 10, "aimultiplier": 0.3})
+
+
+def analyze_route(candles: CandleArray):
+    # GET /analyze/{symbol} through the ASGI app, exchange replaced in-process
+    import httpx
+    import app as service
+    from stub_exchange import StubDeltaClient
+
+    stub = StubDeltaClient(candles)
+    engine = service.trading_engine
+    engine.async_delta_client = stub
+    engine.candle_store.client = stub
+    engine.candle_store._series.clear()
+    engine.current_session = lambda: service.SessionType.CRYPTO_PRIME
+    engine.ai_brain = service.ClaudeAIBrain()
+    service.scanner.results.clear()
+    loop = asyncio.new_event_loop()
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=service.app), base_url="http://bench")
+
+    def call():
+        response = loop.run_until_complete(client.get("/analyze/BTCUSD"))
+        response.raise_for_status()
+        # Signals are not closed here; keep the engine from growing state across calls
+        service.active_trades.clear()
+        return response
+    return call
+
+
+CASES = [
+    Case("detect_order_block_list", detect_order_block_list, 100_000),
+    Case("detect_order_block_np", detect_order_block_np, 10_000_000),
+    Case("detect_fvg_list", detect_fvg_list, 100_000),
+    Case("detect_fvg_np", detect_fvg_np, 10_000_000),
+    Case("detect_zones", detect_zones, 10_000_000),
+    Case("zero_to_millionaire_list", zero_to_millionaire_list, 100_000),
+    Case("zero_to_millionaire_np", zero_to_millionaire_np, 10_000_000),
+    Case("backtest_engine", backtest_engine, 10_000_000),
+    # Zone index walked bar by bar in Python: about 7s per million bars
+    Case("backtest_engine_zones", backtest_engine_zones, 1_000_000),
+    Case("backtest_fusion", backtest_fusion, 10_000_000),
+    Case("analyze_route", analyze_route, 100_000)
+]
+
+
+# ---------- measurement ----------
+def measure(fn: Callable[[], object], min_time: float = 0.2, max_repeats: int = 50) -> Dict:
+    """Warm once, then repeat until min_time has elapsed; the median is what is compared."""
+    fn()
+    times: List[float] = []
+    budget_start = time.perf_counter()
+    while len(times) < max_repeats and (len(times) < 3 or time.perf_counter() - budget_start < min_time):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+        if times[-1] > 5.0:
+            break
+    return {"median_s": statistics.median(times), "min_s": min(times), "repeats": len(times)}
+
+
+def run(cases: List[Case], sizes: List[int], regimes: List[str], seed: int = 7) -> Dict[str, Dict]:
+    results = {}
+    for size in sizes:
+        for regime in regimes:
+            candles = generate(size, regime, seed)
+            for case in cases:
+                if size > case.max_size:
+                    continue
+                key = f"{case.name}/{regime}/{size}"
+                result = measure(case.setup(candles))
+                result["us_per_bar"] = result["median_s"] / size * 1e6
+                results[key] = result
+                print(f"  {key:<48} {result['median_s'] * 1000:11.3f} ms  "
+                      f"{result['us_per_bar']:9.4f} us/bar  n={result['repeats']}", flush=True)
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float, floor: float) -> List[str]:
+    """Keys slower than baseline * (1 + threshold); differences under floor seconds are noise."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        current, previous = result["median_s"], base["median_s"]
+        if current > previous * (1 + threshold) and current - previous > floor:
+            regressions.append(f"{key}: {previous * 1000:.3f} ms -> {current * 1000:.3f} ms "
+                               f"(+{(current / previous - 1) * 100:.1f}%)")
+    return regressions
+
+
+def environment() -> Dict:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+
+
+def load(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", help="comma separated bar counts")
+    parser.add_argument("--full", action="store_true", help=f"sizes {FULL_SIZES}")
+    parser.add_argument("--regimes", default=",".join(REGIMES))
+    parser.add_argument("--cases", help="comma separated case names (default: all)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--require-baseline", action="store_true", help="exit 2 when there is no baseline to compare")
+    parser.add_argument("--output", help="also write this run's results here")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--floor-ms", type=float, default=0.05, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    sizes = [int(s) for s in args.sizes.split(",")] if args.sizes else list(FULL_SIZES if args.full else DEFAULT_SIZES)
+    regimes = args.regimes.split(",")
+    wanted = set(args.cases.split(",")) if args.cases else None
+    cases = [c for c in CASES if wanted is None or c.name in wanted]
+    if wanted and len(cases) != len(wanted):
+        parser.error(f"unknown cases: {sorted(wanted - {c.name for c in cases})}")
+
+    results = run(cases, sizes, regimes, args.seed)
+    report = {"environment": environment(), "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    baseline = load(args.baseline)
+    if args.save:
+        # Merge so a partial run (--cases / --sizes) only replaces what it measured
+        merged = dict(baseline["results"]) if baseline else {}
+        merged.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump({"environment": report["environment"], "results": merged}, f, indent=2, sort_keys=True)
+        print(f"Baseline written: {args.baseline} ({len(merged)} entries)")
+        return 0
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save to record one")
+        return 2 if args.require_baseline else 0
+    regressions = compare(results, baseline["results"], args.threshold, args.floor_ms / 1000)
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold * 100:.0f}%:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"No regressions beyond {args.threshold * 100:.0f}% against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+""" In-process Delta stand-in - serves a synthetic history through the AsyncDeltaClient interface """
+
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from columnar import CandleArray
+
+
+class StubDeltaClient:
+    """No sockets, no serialization: measures our code, not the network."""
+
+    def __init__(self, candles: CandleArray):
+        self.candles = candles
+        self.requests = 0
+
+    async def get_candles(
+        self,
+        symbol: str,
+        resolution: str = "60",
+        limit: int = 100,
+        start: Optional[int] = None,
+        end: Optional[int] = None
+    ) -> List[Dict]:
+        self.requests += 1
+        if start is not None:
+            i = int(np.searchsorted(self.candles.timestamp, start))
+            return self.candles[i:i + limit].to_candles()
+        return self.candles[max(0, len(self.candles) - limit):].to_candles()
+
+    async def get_ticker(self, symbol: str) -> Optional[Dict]:
+        self.requests += 1
+        return {"symbol": symbol, "close": str(self.candles.close[-1])}
+
+    async def get_snapshot(self, symbol: str, resolution: str = "60", limit: int = 100) -> Tuple[List[Dict], Optional[Dict]]:
+        return await self.get_candles(symbol, resolution, limit), await self.get_ticker(symbol)
+
+    async def aclose(self):
+        pass
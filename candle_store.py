@@ -0,0 +1,183 @@
+""" Incremental per-symbol candle cache - ring buffer per (symbol, resolution) """
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# REST resolution (as used by get_candles / market_feed.RESOLUTIONS) -> bar length in seconds
+SECONDS = {"1": 60, "5": 300, "15": 900, "60": 3600, "240": 14400, "D": 86400}
+
+
+def candle_time(candle: Dict) -> int:
+    # Delta returns "time"; backtest / exported data uses "timestamp"
+    return int(candle.get("time", candle.get("timestamp", 0)))
+
+
+class CandleSeries:
+    def __init__(self, capacity: int):
+        self.candles = deque(maxlen=capacity)
+        self.last_access = time.monotonic()
+        self.refreshed_at = time.monotonic()
+        # Pushed bars stopped being contiguous: serve nothing from memory until a fetch closes the gap
+        self.stale = False
+
+    @property
+    def last_time(self) -> Optional[int]:
+        return candle_time(self.candles[-1]) if self.candles else None
+
+    def merge(self, candles: List[Dict]) -> int:
+        """Append bars newer than the cache, replace the still-forming last bar. Returns bars applied."""
+        applied = 0
+        for candle in sorted(candles, key=candle_time):
+            ts = candle_time(candle)
+            last = self.last_time
+            if last is None or ts > last:
+                self.candles.append(candle)
+            elif ts == last:
+                self.candles[-1] = candle
+            else:
+                continue
+            applied += 1
+        return applied
+
+    def tail(self, limit: int) -> List[Dict]:
+        if limit >= len(self.candles):
+            return list(self.candles)
+        return list(self.candles)[-limit:]
+
+
+class CandleStore:
+    def __init__(
+        self,
+        client,
+        capacity: int = 500,
+        idle_ttl: float = 3600.0,
+        max_series: int = 256,
+        max_stale: float = 300.0
+    ):
+        self.client = client
+        self.capacity = capacity
+        self.idle_ttl = idle_ttl
+        self.max_series = max_series
+        self.max_stale = max_stale
+        self._series: "OrderedDict[Tuple[str, str], CandleSeries]" = OrderedDict()
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._last_sweep = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bars_fetched = 0
+        self.gaps = 0
+        self.fetch_errors = 0
+
+    async def get_candles(self, symbol: str, resolution: str = "60", limit: int = 100) -> List[Dict]:
+        """Cached window topped up from upstream; [] without one, or once refreshes have failed for max_stale seconds."""
+        key = (symbol, resolution)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            series = self._series.get(key)
+            try:
+                if series is None or not series.candles:
+                    self.misses += 1
+                    fetched = await self.client.fetch_candles(symbol, resolution, max(limit, 1))
+                    if not fetched:
+                        return []
+                    series = CandleSeries(self.capacity)
+                    self._series[key] = series
+                else:
+                    self.hits += 1
+                    # Only bars from the last cached (possibly still forming) bar onwards, all of them if a gap is open
+                    now = int(time.time())
+                    period = SECONDS.get(resolution)
+                    missing = (now - series.last_time) // period + 1 if period else limit
+                    fetched = await self.client.fetch_candles(
+                        symbol, resolution, min(max(limit, missing), self.capacity), start=series.last_time, end=now
+                    )
+            except Exception as e:
+                self.fetch_errors += 1
+                logger.warning(f"Candle fetch for {symbol}/{resolution} failed: {e}")
+                if series is None or not series.candles or series.stale:
+                    return []
+                series.last_access = time.monotonic()
+                # A tail that stopped updating is still a usable window for a while, not indefinitely
+                if time.monotonic() - series.refreshed_at > self.max_stale:
+                    return []
+                return series.tail(limit)
+            self.bars_fetched += len(fetched)
+            series.merge(fetched)
+            series.refreshed_at = series.last_access = time.monotonic()
+            if fetched:
+                series.stale = False
+            self._series.move_to_end(key)
+            self._evict()
+            return series.tail(limit)
+
+    def peek(self, symbol: str, resolution: str = "60", limit: int = 100) -> List[Dict]:
+        # Memory-only read for callers that keep the series fresh by other means (push feed)
+        series = self._series.get((symbol, resolution))
+        if series is None or not series.candles or series.stale:
+            return []
+        self.hits += 1
+        series.last_access = time.monotonic()
+        return series.tail(limit)
+
+    def update(self, symbol: str, resolution: str, candles: List[Dict]) -> int:
+        """Merge externally received bars (e.g. a push feed) into an already seeded series."""
+        key = (symbol, resolution)
+        series = self._series.get(key)
+        if series is None or not series.candles:
+            # History is seeded by the first upstream fetch; a lone pushed bar is not a window
+            return 0
+        series.last_access = time.monotonic()
+        self._series.move_to_end(key)
+        if series.stale:
+            return 0
+        period = SECONDS.get(resolution)
+        first = min(candle_time(c) for c in candles) if candles else None
+        if period and first is not None and first > series.last_time + period:
+            # Bars were missed (e.g. the feed was down): appending past them would leave a hole in the window
+            self.gaps += 1
+            series.stale = True
+            logger.warning(f"Gap in pushed {symbol}/{resolution} bars after {series.last_time}, refetching")
+            return 0
+        return series.merge(candles)
+
+    def invalidate(self, symbol: str, resolution: str):
+        """Force the next read through an upstream fetch, e.g. after the push feed reconnects."""
+        series = self._series.get((symbol, resolution))
+        if series is not None:
+            series.stale = True
+
+    def _evict(self):
+        now = time.monotonic()
+        if now - self._last_sweep >= self.idle_ttl / 4:
+            self._last_sweep = now
+            for key in [k for k, s in self._series.items() if now - s.last_access > self.idle_ttl]:
+                self._drop(key)
+        while len(self._series) > self.max_series:
+            self._drop(next(iter(self._series)))
+
+    def _drop(self, key: Tuple[str, str]):
+        self._series.pop(key, None)
+        lock = self._locks.get(key)
+        if lock is not None and not lock.locked():
+            del self._locks[key]
+        self.evictions += 1
+        logger.info(f"Evicted idle candle series {key[0]}/{key[1]}")
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "series": len(self._series),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+            "bars_fetched": self.bars_fetched,
+            "gaps": self.gaps,
+            "fetch_errors": self.fetch_errors
+        }
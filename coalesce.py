@@ -0,0 +1,103 @@
+""" Request coalescing - single-flight per key, bar-keyed result cache, once-per-setup signal dedup """
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+MISS = object()
+
+
+class SingleFlight:
+    """Concurrent callers with the same key share one execution and its result (or exception)."""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def run(self, key: Hashable, fn: Callable[..., Awaitable], *args):
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = self._inflight[key] = asyncio.ensure_future(fn(*args))
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.followers += 1
+        # Shielded: a caller that times out or disconnects stops waiting, the shared work goes on
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Marks the exception retrieved even when every caller has already gone
+            task.exception()
+
+    def stats(self) -> Dict:
+        return {"in_flight": len(self._inflight), "leaders": self.leaders, "followers": self.followers}
+
+
+def last_closed_bar(candles, period: float, now: Optional[float] = None) -> Optional[float]:
+    """Open time of the newest bar in candles that has fully closed by now."""
+    now = time.time() if now is None else now
+    if hasattr(candles, "timestamp"):
+        times = candles.timestamp.tolist()
+    else:
+        from candle_store import candle_time
+        times = [candle_time(c) for c in candles]
+    for t in reversed(times):
+        if t + period <= now:
+            return t
+    return None
+
+
+class BarCache:
+    """Latest result per symbol, valid while its last closed bar is still the newest closed bar."""
+
+    def __init__(self, period: float):
+        self.period = period
+        self._results: Dict[Hashable, Tuple[float, object]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def expected_bar(self, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        return (now // self.period) * self.period - self.period
+
+    def get(self, key: Hashable, now: Optional[float] = None):
+        entry = self._results.get(key)
+        if entry is not None and entry[0] >= self.expected_bar(now):
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return MISS
+
+    def put(self, key: Hashable, bar_time: Optional[float], value):
+        if bar_time is not None:
+            self._results[key] = (bar_time, value)
+
+    def stats(self) -> Dict:
+        return {"entries": len(self._results), "hits": self.hits, "misses": self.misses}
+
+
+class SignalDeduper:
+    """First sighting of a setup key within ttl seconds wins; repeats are suppressed."""
+
+    def __init__(self, ttl: float = 86400.0):
+        self.ttl = ttl
+        self._seen: Dict[Hashable, float] = {}
+        self.suppressed = 0
+
+    def first(self, key: Hashable, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        if len(self._seen) > 1024:
+            self._seen = {k: t for k, t in self._seen.items() if now - t < self.ttl}
+        seen = self._seen.get(key)
+        if seen is not None and now - seen < self.ttl:
+            self.suppressed += 1
+            return False
+        self._seen[key] = now
+        return True
+
+    def stats(self) -> Dict:
+        return {"tracked": len(self._seen), "suppressed": self.suppressed}
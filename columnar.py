@@ -0,0 +1,50 @@
+""" Columnar candle representation - contiguous float64 arrays built once per fetch """
+
+from typing import Dict, List
+import numpy as np
+from candle_store import candle_time
+
+
+class CandleArray:
+    __slots__ = ("open", "high", "low", "close", "volume", "timestamp")
+
+    def __init__(self, open, high, low, close, volume, timestamp):
+        self.open = np.ascontiguousarray(open, dtype=np.float64)
+        self.high = np.ascontiguousarray(high, dtype=np.float64)
+        self.low = np.ascontiguousarray(low, dtype=np.float64)
+        self.close = np.ascontiguousarray(close, dtype=np.float64)
+        self.volume = np.ascontiguousarray(volume, dtype=np.float64)
+        self.timestamp = np.ascontiguousarray(timestamp, dtype=np.float64)
+
+    @classmethod
+    def from_candles(cls, candles: List[Dict]) -> "CandleArray":
+        n = len(candles)
+        return cls(
+            np.fromiter((c["open"] for c in candles), np.float64, n),
+            np.fromiter((c["high"] for c in candles), np.float64, n),
+            np.fromiter((c["low"] for c in candles), np.float64, n),
+            np.fromiter((c["close"] for c in candles), np.float64, n),
+            np.fromiter((c.get("volume", 0) for c in candles), np.float64, n),
+            np.fromiter((candle_time(c) for c in candles), np.float64, n)
+        )
+
+    def to_candles(self) -> List[Dict]:
+        return [
+            {"time": int(t), "open": o, "high": h, "low": l, "close": c, "volume": v}
+            for t, o, h, l, c, v in zip(
+                self.timestamp.tolist(), self.open.tolist(), self.high.tolist(),
+                self.low.tolist(), self.close.tolist(), self.volume.tolist()
+            )
+        ]
+
+    def __len__(self) -> int:
+        return self.close.shape[0]
+
+    def __getitem__(self, index: slice) -> "CandleArray":
+        # Slices are views, no copy
+        if not isinstance(index, slice):
+            raise TypeError("CandleArray only supports slicing")
+        return CandleArray(
+            self.open[index], self.high[index], self.low[index],
+            self.close[index], self.volume[index], self.timestamp[index]
+        )
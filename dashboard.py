@@ -1,3 +1,4 @@
+import os
 import streamlit as st
 import requests
 
@@ -12,5 +13,5 @@ target = st.sidebar.number_input("Target")
 
 if st.button("Send Signal"):
     data = {"product_id": product_id, "size": size, "side": side, "entry": entry, "stop": stop, "target": target}
-    resp = requests.post("https://your-railway-app-url/webhook", json=data)
+    resp = requests.post("https://your-railway-app-url/webhook", json=data, headers={"X-Webhook-Secret": os.getenv("WEBHOOK_SECRET", "")})
     st.write("Trade Response:", resp.json())
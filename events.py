@@ -0,0 +1,75 @@
+""" Server-sent event hub - serialize once, fan out to every dashboard connection """
+
+import asyncio
+import json
+from typing import AsyncIterator, Callable, Dict, Optional, Set
+
+def _default(value):
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def format_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=_default)}\n\n"
+
+
+class EventHub:
+    def __init__(self, queue_size: int = 100, heartbeat: float = 15.0):
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, event: str, data):
+        """Never blocks: a slow client loses its oldest frames, not everyone else's latency.
+
+        Safe from any thread: asyncio queues are not, so off the subscribers' loop the
+        frame is handed to it with call_soon_threadsafe.
+        """
+        if not self._subscribers:
+            return
+        frame = format_event(event, data)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if self._loop is not None and running is not self._loop:
+            try:
+                self._loop.call_soon_threadsafe(self._deliver, frame)
+            except RuntimeError:
+                # Loop already closed: nobody left to deliver to
+                pass
+            return
+        self._deliver(frame)
+
+    def _deliver(self, frame: str):
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(frame)
+        self.published += 1
+
+    async def stream(self, snapshot: Optional[Callable[[], Dict]] = None) -> AsyncIterator[str]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._loop = asyncio.get_running_loop()
+        self._subscribers.add(queue)
+        try:
+            if snapshot is not None:
+                yield format_event("snapshot", snapshot())
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    # Comment frame keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+        finally:
+            self._subscribers.discard(queue)
+
+    def stats(self) -> Dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped": self.dropped
+        }
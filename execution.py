@@ -0,0 +1,306 @@
+""" Order execution pipeline - async submission queue, parallel bracket legs, tick-to-submit / submit-to-ack latency """
+
+import asyncio
+import itertools
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+from metrics import ORDER_LATENCY, ORDERS
+import logging
+
+logger = logging.getLogger(__name__)
+
+ENTRY = "entry"
+STOP_LOSS = "stop_loss"
+TAKE_PROFIT = "take_profit"
+FLATTEN = "flatten"
+
+ACCEPTED = "accepted"
+PARTIAL = "partial"          # a protective leg refused and the position could not be closed, or the limit entry pulled
+FLATTENED = "flattened"      # entry in, a protective leg refused: the position was closed again
+REJECTED = "rejected"        # nothing open: the entry was refused, or pulled unfilled with its bracket
+
+
+class OrderRejected(Exception):
+    """The exchange answered but refused the order."""
+
+
+def bracket_orders(
+    size: int,
+    side: str,
+    entry: Optional[float] = None,
+    stop: Optional[float] = None,
+    target: Optional[float] = None,
+    product_id: Optional[int] = None,
+    product_symbol: Optional[str] = None
+) -> List[Dict]:
+    """Delta /v2/orders payloads: entry (limit, or market without a price) plus reduce-only SL / TP legs."""
+    product = {"product_id": product_id} if product_id is not None else {"product_symbol": product_symbol}
+    exit_side = "sell" if side == "buy" else "buy"
+    legs = [dict(
+        product, leg=ENTRY, size=size, side=side,
+        **({"order_type": "limit_order", "limit_price": str(entry)} if entry is not None else {"order_type": "market_order"})
+    )]
+    if stop is not None:
+        legs.append(dict(
+            product, leg=STOP_LOSS, size=size, side=exit_side, order_type="market_order",
+            stop_order_type="stop_loss_order", stop_price=str(stop), reduce_only=True
+        ))
+    if target is not None:
+        legs.append(dict(
+            product, leg=TAKE_PROFIT, size=size, side=exit_side, order_type="limit_order", limit_price=str(target),
+            stop_order_type="take_profit_order", stop_price=str(target), reduce_only=True
+        ))
+    return legs
+
+
+def flatten_order(entry_leg: Dict, size: Optional[int] = None) -> Dict:
+    """Reduce-only market order closing what the entry leg filled (all of it unless size says less)."""
+    product = {k: entry_leg[k] for k in ("product_id", "product_symbol") if k in entry_leg}
+    exit_side = "sell" if entry_leg["side"] == "buy" else "buy"
+    size = entry_leg["size"] if size is None else size
+    return dict(product, leg=FLATTEN, size=size, side=exit_side, order_type="market_order", reduce_only=True)
+
+
+def filled_size(order: Dict) -> Optional[int]:
+    """Contracts filled according to an exchange order record, None when it does not say."""
+    if order.get("size") is None or order.get("unfilled_size") is None:
+        return None
+    return int(order["size"]) - int(order["unfilled_size"])
+
+
+class Order:
+    __slots__ = ("id", "legs", "tick_time", "queued_at", "submitted_at", "acked_at",
+                 "tick_to_submit", "submit_to_ack", "status", "results", "done")
+
+    def __init__(self, order_id: int, legs: List[Dict], tick_time: Optional[float]):
+        self.id = order_id
+        self.legs = legs
+        self.tick_time = tick_time
+        self.queued_at = time.time()
+        self.submitted_at: Optional[float] = None
+        self.acked_at: Optional[float] = None
+        self.tick_to_submit: Optional[float] = None
+        self.submit_to_ack: Optional[float] = None
+        self.status = "queued"
+        self.results: List[Dict] = []
+        self.done = asyncio.get_running_loop().create_future()
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "legs": self.results or [{"leg": leg["leg"]} for leg in self.legs],
+            "tick_to_submit_ms": None if self.tick_to_submit is None else round(self.tick_to_submit * 1000, 3),
+            "submit_to_ack_ms": None if self.submit_to_ack is None else round(self.submit_to_ack * 1000, 3),
+            "queued_at": self.queued_at,
+            "submitted_at": self.submitted_at,
+            "acked_at": self.acked_at
+        }
+
+
+class ExecutionQueue:
+    """Orders are accepted instantly and sent by a few workers over the client's pooled connection.
+
+    client needs async place_order(payload) -> exchange order (raising on rejection)
+    and cancel_order(order_id, product_id / product_symbol). A protective leg the exchange
+    refuses is retried protect_retries times; if it still fails, the entry is cancelled and
+    the position closed with a reduce-only market order. alert(text) hears about both.
+    """
+
+    def __init__(
+        self,
+        client,
+        workers: int = 4,
+        max_pending: int = 1000,
+        history: int = 200,
+        protect_retries: int = 2,
+        alert: Optional[Callable[[str], None]] = None
+    ):
+        self.client = client
+        self.workers = workers
+        self.protect_retries = protect_retries
+        self.alert = alert
+        self.max_pending = max_pending
+        self.history: deque = deque(maxlen=history)
+        self._ids = itertools.count(1)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self.submitted = 0
+        self.accepted = 0
+        self.partial = 0
+        self.flattened = 0
+        self.rejected = 0
+
+    @property
+    def running(self) -> bool:
+        return any(not t.done() for t in self._tasks)
+
+    def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(self.max_pending)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 5.0):
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Execution queue stopped with {self._queue.qsize()} orders unsent")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, legs: List[Dict], tick_time: Optional[float] = None) -> Order:
+        """Enqueue one bracket; raises asyncio.QueueFull when max_pending orders are waiting."""
+        if not self.running:
+            self.start()
+        order = Order(next(self._ids), legs, tick_time)
+        self._queue.put_nowait(order)
+        self.history.append(order)
+        return order
+
+    async def _worker(self):
+        while True:
+            order = await self._queue.get()
+            try:
+                await self._execute(order)
+            except Exception as e:
+                logger.error(f"Order {order.id} failed: {e}")
+                order.status = REJECTED
+            finally:
+                if not order.done.done():
+                    order.done.set_result(order)
+                self._queue.task_done()
+
+    async def _execute(self, order: Order):
+        order.submitted_at = time.time()
+        if order.tick_time is not None:
+            order.tick_to_submit = max(0.0, order.submitted_at - order.tick_time)
+            ORDER_LATENCY.observe("tick_to_submit", value=order.tick_to_submit)
+        started = time.perf_counter()
+        self.submitted += 1
+        # All legs at once: the bracket costs one round trip, not three
+        order.results = await asyncio.gather(*(self._place(leg) for leg in order.legs))
+        order.submit_to_ack = time.perf_counter() - started
+        order.acked_at = time.time()
+        ORDER_LATENCY.observe("submit_to_ack", value=order.submit_to_ack)
+        ok = [r for r in order.results if r["status"] == ACCEPTED]
+        entry_ok = any(r["leg"] == ENTRY for r in ok)
+        if entry_ok and len(ok) == len(order.results):
+            order.status = ACCEPTED
+            self.accepted += 1
+        elif entry_ok:
+            await self._protect(order)
+        else:
+            # Never leave protective legs working without the position they protect
+            await self._cancel(order, ok)
+            order.status = REJECTED
+            self.rejected += 1
+
+    async def _protect(self, order: Order):
+        # Never leave a position without its stop: retry the refused legs, else take it back off
+        legs = {leg["leg"]: leg for leg in order.legs}
+        for i, result in enumerate(order.results):
+            for attempt in range(1, self.protect_retries + 1):
+                if result["status"] == ACCEPTED:
+                    break
+                result = order.results[i] = dict(await self._place(legs[result["leg"]]), retries=attempt)
+        if all(r["status"] == ACCEPTED for r in order.results):
+            order.status = ACCEPTED
+            self.accepted += 1
+            return
+        refused = ", ".join(f"{r['leg']} ({r.get('error')})" for r in order.results if r["status"] != ACCEPTED)
+        entry = legs[ENTRY]
+        entry_result = next(r for r in order.results if r["leg"] == ENTRY)
+        target = entry.get("product_symbol", entry.get("product_id"))
+        limit = "limit_price" in entry
+        # A market entry has filled already; a limit one may still fill later, unprotected
+        working = [r for r in order.results if r["status"] == ACCEPTED
+                   and (r["leg"] != ENTRY or limit and r.get("filled") != entry["size"])]
+        await self._cancel(order, working)
+        if entry_result in working and entry_result["status"] == ACCEPTED:
+            order.status = PARTIAL
+            self.partial += 1
+            self._alert(
+                f"🚨 Order {order.id} {target}: {refused} refused and the limit entry could not be cancelled. "
+                f"POSITION MAY OPEN UNPROTECTED"
+            )
+            return
+        filled = entry_result.get("filled") if limit else entry["size"]
+        if not filled:
+            # Nothing was bought: pulling the bracket is the whole fix, a reduce-only close would only be refused
+            order.status = REJECTED
+            self.rejected += 1
+            logger.warning(f"Order {order.id} {target}: {refused} refused before the entry filled, bracket cancelled")
+            return
+        flatten = await self._place(flatten_order(entry, filled))
+        order.results.append(flatten)
+        if flatten["status"] == ACCEPTED:
+            order.status = FLATTENED
+            self.flattened += 1
+            self._alert(f"⚠️ Order {order.id} {target}: {refused} refused, position flattened")
+        else:
+            order.status = PARTIAL
+            self.partial += 1
+            self._alert(
+                f"🚨 Order {order.id} {target}: {refused} refused and the close failed "
+                f"({flatten.get('error')}). POSITION UNPROTECTED"
+            )
+
+    def _alert(self, text: str):
+        logger.error(text)
+        if self.alert is not None:
+            try:
+                self.alert(text)
+            except Exception as e:
+                logger.error(f"Execution alert failed: {e}")
+
+    async def _place(self, leg: Dict) -> Dict:
+        payload = {k: v for k, v in leg.items() if k != "leg"}
+        started = time.perf_counter()
+        try:
+            result = await self.client.place_order(payload)
+            status = ACCEPTED
+            detail = {"exchange_id": result.get("id"), "state": result.get("state"), "filled": filled_size(result)}
+        except Exception as e:
+            status = REJECTED
+            detail = {"error": str(e) or e.__class__.__name__}
+        ack = time.perf_counter() - started
+        ORDER_LATENCY.observe("leg_ack", value=ack)
+        ORDERS.inc(leg["leg"], status)
+        return dict(detail, leg=leg["leg"], status=status, ack_ms=round(ack * 1000, 3))
+
+    async def _cancel(self, order: Order, accepted: List[Dict]):
+        legs = {leg["leg"]: leg for leg in order.legs}
+        for result in accepted:
+            leg = legs[result["leg"]]
+            try:
+                cancelled = await self.client.cancel_order(
+                    result["exchange_id"],
+                    product_id=leg.get("product_id"),
+                    product_symbol=leg.get("product_symbol")
+                )
+                result["status"] = "cancelled"
+                # A limit entry may have filled in part before the cancel landed
+                if filled_size(cancelled) is not None:
+                    result["filled"] = filled_size(cancelled)
+            except Exception as e:
+                logger.error(f"Could not cancel {result['leg']} of order {order.id}: {e}")
+
+    def recent(self, limit: int = 50) -> List[Dict]:
+        return [order.to_dict() for order in list(self.history)[-limit:]][::-1]
+
+    def stats(self) -> Dict:
+        return {
+            "running": self.running,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "submitted": self.submitted,
+            "accepted": self.accepted,
+            "partial": self.partial,
+            "flattened": self.flattened,
+            "rejected": self.rejected
+        }
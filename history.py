@@ -0,0 +1,259 @@
+""" Local candle history - memory-mapped columnar files per symbol/resolution, paginated resumable download
+
+    python history.py download BTCUSD 1 2024-01-01 [2025-01-01]
+    python history.py info BTCUSD 1
+"""
+
+import asyncio
+import json
+import os
+import random
+import shutil
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from candle_store import candle_time
+from columnar import CandleArray
+from scheduler import BACKFILL
+from timeframes import SECONDS
+import logging
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = CandleArray.__slots__
+DTYPE = np.dtype("<f8")
+# Under the root, beside the symbols: symbols may not start with "."
+STAGING = ".staging"
+
+
+class HistoryStore:
+    """One directory per (symbol, resolution) holding one raw float64 file per column.
+
+    Files are append-only and sorted by timestamp, so a range lookup is two binary
+    searches on the mapped timestamp column and load() returns views into the page
+    cache - nothing is read into RAM until it is touched.
+    """
+
+    def __init__(self, root: str = "history"):
+        self.root = root
+        self._maps: Dict[Tuple[str, str], Tuple[int, CandleArray]] = {}
+
+    def path(self, symbol: str, resolution: str) -> str:
+        if not symbol or os.sep in symbol or symbol.startswith("."):
+            raise ValueError(f"Invalid symbol: {symbol!r}")
+        return os.path.join(self.root, symbol, resolution)
+
+    def count(self, symbol: str, resolution: str) -> int:
+        # Shortest column wins: a write interrupted between columns leaves no partial row visible
+        directory = self.path(symbol, resolution)
+        sizes = []
+        for column in COLUMNS:
+            file = os.path.join(directory, f"{column}.f64")
+            sizes.append(os.path.getsize(file) if os.path.exists(file) else 0)
+        return min(sizes) // DTYPE.itemsize
+
+    def _mapped(self, symbol: str, resolution: str) -> CandleArray:
+        key = (symbol, resolution)
+        n = self.count(symbol, resolution)
+        cached = self._maps.get(key)
+        if cached is not None and cached[0] == n:
+            return cached[1]
+        directory = self.path(symbol, resolution)
+        if n == 0:
+            candles = CandleArray(*([] for _ in COLUMNS))
+        else:
+            candles = CandleArray(*(
+                np.memmap(os.path.join(directory, f"{column}.f64"), dtype=DTYPE, mode="r", shape=(n,))
+                for column in COLUMNS
+            ))
+        self._maps[key] = (n, candles)
+        return candles
+
+    def bounds(self, symbol: str, resolution: str) -> Optional[Tuple[int, int]]:
+        candles = self._mapped(symbol, resolution)
+        if len(candles) == 0:
+            return None
+        return int(candles.timestamp[0]), int(candles.timestamp[-1])
+
+    def load(self, symbol: str, resolution: str, start: Optional[int] = None, end: Optional[int] = None) -> CandleArray:
+        """Bars with start <= time <= end as zero-copy views; O(log n) to locate the range."""
+        candles = self._mapped(symbol, resolution)
+        lo = 0 if start is None else int(np.searchsorted(candles.timestamp, start, side="left"))
+        hi = len(candles) if end is None else int(np.searchsorted(candles.timestamp, end, side="right"))
+        return candles[lo:hi]
+
+    def append(self, symbol: str, resolution: str, candles: List[Dict]) -> int:
+        """Append bars newer than the stored tail; older or duplicate bars are ignored."""
+        bounds = self.bounds(symbol, resolution)
+        last = bounds[1] if bounds else None
+        rows = sorted((c for c in candles if last is None or candle_time(c) > last), key=candle_time)
+        unique = []
+        for c in rows:
+            if not unique or candle_time(c) > candle_time(unique[-1]):
+                unique.append(c)
+        if not unique:
+            return 0
+        directory = self.path(symbol, resolution)
+        os.makedirs(directory, exist_ok=True)
+        self._repair(symbol, resolution)
+        batch = CandleArray.from_candles(unique)
+        for column in COLUMNS:
+            with open(os.path.join(directory, f"{column}.f64"), "ab") as f:
+                f.write(getattr(batch, column).astype(DTYPE, copy=False).tobytes())
+        return len(unique)
+
+    def prepend(self, symbol: str, resolution: str, candles: List[Dict]) -> int:
+        """Bars older than the stored head; rewrites the files once, then swaps them in atomically."""
+        bounds = self.bounds(symbol, resolution)
+        if bounds is None:
+            return self.append(symbol, resolution, candles)
+        first = bounds[0]
+        rows = {candle_time(c): c for c in candles if candle_time(c) < first}
+        if not rows:
+            return 0
+        return self._prepend_array(symbol, resolution, CandleArray.from_candles([rows[t] for t in sorted(rows)]))
+
+    def _prepend_array(self, symbol: str, resolution: str, head: CandleArray) -> int:
+        # head is sorted and ends before the stored first bar
+        if len(head) == 0:
+            return 0
+        existing = self._mapped(symbol, resolution)
+        directory = self.path(symbol, resolution)
+        for column in COLUMNS:
+            file = os.path.join(directory, f"{column}.f64")
+            with open(file + ".tmp", "wb") as f:
+                f.write(np.asarray(getattr(head, column)).astype(DTYPE, copy=False).tobytes())
+                f.write(np.asarray(getattr(existing, column)).tobytes())
+        self._maps.pop((symbol, resolution), None)
+        for column in COLUMNS:
+            file = os.path.join(directory, f"{column}.f64")
+            os.replace(file + ".tmp", file)
+        return len(head)
+
+    def _repair(self, symbol: str, resolution: str):
+        # Trim columns left longer than the others by an interrupted append
+        n = self.count(symbol, resolution) * DTYPE.itemsize
+        directory = self.path(symbol, resolution)
+        for column in COLUMNS:
+            file = os.path.join(directory, f"{column}.f64")
+            if os.path.exists(file) and os.path.getsize(file) > n:
+                with open(file, "r+b") as f:
+                    f.truncate(n)
+
+    def info(self, symbol: str, resolution: str) -> Dict:
+        bounds = self.bounds(symbol, resolution)
+        return {
+            "symbol": symbol,
+            "resolution": resolution,
+            "bars": self.count(symbol, resolution),
+            "first": bounds[0] if bounds else None,
+            "last": bounds[1] if bounds else None
+        }
+
+    async def download(
+        self,
+        client,
+        symbol: str,
+        resolution: str,
+        start: int,
+        end: Optional[int] = None,
+        page_size: int = 2000,
+        max_retries: int = 5
+    ) -> int:
+        """Fill [start, end] from client.fetch_candles, one page-sized range request at a time.
+
+        Every page is written before the next is requested, so an interrupted download
+        resumes from the stored tail. Bars before the stored head are paged forward into a
+        staging store the same way and prepended in one rewrite once complete. Only closed
+        bars are stored. Returns bars added.
+        """
+        seconds = SECONDS[resolution]
+        now = int(time.time())
+        # The bar containing `now` is still forming
+        end = min(end if end is not None else now, (now // seconds) * seconds - seconds)
+        start = (start // seconds) * seconds
+        added = 0
+        bounds = self.bounds(symbol, resolution)
+        if bounds is not None and start < bounds[0]:
+            added += await self._download_head(client, symbol, resolution, start, bounds[0] - seconds, page_size, max_retries)
+            bounds = self.bounds(symbol, resolution)
+        cursor = start if bounds is None else max(start, bounds[1] + seconds)
+        while cursor <= end:
+            window_end = min(end, cursor + (page_size - 1) * seconds)
+            page = await self._fetch_page(client, symbol, resolution, cursor, window_end, page_size, max_retries)
+            added += self.append(symbol, resolution, [c for c in page if cursor <= candle_time(c) <= window_end])
+            cursor = window_end + seconds
+        logger.info(f"History {symbol}/{resolution}: +{added} bars, {self.count(symbol, resolution)} stored")
+        return added
+
+    async def _download_head(self, client, symbol, resolution, start, end, page_size, max_retries) -> int:
+        seconds = SECONDS[resolution]
+        staging = HistoryStore(os.path.join(self.root, STAGING))
+        directory = staging.path(symbol, resolution)
+        marker = os.path.join(directory, "range.json")
+        staged_from = None
+        if os.path.exists(marker):
+            with open(marker) as f:
+                staged_from = json.load(f)["start"]
+        if staged_from is None or staged_from > start:
+            # Nothing staged, or staged for a later start: the bars in between were never asked for
+            shutil.rmtree(directory, ignore_errors=True)
+            os.makedirs(directory)
+            with open(marker, "w") as f:
+                json.dump({"start": start}, f)
+            staged_from = start
+        bounds = staging.bounds(symbol, resolution)
+        cursor = staged_from if bounds is None else bounds[1] + seconds
+        while cursor <= end:
+            window_end = min(end, cursor + (page_size - 1) * seconds)
+            page = await self._fetch_page(client, symbol, resolution, cursor, window_end, page_size, max_retries)
+            staging.append(symbol, resolution, [c for c in page if cursor <= candle_time(c) <= window_end])
+            cursor = window_end + seconds
+        added = self._prepend_array(symbol, resolution, staging.load(symbol, resolution))
+        shutil.rmtree(directory)
+        return added
+
+    @staticmethod
+    async def _fetch_page(client, symbol, resolution, start, end, page_size, max_retries) -> List[Dict]:
+        backoff = 1.0
+        for attempt in range(max_retries + 1):
+            try:
+                # Lowest lane: a download shares the rate limit with live trading without crowding it out
+                return await client.fetch_candles(symbol, resolution, page_size, start=start, end=end, lane=BACKFILL)
+            except Exception as e:
+                if attempt == max_retries:
+                    raise
+                logger.warning(f"History page {symbol}/{resolution} {start}-{end} failed ({e}), retrying")
+                await asyncio.sleep(backoff + random.uniform(0, 0.1 * backoff))
+                backoff = min(backoff * 2, 30.0)
+        return []
+
+
+def _timestamp(value: str) -> int:
+    if value.isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp())
+
+
+async def _main(argv: List[str]):
+    from app import AsyncDeltaClient, Config, RequestScheduler
+    store = HistoryStore(Config.HISTORY_DIR)
+    command, symbol, resolution = argv[0], argv[1], argv[2]
+    if command == "download":
+        scheduler = RequestScheduler(Config.DELTA_RATE_LIMIT, Config.DELTA_RATE_BURST, max_retries=Config.DELTA_MAX_RETRIES)
+        client = AsyncDeltaClient(
+            Config.DELTA_API_KEY, Config.DELTA_API_SECRET, base_url=Config.DELTA_BASE_URL, scheduler=scheduler
+        )
+        try:
+            end = _timestamp(argv[4]) if len(argv) > 4 else None
+            await store.download(client, symbol, resolution, _timestamp(argv[3]), end)
+        finally:
+            await client.aclose()
+    print(json.dumps(store.info(symbol, resolution)))
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(sys.argv[1:]))
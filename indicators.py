@@ -0,0 +1,183 @@
+""" Rolling indicators - true range, Wilder ATR, SuperTrend with carried bands, volume SMA
+
+Each indicator has a full-series function (one pass over NumPy arrays) and an
+incremental class whose update() is O(1) per bar and whose state() / from_state()
+round-trip through plain dicts so a series can resume from saved state.
+"""
+
+import math
+from collections import deque
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+
+# ---------- full series ----------
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    tr = high - low
+    if len(tr) > 1:
+        prev = close[:-1]
+        tr[1:] = np.maximum(tr[1:], np.maximum(np.abs(high[1:] - prev), np.abs(low[1:] - prev)))
+    return tr
+
+
+def wilder_atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int = 14) -> np.ndarray:
+    """Seeded with the mean of the first `length` true ranges, NaN before that."""
+    tr = true_range(high, low, close)
+    n = len(tr)
+    atr = np.full(n, np.nan)
+    if n < length:
+        return atr
+    atr[length - 1] = tr[:length].mean()
+    alpha = 1.0 / length
+    decay = 1.0 - alpha
+    if decay == 0.0:
+        atr[length - 1:] = tr[length - 1:]
+        return atr
+    # atr[i] = decay * atr[i-1] + alpha * tr[i], solved in closed form per block;
+    # blocks are short enough that decay**-block stays far from overflow
+    block = max(1, min(4096, int(460 / -math.log(decay))))
+    prev = atr[length - 1]
+    i = length
+    while i < n:
+        chunk = tr[i:i + block]
+        powers = decay ** np.arange(1, len(chunk) + 1)
+        values = powers * (prev + alpha * np.cumsum(chunk / powers))
+        atr[i:i + len(chunk)] = values
+        prev = values[-1]
+        i += len(chunk)
+    return atr
+
+
+def sma(values: np.ndarray, length: int) -> np.ndarray:
+    out = np.full(len(values), np.nan)
+    if len(values) >= length:
+        sums = np.cumsum(np.concatenate(([0.0], values)))
+        out[length - 1:] = (sums[length:] - sums[:-length]) / length
+    return out
+
+
+def supertrend(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    length: int = 10,
+    multiplier: float = 3.0
+) -> Dict[str, np.ndarray]:
+    """SuperTrend on Wilder ATR. Bands only tighten until price closes through them; trend is +1/-1."""
+    atr = wilder_atr(high, low, close, length)
+    hl2 = (high + low) / 2
+    basic_upper = (hl2 + multiplier * atr).tolist()
+    basic_lower = (hl2 - multiplier * atr).tolist()
+    closes = close.tolist()
+    mids = hl2.tolist()
+    n = len(closes)
+    upper = np.full(n, np.nan)
+    lower = np.full(n, np.nan)
+    trend = np.zeros(n, dtype=np.int64)
+    # Band recursion is path dependent, so it is one scalar pass over the vectorized inputs
+    state = None
+    for i in range(length - 1, n):
+        state = _supertrend_step(state, basic_upper[i], basic_lower[i], closes[i], mids[i])
+        upper[i], lower[i], trend[i] = state[0], state[1], state[2]
+    return {"atr": atr, "upper": upper, "lower": lower, "trend": trend}
+
+
+def _supertrend_step(state: Optional[Tuple], basic_upper: float, basic_lower: float, close: float, hl2: float) -> Tuple:
+    # state = (upper, lower, trend, prev_close)
+    if state is None:
+        return basic_upper, basic_lower, (1 if close >= hl2 else -1), close
+    upper, lower, trend, prev_close = state
+    upper = basic_upper if basic_upper < upper or prev_close > upper else upper
+    lower = basic_lower if basic_lower > lower or prev_close < lower else lower
+    if trend == 1:
+        trend = -1 if close < lower else 1
+    else:
+        trend = 1 if close > upper else -1
+    return upper, lower, trend, close
+
+
+# ---------- incremental ----------
+class ATR:
+    def __init__(self, length: int = 14):
+        self.length = length
+        self.count = 0
+        self.prev_close: Optional[float] = None
+        self.warmup = 0.0
+        self.value: Optional[float] = None
+
+    def update(self, high: float, low: float, close: float) -> Optional[float]:
+        tr = high - low
+        if self.prev_close is not None:
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        self.count += 1
+        if self.value is not None:
+            self.value = (self.value * (self.length - 1) + tr) / self.length
+        else:
+            self.warmup += tr
+            if self.count == self.length:
+                self.value = self.warmup / self.length
+        return self.value
+
+    def state(self) -> Dict:
+        return {"length": self.length, "count": self.count, "prev_close": self.prev_close,
+                "warmup": self.warmup, "value": self.value}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "ATR":
+        atr = cls(state["length"])
+        atr.count, atr.prev_close = state["count"], state["prev_close"]
+        atr.warmup, atr.value = state["warmup"], state["value"]
+        return atr
+
+
+class SuperTrend:
+    def __init__(self, length: int = 10, multiplier: float = 3.0):
+        self.multiplier = multiplier
+        self.atr = ATR(length)
+        self.bands: Optional[Tuple] = None
+
+    def update(self, high: float, low: float, close: float) -> Optional[Dict]:
+        atr = self.atr.update(high, low, close)
+        if atr is None:
+            return None
+        hl2 = (high + low) / 2
+        self.bands = _supertrend_step(
+            self.bands, hl2 + self.multiplier * atr, hl2 - self.multiplier * atr, close, hl2
+        )
+        return {"atr": atr, "upper": self.bands[0], "lower": self.bands[1], "trend": self.bands[2]}
+
+    def state(self) -> Dict:
+        return {"multiplier": self.multiplier, "atr": self.atr.state(),
+                "bands": list(self.bands) if self.bands else None}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "SuperTrend":
+        st = cls(state["atr"]["length"], state["multiplier"])
+        st.atr = ATR.from_state(state["atr"])
+        st.bands = tuple(state["bands"]) if state["bands"] else None
+        return st
+
+
+class SMA:
+    def __init__(self, length: int = 20):
+        self.length = length
+        self.window = deque(maxlen=length)
+        self.total = 0.0
+
+    def update(self, value: float) -> Optional[float]:
+        if len(self.window) == self.length:
+            self.total -= self.window[0]
+        self.window.append(value)
+        self.total += value
+        return self.total / self.length if len(self.window) == self.length else None
+
+    def state(self) -> Dict:
+        return {"length": self.length, "window": list(self.window), "total": self.total}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "SMA":
+        s = cls(state["length"])
+        s.window.extend(state["window"])
+        s.total = state["total"]
+        return s
@@ -0,0 +1,241 @@
+""" Append-only trade journal - SQLite WAL event log + periodic snapshots, replayed at startup """
+
+import json
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+SIGNAL = "signal"
+OPEN = "open"
+CLOSE = "close"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (seq INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL NOT NULL, kind TEXT NOT NULL, payload TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS snapshots (seq INTEGER PRIMARY KEY, ts REAL NOT NULL, state TEXT NOT NULL);
+"""
+
+
+def empty_state() -> Dict:
+    return {"active_trades": {}, "brain": None, "risk": None, "signals": 0}
+
+
+def apply(state: Dict, kind: str, payload: Dict) -> Dict:
+    """Fold one event into the journal state; replay is this applied over the log tail."""
+    if kind == SIGNAL:
+        state["signals"] += 1
+    elif kind == OPEN:
+        state["active_trades"][payload["symbol"]] = payload["trade"]
+    elif kind == CLOSE:
+        state["active_trades"].pop(payload["symbol"], None)
+        if payload.get("brain") is not None:
+            state["brain"] = payload["brain"]
+        if payload.get("risk") is not None:
+            state["risk"] = payload["risk"]
+    return state
+
+
+def _default(value):
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+class TradeJournal:
+    def __init__(self, path: str, snapshot_every: int = 500, batch_size: int = 256, retain: int = 0):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        # Without snapshots nothing compacts the log; retain > 0 keeps only that many newest events
+        self.retain = retain
+        self.trimmed_seq = 0
+        self.batch_size = batch_size
+        self.state = empty_state()
+        self.last_seq = 0
+        self.snapshot_seq = 0
+        self.appended = 0
+        self.written = 0
+        self.snapshots = 0
+        self.replayed = 0
+        self.replay_ms = 0.0
+        self.failed = 0
+        self.last_error: Optional[str] = None
+        self._queue: "queue.SimpleQueue[Optional[Tuple[float, str, str]]]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: commits are durable against a process crash, fsync only at checkpoint
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def replay(self) -> Dict:
+        """Latest snapshot plus every event after it. Call before start()."""
+        started = time.perf_counter()
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT seq, state FROM snapshots ORDER BY seq DESC LIMIT 1").fetchone()
+            state, seq = (json.loads(row[1]), row[0]) if row else (empty_state(), 0)
+            self.snapshot_seq = seq
+            tail = conn.execute("SELECT seq, kind, payload FROM events WHERE seq > ? ORDER BY seq", (seq,)).fetchall()
+        finally:
+            conn.close()
+        for seq, kind, payload in tail:
+            apply(state, kind, json.loads(payload))
+        self.state = state
+        self.last_seq = tail[-1][0] if tail else seq
+        self.replayed = len(tail)
+        self.replay_ms = round((time.perf_counter() - started) * 1000, 3)
+        logger.info(f"Journal replayed {len(tail)} events after snapshot {self.snapshot_seq} in {self.replay_ms}ms")
+        return state
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if not self.running:
+            self._thread = threading.Thread(target=self._writer, name="trade-journal", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Flush what is queued, write a final snapshot and stop the writer."""
+        if self.running:
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def append(self, kind: str, payload: Dict):
+        """Never touches the disk: serialized here, written by the writer thread."""
+        if self._thread is not None and not self._thread.is_alive():
+            logger.error(f"Journal writer is not running ({self.last_error}): {kind} event not persisted")
+        self._queue.put((time.time(), kind, json.dumps(payload, default=_default)))
+        self.appended += 1
+
+    def record_signal(self, signal: Dict):
+        self.append(SIGNAL, signal)
+
+    def record_open(self, symbol: str, trade: Dict):
+        self.append(OPEN, {"symbol": symbol, "trade": trade})
+
+    def record_close(
+        self,
+        symbol: str,
+        exit_price: float,
+        profitable: bool,
+        brain: Optional[Dict] = None,
+        pnl: Optional[float] = None,
+        risk: Optional[Dict] = None
+    ):
+        self.append(CLOSE, {
+            "symbol": symbol, "exit_price": exit_price, "profitable": profitable, "pnl": pnl, "brain": brain, "risk": risk
+        })
+
+    def _writer(self):
+        try:
+            conn = self._connect()
+        except Exception as e:
+            self._failed(f"Journal writer could not open {self.path}", e)
+            return
+        try:
+            stopping = False
+            while not stopping:
+                batch: List[Tuple[float, str, str]] = []
+                item = self._queue.get()
+                while True:
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                if batch:
+                    self._write_batch(conn, batch)
+            if self.snapshot_every and self.last_seq > self.snapshot_seq:
+                self._snapshot(conn)
+        except Exception as e:
+            self._failed("Journal writer failed", e)
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[Tuple[float, str, str]]):
+        # One bad record must not stop the writer: a failed batch is retried record by record
+        try:
+            self._write(conn, batch)
+        except Exception as e:
+            if len(batch) == 1:
+                self.failed += 1
+                self._failed(f"Journal dropped a {batch[0][1]} event", e)
+                return
+            logger.error(f"Journal batch of {len(batch)} failed ({e}), writing them one by one")
+            for record in batch:
+                self._write_batch(conn, [record])
+            return
+        try:
+            self._compact(conn)
+        except Exception as e:
+            self._failed("Journal compaction failed", e)
+
+    def _failed(self, message: str, error: Exception):
+        self.last_error = f"{error.__class__.__name__}: {error}"
+        logger.error(f"{message}: {self.last_error}")
+
+    def _write(self, conn: sqlite3.Connection, batch: List[Tuple[float, str, str]]):
+        seqs = []
+        with conn:
+            for ts, kind, payload in batch:
+                seqs.append(conn.execute("INSERT INTO events (ts, kind, payload) VALUES (?, ?, ?)", (ts, kind, payload)).lastrowid)
+        # Folded only once committed: a rolled-back batch leaves the state as it was
+        for _, kind, payload in batch:
+            apply(self.state, kind, json.loads(payload))
+        self.last_seq = seqs[-1]
+        self.written += len(batch)
+
+    def _compact(self, conn: sqlite3.Connection):
+        # snapshot_every=0: log only, e.g. several workers appending whose folded states each miss the others' events
+        if self.snapshot_every and self.last_seq - self.snapshot_seq >= self.snapshot_every:
+            self._snapshot(conn)
+        elif self.retain and self.last_seq - self.retain - self.trimmed_seq >= max(1, self.retain // 10):
+            self._trim(conn)
+
+    def _trim(self, conn: sqlite3.Connection):
+        # seq is global across every worker appending to the file, so any of them can trim
+        cutoff = self.last_seq - self.retain
+        with conn:
+            conn.execute("DELETE FROM events WHERE seq <= ?", (cutoff,))
+        self.trimmed_seq = cutoff
+
+    def _snapshot(self, conn: sqlite3.Connection):
+        # Snapshot and compaction in one transaction: the log never loses events it still needs
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots (seq, ts, state) VALUES (?, ?, ?)",
+                (self.last_seq, time.time(), json.dumps(self.state, default=_default))
+            )
+            conn.execute("DELETE FROM snapshots WHERE seq < ?", (self.last_seq,))
+            conn.execute("DELETE FROM events WHERE seq <= ?", (self.last_seq,))
+        self.snapshot_seq = self.last_seq
+        self.snapshots += 1
+
+    def stats(self) -> Dict:
+        return {
+            "running": self.running,
+            "path": self.path,
+            "appended": self.appended,
+            "written": self.written,
+            "pending": self.appended - self.written - self.failed,
+            "failed": self.failed,
+            "last_error": self.last_error,
+            "last_seq": self.last_seq,
+            "snapshot_seq": self.snapshot_seq,
+            "snapshots": self.snapshots,
+            "trimmed_seq": self.trimmed_seq,
+            "replayed": self.replayed,
+            "replay_ms": self.replay_ms
+        }
@@ -0,0 +1,173 @@
+""" WebSocket market-data ingestion - Delta candle + ticker channels into in-process state """
+
+import asyncio
+import json
+import random
+import time
+from typing import Callable, Dict, List, Optional
+import websockets
+import logging
+
+logger = logging.getLogger(__name__)
+
+# REST resolution (as used by get_candles) -> Delta candlestick channel suffix
+RESOLUTIONS = {"1": "1m", "5": "5m", "15": "15m", "60": "1h", "240": "4h", "D": "1d"}
+
+
+def parse_candle(message: Dict) -> Dict:
+    start = int(message.get("candle_start_time", message.get("time", 0)))
+    # Delta streams microseconds, REST history uses seconds
+    if start > 10**12:
+        start //= 1_000_000
+    return {
+        "time": start,
+        "open": float(message["open"]),
+        "high": float(message["high"]),
+        "low": float(message["low"]),
+        "close": float(message["close"]),
+        "volume": float(message.get("volume", 0) or 0)
+    }
+
+
+class MarketFeed:
+    def __init__(
+        self,
+        url: str,
+        symbols: List[str],
+        candle_store,
+        resolution: str = "60",
+        stale_after: float = 30.0,
+        on_bar_close: Optional[Callable[[str, Dict], None]] = None,
+        on_ticker: Optional[Callable[[str, Dict], None]] = None,
+        min_backoff: float = 1.0,
+        max_backoff: float = 60.0
+    ):
+        self.url = url
+        self.symbols = list(symbols)
+        self.candle_store = candle_store
+        self.resolution = resolution
+        self.channel = f"candlestick_{RESOLUTIONS.get(resolution, resolution)}"
+        self.stale_after = stale_after
+        self.on_bar_close = on_bar_close
+        self.on_ticker = on_ticker
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.tickers: Dict[str, Dict] = {}
+        self._forming: Dict[str, Dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.connected = False
+        self.reconnects = 0
+        self.messages = 0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self):
+        backoff = self.min_backoff
+        while True:
+            try:
+                async with websockets.connect(self.url, ping_interval=20) as ws:
+                    await ws.send(json.dumps(self._subscription()))
+                    if self.reconnects:
+                        # The last bar before the drop may have closed unseen: refetch from it on next read
+                        for symbol in self.symbols:
+                            self.candle_store.invalidate(symbol, self.resolution)
+                    self.connected = True
+                    backoff = self.min_backoff
+                    logger.info(f"Market feed connected: {self.url}")
+                    async for raw in ws:
+                        self.handle(json.loads(raw))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Market feed disconnected: {e}")
+            finally:
+                self.connected = False
+            self.reconnects += 1
+            # Full jitter so a fleet of workers does not reconnect in lockstep
+            await asyncio.sleep(random.uniform(0, backoff))
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _subscription(self) -> Dict:
+        return {
+            "type": "subscribe",
+            "payload": {
+                "channels": [
+                    {"name": "v2/ticker", "symbols": self.symbols},
+                    {"name": self.channel, "symbols": self.symbols}
+                ]
+            }
+        }
+
+    def handle(self, message: Dict):
+        kind = message.get("type")
+        symbol = message.get("symbol")
+        if not symbol:
+            return
+        self.messages += 1
+        if kind == "v2/ticker":
+            ticker = dict(message, received_at=time.monotonic())
+            self.tickers[symbol] = ticker
+            if self.on_ticker:
+                self.on_ticker(symbol, ticker)
+        elif kind == self.channel:
+            candle = parse_candle(message)
+            forming = self._forming.get(symbol)
+            if forming is not None and candle["time"] > forming["time"] and self.on_bar_close:
+                self.on_bar_close(symbol, forming)
+            if forming is None or candle["time"] >= forming["time"]:
+                self._forming[symbol] = candle
+                self.candle_store.update(symbol, self.resolution, [candle])
+
+    def ticker(self, symbol: str) -> Optional[Dict]:
+        """Latest streamed ticker, or None when missing or older than stale_after."""
+        ticker = self.tickers.get(symbol)
+        if ticker is None or time.monotonic() - ticker["received_at"] > self.stale_after:
+            return None
+        return ticker
+
+    def forming(self, symbol: str) -> Optional[Dict]:
+        """The symbol's still-open bar as last streamed, None before the first candle message."""
+        return self._forming.get(symbol)
+
+    def stats(self) -> Dict:
+        return {
+            "connected": self.connected,
+            "reconnects": self.reconnects,
+            "messages": self.messages,
+            "symbols": len(self.tickers)
+        }
+
+
+async def serve_replay(path: str, host: str = "127.0.0.1", port: int = 8765, interval: float = 0.0):
+    """Local replay server: plays back a JSONL file of recorded feed messages to every subscriber."""
+    with open(path) as f:
+        messages = [line.strip() for line in f if line.strip()]
+
+    async def handler(ws, *args):
+        await ws.recv()  # subscription
+        for message in messages:
+            await ws.send(message)
+            if interval:
+                await asyncio.sleep(interval)
+        await ws.wait_closed()
+
+    async with websockets.serve(handler, host, port):
+        logger.info(f"Replaying {len(messages)} messages on ws://{host}:{port}")
+        await asyncio.Future()
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve_replay(sys.argv[1], port=int(sys.argv[2]) if len(sys.argv) > 2 else 8765))
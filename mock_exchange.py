@@ -0,0 +1,92 @@
+""" Local mock of Delta's order endpoints - verifies request signatures, acks after a configurable delay
+
+    MOCK_ACK_DELAY_MS=5 uvicorn mock_exchange:app --port 9001
+    DELTA_BASE_URL=http://127.0.0.1:9001 EXECUTION_ENABLED=true uvicorn app:app
+"""
+
+import asyncio
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import time
+from typing import Dict
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+API_KEY = os.getenv("MOCK_API_KEY", os.getenv("DELTA_API_KEY", ""))
+API_SECRET = os.getenv("MOCK_API_SECRET", os.getenv("DELTA_API_SECRET", ""))
+ACK_DELAY_MS = float(os.getenv("MOCK_ACK_DELAY_MS", "5"))
+# Symbols whose orders are refused, to exercise partial / rejected brackets
+REJECT_SYMBOLS = {s.strip() for s in os.getenv("MOCK_REJECT_SYMBOLS", "").split(",") if s.strip()}
+# stop_order_type values refused ("none": orders without one), to fail single bracket legs
+REJECT_STOP_TYPES = {s.strip() for s in os.getenv("MOCK_REJECT_STOP_TYPES", "").split(",") if s.strip()}
+# Limit orders fill on arrival instead of resting, as if marketable
+FILL_LIMIT_ORDERS = os.getenv("MOCK_FILL_LIMIT_ORDERS", "false").lower() == "true"
+SIGNATURE_WINDOW = 5
+
+app = FastAPI(title="Mock Delta Exchange")
+orders: Dict[int, Dict] = {}
+ids = itertools.count(1)
+
+
+def _error(status: int, code: str):
+    raise HTTPException(status, {"code": code})
+
+
+async def _verify(request: Request) -> str:
+    body = (await request.body()).decode()
+    timestamp = request.headers.get("timestamp", "")
+    if request.headers.get("api-key") != API_KEY:
+        _error(401, "invalid_api_key")
+    if not timestamp.isdigit() or abs(time.time() - int(timestamp)) > SIGNATURE_WINDOW:
+        _error(401, "expired_signature")
+    query = f"?{request.url.query}" if request.url.query else ""
+    message = request.method + timestamp + request.url.path + query + body
+    expected = hmac.new(API_SECRET.encode(), message.encode(), hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(expected, request.headers.get("signature", "")):
+        _error(401, "signature_mismatch")
+    return body
+
+
+@app.exception_handler(HTTPException)
+async def delta_error(request: Request, exc: HTTPException):
+    return JSONResponse({"success": False, "error": exc.detail}, status_code=exc.status_code)
+
+
+@app.post("/v2/orders")
+async def place_order(request: Request):
+    order = json.loads(await _verify(request))
+    await asyncio.sleep(ACK_DELAY_MS / 1000)
+    if order.get("product_symbol") in REJECT_SYMBOLS or str(order.get("product_id")) in REJECT_SYMBOLS:
+        _error(400, "insufficient_margin")
+    if order.get("stop_order_type", "none") in REJECT_STOP_TYPES:
+        _error(400, "invalid_stop_price")
+    if order.get("side") not in ("buy", "sell") or int(order.get("size", 0)) <= 0:
+        _error(400, "invalid_order")
+    order_id = next(ids)
+    size = int(order["size"])
+    if order.get("stop_order_type"):
+        state, unfilled = "pending", size
+    elif order.get("order_type") == "market_order" or FILL_LIMIT_ORDERS:
+        state, unfilled = "closed", 0
+    else:
+        state, unfilled = "open", size
+    orders[order_id] = dict(order, id=order_id, state=state, unfilled_size=unfilled, created_at=time.time())
+    return {"success": True, "result": orders[order_id]}
+
+
+@app.delete("/v2/orders")
+async def cancel_order(request: Request):
+    payload = json.loads(await _verify(request))
+    order = orders.get(payload.get("id"))
+    if order is None or order["state"] in ("closed", "cancelled"):
+        _error(404, "open_order_not_found")
+    order["state"] = "cancelled"
+    return {"success": True, "result": order}
+
+
+@app.get("/v2/orders")
+async def list_orders():
+    return {"success": True, "result": list(orders.values())}
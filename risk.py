@@ -0,0 +1,243 @@
+""" Risk and PnL - stop-distance sizing, per-trade / daily loss limits, O(1) mark-to-market with SL/TP exits """
+
+import math
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+STOP_LOSS = "stop_loss"
+TAKE_PROFIT = "take_profit"
+MANUAL = "manual"
+
+
+def utc_day(now: Optional[float] = None) -> str:
+    return datetime.fromtimestamp(time.time() if now is None else now, timezone.utc).strftime("%Y-%m-%d")
+
+
+def empty_ledger() -> Dict:
+    return {"day": utc_day(), "realized_today": 0.0, "realized_total": 0.0, "closed": 0}
+
+
+class Position:
+    __slots__ = ("symbol", "direction", "entry", "stop", "target", "size", "risk", "mark", "pnl")
+
+    def __init__(self, symbol: str, direction: int, entry: float, stop: float, target: float, size: float):
+        self.symbol = symbol
+        self.direction = direction
+        self.entry = entry
+        self.stop = stop
+        self.target = target
+        self.size = size
+        self.risk = abs(entry - stop) * size
+        self.mark = entry
+        self.pnl = 0.0
+
+    def pnl_at(self, price: float) -> float:
+        return (price - self.entry) * self.size * self.direction
+
+    def exit_reason(self, price: float) -> Optional[str]:
+        if self.direction > 0:
+            if price <= self.stop:
+                return STOP_LOSS
+            if price >= self.target:
+                return TAKE_PROFIT
+        else:
+            if price >= self.stop:
+                return STOP_LOSS
+            if price <= self.target:
+                return TAKE_PROFIT
+        return None
+
+    def to_dict(self) -> Dict:
+        return {
+            "symbol": self.symbol,
+            "direction": self.direction,
+            "entry": self.entry,
+            "stop": self.stop,
+            "target": self.target,
+            "size": self.size,
+            "risk": self.risk,
+            "mark": self.mark,
+            "unrealized_pnl": self.pnl
+        }
+
+
+class RiskEngine:
+    """One position per symbol, as in active_trades.
+
+    Every aggregate (unrealized PnL, open risk) is kept as a running total and adjusted
+    by the delta of the one position a tick touches, so a tick costs the same with one
+    open trade or a thousand. on_exit(symbol, price, reason) is called when a mark
+    crosses a stop or target; the caller closes the trade and reports back via close().
+    The daily ledger can live in a SharedState-like store (get / update) so every
+    worker enforces one daily loss limit.
+    """
+
+    LEDGER_KEY = "risk"
+
+    def __init__(
+        self,
+        capital: float,
+        max_risk_per_trade: float = 0.02,
+        daily_loss_limit: float = 0.05,
+        leverage: float = 1.0,
+        on_exit: Optional[Callable[[str, float, str], None]] = None,
+        store=None,
+        lots: Optional[Dict[str, float]] = None
+    ):
+        self.capital = capital
+        self.max_risk_per_trade = max_risk_per_trade
+        self.daily_loss_limit = daily_loss_limit
+        self.leverage = leverage
+        self.on_exit = on_exit
+        self.store = store
+        self.lots = lots or {}
+        self._ledger = empty_ledger()
+        self.positions: Dict[str, Position] = {}
+        self.unrealized = 0.0
+        self.open_risk = 0.0
+        self.ticks = 0
+        self.exits = 0
+        self.blocked: Dict[str, int] = {}
+
+    # ---------- daily ledger ----------
+    def ledger(self) -> Dict:
+        ledger = self.store.get(self.LEDGER_KEY) if self.store is not None else self._ledger
+        ledger = dict(ledger or empty_ledger())
+        if ledger["day"] != utc_day():
+            ledger.update(day=utc_day(), realized_today=0.0)
+        return ledger
+
+    def book(self, pnl: float) -> Dict:
+        def apply(ledger: Optional[Dict]) -> Dict:
+            ledger = dict(ledger or empty_ledger())
+            if ledger["day"] != utc_day():
+                ledger.update(day=utc_day(), realized_today=0.0)
+            ledger["realized_today"] += pnl
+            ledger["realized_total"] += pnl
+            ledger["closed"] += 1
+            return ledger
+        if self.store is not None:
+            return self.store.update(self.LEDGER_KEY, apply)
+        self._ledger = apply(self._ledger)
+        return self._ledger
+
+    def restore(self, ledger: Optional[Dict], trades: Iterable[Tuple[str, Dict]] = ()):
+        if ledger is not None and self.store is None:
+            self._ledger = dict(ledger)
+        self.sync(trades)
+
+    # ---------- pre-trade ----------
+    def size(self, symbol: str, entry: float, stop: float) -> Tuple[Optional[float], str]:
+        """Position size risking at most max_risk_per_trade, or (None, reason) when a limit forbids the trade."""
+        if symbol in self.positions:
+            return None, "position_open"
+        distance = abs(entry - stop)
+        if distance <= 0 or entry <= 0:
+            return None, "no_stop"
+        ledger = self.ledger()
+        equity = self.capital + ledger["realized_total"]
+        # Loss still allowed today, less what the open stops could already lose
+        budget = self.capital * self.daily_loss_limit + min(0.0, ledger["realized_today"]) - self.open_risk
+        risk = min(equity * self.max_risk_per_trade, budget)
+        if risk <= 0:
+            return None, "daily_loss_limit"
+        size = min(risk / distance, equity * self.leverage / entry)
+        lot = self.lots.get(symbol)
+        if lot:
+            # Round down: a whole-contract position never risks more than the cap
+            size = math.floor(size / lot + 1e-9) * lot
+            if size <= 0:
+                return None, "below_lot"
+        return size, "ok"
+
+    def reject(self, reason: str):
+        self.blocked[reason] = self.blocked.get(reason, 0) + 1
+
+    def open(self, symbol: str, direction: int, entry: float, stop: float, target: float,
+             size: Optional[float] = None) -> Optional[Position]:
+        if size is None:
+            size, reason = self.size(symbol, entry, stop)
+            if size is None:
+                self.reject(reason)
+                return None
+        elif symbol in self.positions:
+            self.reject("position_open")
+            return None
+        position = Position(symbol, direction, entry, stop, target, size)
+        self.positions[symbol] = position
+        self.open_risk += position.risk
+        return position
+
+    # ---------- mark-to-market ----------
+    def mark(self, symbol: str, price: float) -> Optional[str]:
+        """O(1): reprice the symbol's position, return and report the exit it triggered."""
+        position = self.positions.get(symbol)
+        if position is None or price <= 0:
+            return None
+        self.ticks += 1
+        pnl = position.pnl_at(price)
+        self.unrealized += pnl - position.pnl
+        position.pnl = pnl
+        position.mark = price
+        reason = position.exit_reason(price)
+        if reason is not None and self.on_exit is not None:
+            self.exits += 1
+            self.on_exit(symbol, price, reason)
+        return reason
+
+    def close(self, symbol: str, price: float) -> Optional[float]:
+        """Realize the position at price; None when this engine does not hold it."""
+        position = self.discard(symbol)
+        if position is None:
+            return None
+        pnl = position.pnl_at(price)
+        self.book(pnl)
+        return pnl
+
+    def discard(self, symbol: str) -> Optional[Position]:
+        """Forget a position without booking it, e.g. one another worker already closed."""
+        position = self.positions.pop(symbol, None)
+        if position is None:
+            return None
+        self.unrealized -= position.pnl
+        self.open_risk -= position.risk
+        if not self.positions:
+            # Drop float drift once nothing is open
+            self.unrealized = self.open_risk = 0.0
+        return position
+
+    def sync(self, trades: Iterable[Tuple[str, Dict]]):
+        """Rebuild the index from stored trades: at startup, and periodically when other workers open them."""
+        trades = dict(trades)
+        for symbol in [s for s in self.positions if s not in trades]:
+            self.discard(symbol)
+        for symbol, trade in trades.items():
+            if symbol not in self.positions and trade.get("size"):
+                self.open(
+                    symbol,
+                    1 if trade["trade_type"] == "FUTURES_LONG" else -1,
+                    trade["entry_price"],
+                    trade["stop_loss"],
+                    trade["target_price"],
+                    size=trade["size"]
+                )
+
+    def stats(self) -> Dict:
+        ledger = self.ledger()
+        return {
+            "capital": self.capital,
+            "equity": self.capital + ledger["realized_total"] + self.unrealized,
+            "realized_today": ledger["realized_today"],
+            "realized_total": ledger["realized_total"],
+            "unrealized": self.unrealized,
+            "open_positions": len(self.positions),
+            "open_risk": self.open_risk,
+            "daily_loss_budget": self.capital * self.daily_loss_limit + min(0.0, ledger["realized_today"]),
+            "ticks": self.ticks,
+            "auto_exits": self.exits,
+            "blocked": dict(self.blocked)
+        }
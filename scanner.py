@@ -0,0 +1,91 @@
+""" Background session-aware scanner - scans the watchlist on each bar close, caches latest results """
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def next_bar_close(now: float, period: float) -> float:
+    return (now // period + 1) * period
+
+
+class SessionScanner:
+    def __init__(
+        self,
+        engine,
+        symbols: List[str],
+        period_seconds: float = 3600.0,
+        grace_seconds: float = 2.0,
+        publish: Optional[Callable[[object], Awaitable[None]]] = None
+    ):
+        self.engine = engine
+        self.symbols = list(symbols)
+        self.period = period_seconds
+        self.grace = grace_seconds
+        self.publish = publish
+        self.results: Dict[str, Dict] = {}
+        self.scans = 0
+        self.last_scan_ms = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self):
+        # Warm the cache immediately, then once per bar close
+        while True:
+            try:
+                if self.engine.current_session() is not None:
+                    await self.scan()
+                else:
+                    logger.info("Scanner idle: outside trading sessions")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Scan failed: {e}")
+            now = time.time()
+            await asyncio.sleep(next_bar_close(now, self.period) + self.grace - now)
+
+    async def scan(self):
+        started = time.perf_counter()
+        results = await self.engine.analyze_many(self.symbols)
+        valid_until = next_bar_close(time.time(), self.period) + self.grace
+        for result in results:
+            signal = result["signal"]
+            if signal and self.publish:
+                await self.publish(signal)
+            if signal:
+                result["signal"] = signal.model_dump()
+            result["scanned_at"] = time.time()
+            result["valid_until"] = valid_until
+            self.results[result["symbol"]] = result
+        self.scans += 1
+        self.last_scan_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    def latest(self, symbol: str) -> Optional[Dict]:
+        """Result from the current bar, or None once the next bar has closed."""
+        result = self.results.get(symbol)
+        if result is None or time.time() >= result["valid_until"]:
+            return None
+        return result
+
+    def stats(self) -> Dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "scans": self.scans,
+            "last_scan_ms": self.last_scan_ms,
+            "symbols": len(self.results)
+        }
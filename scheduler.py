@@ -0,0 +1,219 @@
+""" Upstream request scheduler - one token bucket per exchange, strict priority lanes, 429 / retry-after backoff """
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional
+from metrics import SCHEDULER_WAIT
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Highest priority first
+ORDERS = "orders"
+LIVE = "live"
+SCAN = "scan"
+BACKFILL = "backfill"
+LANES = (ORDERS, LIVE, SCAN, BACKFILL)
+
+
+def retry_after(response) -> Optional[float]:
+    """Seconds to back off from a 429: Retry-After (seconds) or Delta's X-RATE-LIMIT-RESET (milliseconds)."""
+    value = response.headers.get("Retry-After")
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    value = response.headers.get("X-RATE-LIMIT-RESET")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            return None
+    return None
+
+
+class RequestScheduler:
+    """Every request to one upstream takes a token first.
+
+    A lane is served only when no higher lane is waiting, and backfill may not spend
+    the last `reserve` tokens of the bucket, so bulk downloads leave headroom for a
+    ticker or order that arrives mid-burst. A 429 empties the bucket and pauses every
+    lane until the exchange's retry-after has passed.
+
+    Async callers queue on futures served by one pump task; threads (the sync
+    DeltaClient) poll the same bucket under the same lock.
+    """
+
+    def __init__(
+        self,
+        rate: float = 20.0,
+        burst: float = 40.0,
+        reserve: float = 0.25,
+        max_retries: int = 3,
+        max_backoff: float = 60.0
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.reserve = {BACKFILL: burst * reserve}
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._waiters: Dict[str, deque] = {lane: deque() for lane in LANES}
+        self._pump_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.granted = {lane: 0 for lane in LANES}
+        self.throttled = {lane: 0 for lane in LANES}
+        self.rate_limited = 0
+
+    # ---------- bucket (caller holds _lock) ----------
+    def _take(self, lane: str, now: float) -> float:
+        """0 after taking a token, else seconds until this lane could take one."""
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        need = 1.0 + self.reserve.get(lane, 0.0)
+        if self._tokens >= need:
+            self._tokens -= 1.0
+            self.granted[lane] += 1
+            return 0.0
+        return (need - self._tokens) / self.rate
+
+    def _queued_ahead(self, lane: str) -> bool:
+        # Own lane included: FIFO within a lane
+        for other in LANES:
+            if self._waiters[other]:
+                return True
+            if other == lane:
+                return False
+        return False
+
+    # ---------- async ----------
+    async def acquire(self, lane: str):
+        started = time.monotonic()
+        with self._lock:
+            if not self._queued_ahead(lane) and self._take(lane, started) == 0:
+                SCHEDULER_WAIT.observe(lane, value=0.0)
+                return
+            future = asyncio.get_running_loop().create_future()
+            self._waiters[lane].append(future)
+        self._kick()
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if future in self._waiters[lane]:
+                    self._waiters[lane].remove(future)
+            raise
+        SCHEDULER_WAIT.observe(lane, value=time.monotonic() - started)
+
+    def _kick(self):
+        loop = asyncio.get_running_loop()
+        if self._pump_task is None or self._pump_task.done() or self._pump_task.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._pump_task = loop.create_task(self._pump())
+        else:
+            # A higher lane may be servable before the pump's current sleep ends
+            self._wakeup.set()
+
+    async def _pump(self):
+        while True:
+            with self._lock:
+                lane = None
+                for candidate in LANES:
+                    waiters = self._waiters[candidate]
+                    while waiters and waiters[0].done():
+                        waiters.popleft()
+                    if waiters:
+                        lane = candidate
+                        break
+                if lane is None:
+                    return
+                wait = self._take(lane, time.monotonic())
+                if wait == 0:
+                    self._waiters[lane].popleft().set_result(None)
+                    continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def send(self, lane: str, request: Callable[[], Awaitable]):
+        """Run request() once a token is granted; 429s are retried in the same lane.
+
+        request is called again per attempt, so signed requests get a fresh timestamp.
+        Returns the last response, which is still a 429 once max_retries is spent.
+        """
+        backoff = 1.0
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(lane)
+            response = await request()
+            if response.status_code != 429 or attempt == self.max_retries:
+                return response
+            await asyncio.sleep(self.throttle(lane, retry_after(response) or backoff))
+            backoff = min(backoff * 2, self.max_backoff)
+        return response
+
+    # ---------- sync ----------
+    def acquire_sync(self, lane: str):
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                # Async waiters ahead of us are served first; look again shortly
+                wait = 0.01 if self._queued_ahead(lane) else self._take(lane, now)
+            if wait == 0:
+                SCHEDULER_WAIT.observe(lane, value=time.monotonic() - started)
+                return
+            time.sleep(wait)
+
+    def send_sync(self, lane: str, request: Callable):
+        backoff = 1.0
+        for attempt in range(self.max_retries + 1):
+            self.acquire_sync(lane)
+            response = request()
+            if response.status_code != 429 or attempt == self.max_retries:
+                return response
+            time.sleep(self.throttle(lane, retry_after(response) or backoff))
+            backoff = min(backoff * 2, self.max_backoff)
+        return response
+
+    # ---------- 429 ----------
+    def throttle(self, lane: str, wait: float) -> float:
+        """Pause every lane for wait seconds; returns the jittered wait for the caller."""
+        wait = min(wait, self.max_backoff)
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + wait)
+            self._tokens = 0.0
+            # Refill starts when the pause ends, not from before it: no full burst straight after a 429
+            self._updated = self._paused_until
+            self.rate_limited += 1
+            self.throttled[lane] += 1
+        logger.warning(f"Upstream rate limited ({lane}), pausing {wait:.2f}s")
+        return wait + random.uniform(0, 0.1 * wait)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "tokens": round(min(self.burst, self._tokens + (time.monotonic() - self._updated) * self.rate), 3),
+                "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 3),
+                "rate_limited": self.rate_limited,
+                "lanes": {
+                    lane: {
+                        "queue_depth": sum(1 for f in self._waiters[lane] if not f.done()),
+                        "granted": self.granted[lane],
+                        "throttled": self.throttled[lane]
+                    }
+                    for lane in LANES
+                }
+            }
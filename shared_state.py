@@ -0,0 +1,195 @@
+""" Cross-worker shared state - SQLite WAL tables for open trades, brain counters, setup dedup and leases
+
+Every uvicorn worker opens the same file. Reads are plain SELECTs against the WAL
+snapshot; read-modify-write goes through BEGIN IMMEDIATE so two workers can never
+interleave an update. Commits use synchronous=NORMAL, so nothing fsyncs per request.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (symbol TEXT PRIMARY KEY, payload TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS setups (key TEXT PRIMARY KEY, seen REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL);
+"""
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _default(value):
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+class SharedState:
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        self.path = path
+        self.owner = worker_id()
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._kv_cache: Dict[str, object] = {}
+        self._kv_version: Optional[int] = None
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write lock across all workers for the duration of the block."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def query(self, sql: str, params=()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def execute(self, sql: str, params=()) -> int:
+        """Single write statement; returns the number of rows it changed."""
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    # ---------- key/value (brain counters) ----------
+    def _data_version(self) -> int:
+        # Bumped by SQLite whenever another connection commits: lets reads skip unchanged state
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            version = self._data_version()
+            if version != self._kv_version:
+                self._kv_cache = {k: json.loads(v) for k, v in self._conn.execute("SELECT key, value FROM kv")}
+                self._kv_version = version
+            return self._kv_cache.get(key, default)
+
+    def update(self, key: str, fn: Callable[[Optional[Dict]], Dict]) -> Dict:
+        """Atomic read-modify-write of one value across workers."""
+        with self.transaction() as conn:
+            row = conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+            value = fn(json.loads(row[0]) if row else None)
+            conn.execute("INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)", (key, json.dumps(value, default=_default)))
+        # Own commits do not bump data_version for this connection
+        self._kv_version = None
+        return value
+
+    # ---------- setup dedup ----------
+    def first_seen(self, key: str, ttl: float, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        with self.transaction() as conn:
+            row = conn.execute("SELECT seen FROM setups WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[0] < ttl:
+                return False
+            conn.execute("INSERT OR REPLACE INTO setups (key, seen) VALUES (?, ?)", (key, now))
+            conn.execute("DELETE FROM setups WHERE seen < ?", (now - ttl,))
+            return True
+
+    # ---------- leases (leader election) ----------
+    def acquire(self, name: str, ttl: float, now: Optional[float] = None) -> bool:
+        """Take or renew a lease; True while this worker holds it."""
+        now = time.time() if now is None else now
+        with self.transaction() as conn:
+            row = conn.execute("SELECT owner, expires FROM leases WHERE name = ?", (name,)).fetchone()
+            if row is not None and row[0] != self.owner and row[1] > now:
+                return False
+            conn.execute("INSERT OR REPLACE INTO leases (name, owner, expires) VALUES (?, ?, ?)", (name, self.owner, now + ttl))
+            return True
+
+    def release(self, name: str):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, self.owner))
+
+    def leader(self, name: str) -> Optional[str]:
+        rows = self.query("SELECT owner FROM leases WHERE name = ? AND expires > ?", (name, time.time()))
+        return rows[0][0] if rows else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SharedTrades(MutableMapping):
+    """active_trades as a dict-shaped view over the trades table."""
+
+    def __init__(self, state: SharedState):
+        self.state = state
+
+    def __getitem__(self, symbol: str) -> Dict:
+        rows = self.state.query("SELECT payload FROM trades WHERE symbol = ?", (symbol,))
+        if not rows:
+            raise KeyError(symbol)
+        return json.loads(rows[0][0])
+
+    def __setitem__(self, symbol: str, trade: Dict):
+        self.state.query("INSERT OR REPLACE INTO trades (symbol, payload) VALUES (?, ?)",
+                         (symbol, json.dumps(trade, default=_default)))
+
+    def add(self, symbol: str, trade: Dict) -> bool:
+        """Insert unless the symbol already has a trade; False when another worker got there first."""
+        return self.state.execute(
+            "INSERT INTO trades (symbol, payload) VALUES (?, ?) ON CONFLICT(symbol) DO NOTHING",
+            (symbol, json.dumps(trade, default=_default))
+        ) == 1
+
+    def __delitem__(self, symbol: str):
+        if self.pop(symbol, None) is None:
+            raise KeyError(symbol)
+
+    def pop(self, symbol: str, *default):
+        # Single statement, so two workers closing the same trade cannot both get it
+        rows = self.state.query("DELETE FROM trades WHERE symbol = ? RETURNING payload", (symbol,))
+        if rows:
+            return json.loads(rows[0][0])
+        if default:
+            return default[0]
+        raise KeyError(symbol)
+
+    def __contains__(self, symbol) -> bool:
+        return bool(self.state.query("SELECT 1 FROM trades WHERE symbol = ?", (symbol,)))
+
+    def __iter__(self):
+        return iter([row[0] for row in self.state.query("SELECT symbol FROM trades ORDER BY symbol")])
+
+    def __len__(self) -> int:
+        return self.state.query("SELECT COUNT(*) FROM trades")[0][0]
+
+    def items(self):
+        return [(s, json.loads(p)) for s, p in self.state.query("SELECT symbol, payload FROM trades ORDER BY symbol")]
+
+    def values(self):
+        return [trade for _, trade in self.items()]
+
+    def clear(self):
+        self.state.query("DELETE FROM trades")
+
+
+class SharedDeduper:
+    """coalesce.SignalDeduper across workers."""
+
+    def __init__(self, state: SharedState, ttl: float = 86400.0):
+        self.state = state
+        self.ttl = ttl
+        self.suppressed = 0
+
+    def first(self, key, now: Optional[float] = None) -> bool:
+        if self.state.first_seen(json.dumps(key), self.ttl, now):
+            return True
+        self.suppressed += 1
+        return False
+
+    def stats(self) -> Dict:
+        return {"tracked": self.state.query("SELECT COUNT(*) FROM setups")[0][0], "suppressed": self.suppressed}
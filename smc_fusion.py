@@ -1,12 +1,6 @@
-def run_smc_backtest(candles):
-    # Pro/Advanced SMC strategy
-    signals = []
-    for i in range(1, len(candles)):
-        c = candles[i]
-        prev = candles[i-1]
-        # यहां अपने advanced rules डालें:
-        if c["close"] > prev["close"]:
-            signals.append(f"Long @ {c['close']} Time: {c['timestamp']}")
-        else:
-            signals.append(f"Short @ {c['close']} Time: {c['timestamp']}")
-    return signals
+from backtest import ENGINE, run_backtest
+
+def run_smc_backtest(candles, strategy=ENGINE, config=None, **kwargs):
+    # Pro/Advanced SMC strategy: replays the live signal rules with SL/TP fills, leverage and fees
+    # strategy: "engine" (ICT order block + FVG) or "fusion" (SMC structure + AI SuperTrend)
+    return run_backtest(candles, strategy=strategy, config=config, **kwargs)
@@ -1,4 +1,10 @@
+import numpy as np
+from columnar import CandleArray
+import indicators
+
 def get_smc_structure(data):
+    if isinstance(data, CandleArray):
+        return get_smc_structure_np(data)
     closes = [row["close"] for row in data]
     highs = [row["high"] for row in data]
     lows = [row["low"] for row in data]
@@ -18,7 +24,31 @@ def get_smc_structure(data):
         "target": max(highs) if highs else 0
     }
 
+def get_smc_structure_np(data):
+    closes, highs, lows = data.close, data.high, data.low
+    n = len(data)
+    bos_up = bool(closes[-2] < closes[-3] and closes[-1] > closes[-2]) if n>=3 else False
+    bos_down = bool(closes[-2] > closes[-3] and closes[-1] < closes[-2]) if n>=3 else False
+    fvg_up = bool(lows[-1] > highs[-3]) if n>=3 else False
+    fvg_down = bool(highs[-1] < lows[-3]) if n>=3 else False
+    side = "buy" if bos_up or fvg_up else ("sell" if bos_down or fvg_down else "hold")
+    return {
+        "side": side,
+        "bos_up": bos_up,
+        "bos_down": bos_down,
+        "fvg_up": fvg_up,
+        "fvg_down": fvg_down,
+        "entry": float(closes[-1]) if n else 0,
+        "stop": float(lows.min()) if n else 0,
+        "target": float(highs.max()) if n else 0
+    }
+
 def get_rahulyadav_ai(data, config):
+    # config["atr_mode"] = "wilder": Wilder ATR SuperTrend with carried bands (indicators.py)
+    if config.get("atr_mode") == "wilder":
+        return get_rahulyadav_ai_wilder(data, config)
+    if isinstance(data, CandleArray):
+        return get_rahulyadav_ai_np(data, config)
     closes = [row["close"] for row in data]
     highs = [row["high"] for row in data]
     lows = [row["low"] for row in data]
@@ -47,8 +77,62 @@ def get_rahulyadav_ai(data, config):
         "target": highs[-1] if supertrend==1 and highs else lows[-1] if supertrend==-1 and lows else closes[-1]
     }
 
+def get_rahulyadav_ai_np(data, config):
+    closes, highs, lows, volumes = data.close, data.high, data.low, data.volume
+    n = len(data)
+    length = config.get("ailength", 10)
+    multiplier = config.get("aimultiplier", 3.0)
+    atr = float((highs[-length:] - lows[-length:]).max()) if n >= length else 0
+    hl2 = float(highs[-1]+lows[-1])/2 if n else 0
+    upper = hl2 + multiplier*atr
+    lower = hl2 - multiplier*atr
+    supertrend = -1 if closes[-1] < lower else (1 if closes[-1] > upper else 0)
+    is_prime = config.get('session_active', True)
+    # Summed in list order so the 1.5x threshold compares exactly like the list version
+    avg_vol = sum(volumes[-20:-1].tolist())/19 if n>=21 else 0
+    vp_signal = bool(volumes[-1] > 1.5*avg_vol) if avg_vol else False
+    ai_signal = (supertrend==1 and vp_signal and is_prime)
+    return {
+        "aitrend": supertrend,
+        "vp_signal": vp_signal,
+        "ai_signal": ai_signal,
+        "entry": float(closes[-1]) if n else 0,
+        "stop": lower if supertrend==1 else upper,
+        "target": float(highs[-1] if supertrend==1 else lows[-1] if supertrend==-1 else closes[-1])
+    }
+
+def get_rahulyadav_ai_wilder(data, config):
+    if not isinstance(data, CandleArray):
+        data = CandleArray.from_candles(data)
+    closes, highs, lows, volumes = data.close, data.high, data.low, data.volume
+    length = config.get("ailength", 10)
+    multiplier = config.get("aimultiplier", 3.0)
+    st = indicators.supertrend(highs, lows, closes, length, multiplier)
+    if len(data) >= length:
+        supertrend = int(st["trend"][-1])
+        upper, lower = float(st["upper"][-1]), float(st["lower"][-1])
+    else:
+        # Not enough bars to seed the ATR yet: flat bands, no trend (as the legacy atr=0 case)
+        supertrend = 0
+        upper = lower = float(highs[-1]+lows[-1])/2
+    is_prime = config.get('session_active', True)
+    avg_vol = float(indicators.sma(volumes[-20:-1], 19)[-1]) if len(data)>=21 else 0
+    vp_signal = bool(volumes[-1] > 1.5*avg_vol) if avg_vol else False
+    ai_signal = (supertrend==1 and vp_signal and is_prime)
+    return {
+        "aitrend": supertrend,
+        "vp_signal": vp_signal,
+        "ai_signal": ai_signal,
+        "entry": float(closes[-1]),
+        "stop": lower if supertrend==1 else upper,
+        "target": float(highs[-1] if supertrend==1 else lows[-1] if supertrend==-1 else closes[-1])
+    }
+
 # ----- FINAL FUSION CALL -----
 def get_zero_to_millionaire_signal(data, config):
+    # config["vectorized"] selects the columnar implementation for list input
+    if config.get("vectorized") and not isinstance(data, CandleArray):
+        data = CandleArray.from_candles(data)
     smc_struct = get_smc_structure(data)
     ry_ai = get_rahulyadav_ai(data, config)
     if smc_struct["side"]=="buy" and ry_ai["ai_signal"]:
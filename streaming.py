@@ -0,0 +1,457 @@
+""" Streaming detector state - O(1) per bar BOS/FVG flags, ICT zones and SuperTrend bands """
+
+from bisect import bisect_right
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+from zones import BEARISH, BULLISH, FVG, ORDER_BLOCK, Zone, ZoneIndex
+from candle_store import candle_time
+from indicators import SuperTrend
+
+
+def _traded_through(zone: Zone, high: float, low: float) -> bool:
+    # ZoneIndex mitigation: a low under a bullish zone's bottom, a high over a bearish zone's top
+    return zone.bottom > low if zone.bias == BULLISH else zone.top < high
+
+
+class SymbolState:
+    """Incremental twin of get_smc_structure, get_rahulyadav_ai and ICTDetector for one symbol.
+
+    on_bar() takes closed bars in time order. After each bar, smc_structure(),
+    rahulyadav_ai(), order_block() and fvg() equal the batch functions run over
+    every bar seen so far.
+    """
+
+    def __init__(self, config: Optional[Dict] = None, min_displacement: float = 0.01, min_gap: float = 0.002):
+        self.config = config or {}
+        self.length = self.config.get("ailength", 10)
+        self.multiplier = self.config.get("aimultiplier", 3.0)
+        self.wilder = self.config.get("atr_mode") == "wilder"
+        self._supertrend = SuperTrend(self.length, self.multiplier) if self.wilder else None
+        self._bands: Optional[Dict] = None
+        self.min_displacement = min_displacement
+        self.min_gap = min_gap
+        self.count = 0
+        self.last_time: Optional[int] = None
+        self.price: Optional[float] = None
+        self.bars = deque(maxlen=3)
+        self.volumes = deque(maxlen=20)
+        self.min_low = float("inf")
+        self.max_high = float("-inf")
+        self._ranges = deque()          # monotonic (index, high - low) for the rolling ATR max
+        self._ob_hits = deque()         # (index, high, low, displacement) of bullish OB candidates
+        self._fvg_hits = deque()        # (index, top, bottom, size) of bullish FVG candidates
+        self.zones = LiveZones()
+        self.mitigated = 0
+
+    def on_bar(self, candle: Dict):
+        o, h, l, c = candle["open"], candle["high"], candle["low"], candle["close"]
+        i = self.count
+        self.mitigated += self.zones.mitigate(h, l)
+        for zone in self._formed(o, h, l, c, i):
+            if zone.bias == BULLISH:
+                # Candidates for the 20 / 10 bar detect_order_block / detect_fvg windows
+                if zone.kind == ORDER_BLOCK:
+                    self._ob_hits.append((i - 1, zone.top, zone.bottom, zone.size))
+                else:
+                    self._fvg_hits.append((i, zone.top, zone.bottom, zone.size))
+            self.zones.add(zone)
+
+        self.bars.append((o, h, l, c))
+        self.volumes.append(candle.get("volume", 0))
+        self.min_low = min(self.min_low, l)
+        self.max_high = max(self.max_high, h)
+        rng = h - l
+        while self._ranges and self._ranges[-1][1] <= rng:
+            self._ranges.pop()
+        self._ranges.append((i, rng))
+        if self._ranges[0][0] <= i - self.length:
+            self._ranges.popleft()
+        if self._supertrend is not None:
+            self._bands = self._supertrend.update(h, l, c)
+        self.count += 1
+        self.last_time = candle_time(candle)
+        self.price = c
+
+    def on_tick(self, price: float) -> Dict:
+        self.price = price
+        ob = self.order_block()
+        return {
+            "price": price,
+            "in_order_block": bool(ob and ob["price_low"] <= price <= ob["price_high"]),
+            "order_block": ob,
+            "fvg": self.fvg()
+        }
+
+    # ICTDetector.detect_order_block / detect_fvg equivalents
+    def order_block(self) -> Optional[Dict]:
+        n = self.count
+        if n < 20:
+            return None
+        lo, hi = max(0, n - 20) + 1, n - 5
+        while self._ob_hits and self._ob_hits[0][0] < lo:
+            self._ob_hits.popleft()
+        for i, high, low, d in reversed(self._ob_hits):
+            if i <= hi:
+                return {"price_high": high, "price_low": low, "bias": BULLISH, "strength": min(d * 10, 1.0)}
+        return None
+
+    def fvg(self) -> Optional[Dict]:
+        n = self.count
+        if n < 3:
+            return None
+        lo = max(2, n - 10) + 1
+        while self._fvg_hits and self._fvg_hits[0][0] < lo:
+            self._fvg_hits.popleft()
+        if not self._fvg_hits:
+            return None
+        _, top, bottom, gap = self._fvg_hits[-1]
+        return {"top": top, "bottom": bottom, "bias": BULLISH, "size_percentage": gap * 100}
+
+    # smc_indicator.get_smc_structure equivalent
+    def smc_structure(self) -> Dict:
+        closes = [b[3] for b in self.bars]
+        full = len(self.bars) >= 3
+        bos_up = closes[-2] < closes[-3] and closes[-1] > closes[-2] if full else False
+        bos_down = closes[-2] > closes[-3] and closes[-1] < closes[-2] if full else False
+        fvg_up = (self.bars[-1][2] > self.bars[-3][1]) if full else False
+        fvg_down = (self.bars[-1][1] < self.bars[-3][2]) if full else False
+        side = "buy" if bos_up or fvg_up else ("sell" if bos_down or fvg_down else "hold")
+        return {
+            "side": side,
+            "bos_up": bos_up,
+            "bos_down": bos_down,
+            "fvg_up": fvg_up,
+            "fvg_down": fvg_down,
+            "entry": closes[-1] if closes else 0,
+            "stop": self.min_low if self.count else 0,
+            "target": self.max_high if self.count else 0
+        }
+
+    # smc_indicator.get_rahulyadav_ai equivalent (SuperTrend bands)
+    def rahulyadav_ai(self) -> Dict:
+        _, h, l, c = self.bars[-1]
+        if self.wilder:
+            # Carried Wilder bands (smc_indicator.get_rahulyadav_ai_wilder)
+            if self._bands is not None:
+                upper, lower, supertrend = self._bands["upper"], self._bands["lower"], self._bands["trend"]
+            else:
+                upper = lower = (h + l) / 2
+                supertrend = 0
+        else:
+            atr = self._ranges[0][1] if self.count >= self.length else 0
+            hl2 = (h + l) / 2
+            upper = hl2 + self.multiplier * atr
+            lower = hl2 - self.multiplier * atr
+            supertrend = -1 if c < lower else (1 if c > upper else 0)
+        is_prime = self.config.get('session_active', True)
+        # Same 19 bars, same summation order as the batch version
+        avg_vol = sum(list(self.volumes)[:-1]) / 19 if self.count >= 21 else 0
+        vp_signal = self.volumes[-1] > 1.5 * avg_vol if avg_vol else False
+        ai_signal = (supertrend == 1 and vp_signal and is_prime)
+        return {
+            "aitrend": supertrend,
+            "vp_signal": vp_signal,
+            "ai_signal": ai_signal,
+            "entry": c,
+            "stop": lower if supertrend == 1 else upper,
+            "target": h if supertrend == 1 else l if supertrend == -1 else c
+        }
+
+    def fusion_signal(self) -> Dict:
+        smc_struct = self.smc_structure()
+        ry_ai = self.rahulyadav_ai()
+        if smc_struct["side"] == "buy" and ry_ai["ai_signal"]:
+            final = "buy"
+        elif smc_struct["side"] == "sell" and ry_ai["ai_signal"]:
+            final = "sell"
+        else:
+            final = "hold"
+        return {
+            "side": final,
+            "entry": ry_ai["entry"],
+            "stop": ry_ai["stop"],
+            "target": ry_ai["target"],
+            "details": {"smc": smc_struct, "ry_ai": ry_ai}
+        }
+
+    # Full-history live zones (ZoneIndex equivalent), O(log n) per bar and per query
+    def live_zones(self) -> List[Zone]:
+        return self.zones.live()
+
+    def zone_index(self) -> ZoneIndex:
+        return ZoneIndex(self.live_zones())
+
+    def entry(self, price: float, forming: Optional[Dict] = None) -> Tuple[Optional[Zone], Optional[Zone]]:
+        """ZoneIndex.entry over every bar seen, plus the still-forming bar when given.
+
+        Equals ZoneIndex.build(bars + [forming]).entry(price): the forming bar mitigates
+        and confirms zones like a closed one, but is not committed to the state.
+        """
+        if forming is None:
+            return self.zones.entry(price)
+        h, l = forming["high"], forming["low"]
+        new = self._formed(forming["open"], h, l, forming["close"], self.count)
+        return self.zones.entry(price, new, h, l)
+
+    def _formed(self, o: float, h: float, l: float, c: float, i: int) -> List[Zone]:
+        """Zones a bar at index i confirms against the bars before it, in ZoneIndex.build order."""
+        zones = []
+        if self.bars:
+            po, ph, pl, pc = self.bars[-1]
+            if pc < po and c > o:
+                d = (c - o) / o
+                if d > self.min_displacement:
+                    zones.append(Zone(ORDER_BLOCK, BULLISH, pl, ph, i, d, -1))
+            elif pc > po and c < o:
+                d = (o - c) / o
+                if d > self.min_displacement:
+                    zones.append(Zone(ORDER_BLOCK, BEARISH, pl, ph, i, d, -1))
+        if len(self.bars) >= 2:
+            _, h2, l2, _ = self.bars[-2]
+            if l > h2:
+                gap = (l - h2) / h2
+                if gap > self.min_gap:
+                    zones.append(Zone(FVG, BULLISH, h2, l, i, gap, -1))
+            if h < l2:
+                gap = (l2 - h) / l2
+                if gap > self.min_gap:
+                    zones.append(Zone(FVG, BEARISH, h, l2, i, gap, -1))
+        return zones
+
+
+class LiveZones:
+    """The live zones of ZoneIndex, kept up to date zone by zone instead of rebuilt.
+
+    add() takes zones in ZoneIndex.build order; mitigate() takes each bar's high and low
+    before the zones that bar confirms are added. entry() then equals ZoneIndex.entry
+    over the same bars in O(log n).
+    """
+
+    def __init__(self):
+        self._obs = {BULLISH: _OrderBlockStack(1), BEARISH: _OrderBlockStack(-1)}
+        self._fvgs = {BULLISH: _FvgBook(1), BEARISH: _FvgBook(-1)}
+
+    def add(self, zone: Zone):
+        books = self._obs if zone.kind == ORDER_BLOCK else self._fvgs
+        books[zone.bias].add(zone)
+
+    def mitigate(self, high: float, low: float) -> int:
+        """Drop the zones a bar trades through; returns how many."""
+        # A low under a bullish bottom, a high over a bearish top: the far end of each book
+        return (
+            self._obs[BULLISH].drop_beyond(low) + self._fvgs[BULLISH].drop_beyond(low)
+            + self._obs[BEARISH].drop_beyond(high) + self._fvgs[BEARISH].drop_beyond(high)
+        )
+
+    def live(self) -> List[Zone]:
+        zones = [z for book in (*self._obs.values(), *self._fvgs.values()) for z in book.zones]
+        # ZoneIndex.build order: by bar, then order blocks before FVGs, bullish before bearish
+        return sorted(zones, key=lambda z: (z.formed_at, z.kind != ORDER_BLOCK, z.bias != BULLISH))
+
+    def entry(
+        self,
+        price: float,
+        forming: Sequence[Zone] = (),
+        high: float = float("-inf"),
+        low: float = float("inf")
+    ) -> Tuple[Optional[Zone], Optional[Zone]]:
+        """ZoneIndex.entry, optionally over one more bar: its high / low and the zones it forms."""
+        bull = self._obs[BULLISH].find(price, low)
+        bear = self._obs[BEARISH].find(price, -high)
+        if bull is None or (bear is not None and bear.formed_at > bull.formed_at):
+            zone = bear
+        else:
+            zone = bull
+        for z in forming:
+            if z.kind == ORDER_BLOCK and z.bottom <= price <= z.top:
+                zone = z
+        if zone is None:
+            return None, None
+        if zone.bias == BULLISH:
+            gap = self._fvgs[BULLISH].nearest(price)
+            if gap is not None and _traded_through(gap, high, low):
+                # Every zone further above has a higher bottom: traded through as well
+                gap = None
+            for z in forming:
+                if z.kind == FVG and z.bias == BULLISH and z.bottom > price and (gap is None or z.bottom < gap.bottom):
+                    gap = z
+        else:
+            gap = self._fvgs[BEARISH].nearest(price)
+            if gap is not None and _traded_through(gap, high, low):
+                gap = None
+            for z in forming:
+                if z.kind == FVG and z.bias == BEARISH and z.top < price and (
+                    gap is None or (z.top, z.bottom) >= (gap.top, gap.bottom)
+                ):
+                    gap = z
+        return zone, gap
+
+
+class _OrderBlockStack:
+    """Live order blocks of one bias, oldest first.
+
+    Mitigation removes every bullish block over the bar's low after each bar, so the next
+    bullish block (bottom = the previous bar's low) never sits below a live one: bottoms
+    are non-decreasing in formation order, and mitigation pops from the end. Bearish
+    blocks mirror this on negated prices. _far[k][j] is the max far edge over the 2**k
+    blocks ending at j, so the newest block containing a price is found by binary lifting.
+    """
+
+    def __init__(self, sign: int):
+        self.sign = sign
+        self.zones: List[Zone] = []
+        self._near: List[float] = []
+        self._far: List[List[float]] = [[]]
+
+    def add(self, zone: Zone):
+        near, far = (zone.bottom, zone.top) if self.sign > 0 else (-zone.top, -zone.bottom)
+        j = len(self.zones)
+        self.zones.append(zone)
+        self._near.append(near)
+        for k, level in enumerate(self._far):
+            half = 1 << (k - 1) if k else 0
+            if k and j >= half:
+                far = max(far, self._far[k - 1][j - half])
+            level.append(far)
+        if 1 << len(self._far) <= len(self.zones):
+            # Built once per power of two; drop_beyond only truncates the levels
+            prev, half = self._far[-1], 1 << (len(self._far) - 1)
+            self._far.append([max(prev[i], prev[i - half]) if i >= half else prev[i] for i in range(len(prev))])
+
+    def drop_beyond(self, price: float) -> int:
+        """Remove the blocks the price traded through; returns how many."""
+        keep = bisect_right(self._near, self.sign * price)
+        dropped = len(self.zones) - keep
+        if dropped:
+            del self.zones[keep:], self._near[keep:]
+            for level in self._far:
+                del level[keep:]
+        return dropped
+
+    def find(self, price: float, limit: float = float("inf")) -> Optional[Zone]:
+        """Newest block containing price, among those whose near edge is within limit."""
+        p = self.sign * price
+        pos = bisect_right(self._near, min(p, limit)) - 1
+        if pos < 0 or self._far[0][pos] >= p:
+            # No candidate, or the newest candidate already contains price
+            return self.zones[pos] if pos >= 0 else None
+        for k in range(len(self._far) - 1, -1, -1):
+            if pos >= 0 and self._far[k][pos] < p:
+                pos -= 1 << k
+        return self.zones[pos] if pos >= 0 else None
+
+
+class _FvgBook:
+    """Live FVGs of one bias in ZoneIndex.nearest_above / nearest_below order.
+
+    Bullish: by (bottom, formed_at); bearish: by (top, bottom, formed_at) descending.
+    The nearest gap past a price and the gaps a bar trades through are both a suffix.
+    """
+
+    def __init__(self, sign: int):
+        self.sign = sign
+        self.zones: List[Zone] = []
+        self._keys: List[Tuple] = []
+
+    def _key(self, zone: Zone) -> Tuple:
+        if self.sign > 0:
+            return zone.bottom, zone.formed_at
+        return -zone.top, -zone.bottom, -zone.formed_at
+
+    def _cut(self, price: float) -> int:
+        return bisect_right(self._keys, (self.sign * price, float("inf")))
+
+    def add(self, zone: Zone):
+        key = self._key(zone)
+        # New gaps land at or next to the end: the memmove stays O(1)
+        i = bisect_right(self._keys, key)
+        self._keys.insert(i, key)
+        self.zones.insert(i, zone)
+
+    def drop_beyond(self, price: float) -> int:
+        keep = self._cut(price)
+        dropped = len(self.zones) - keep
+        if dropped:
+            del self.zones[keep:], self._keys[keep:]
+        return dropped
+
+    def nearest(self, price: float) -> Optional[Zone]:
+        i = self._cut(price)
+        return self.zones[i] if i < len(self.zones) else None
+
+
+class StreamRegistry:
+    """One SymbolState per symbol, kept in step with closed bars from history and the push feed.
+
+    period is the bar length in seconds; a pushed bar further than one period after the
+    state's last bar means bars were missed, and the state is rebuilt on the next sync().
+    """
+
+    def __init__(
+        self,
+        config: Optional[Dict] = None,
+        period: Optional[float] = None,
+        min_displacement: float = 0.01,
+        min_gap: float = 0.002
+    ):
+        self.config = config or {}
+        self.period = period
+        self.min_displacement = min_displacement
+        self.min_gap = min_gap
+        self.states: Dict[str, SymbolState] = {}
+        self.reseeds = 0
+
+    def get(self, symbol: str) -> SymbolState:
+        state = self.states.get(symbol)
+        if state is None:
+            state = self.states[symbol] = SymbolState(self.config, self.min_displacement, self.min_gap)
+        return state
+
+    def sync(self, symbol: str, candles, closed_until: Optional[float]) -> Tuple[SymbolState, Optional[Dict]]:
+        """Feed the state every bar of candles up to closed_until (open time) that it has not seen.
+
+        Returns the state and the bar after closed_until, the one still forming, if it is
+        newer than the state. A window that starts after the state's last bar cannot be
+        joined to it: the state is rebuilt from the window.
+        """
+        times = candles.timestamp.tolist() if hasattr(candles, "timestamp") else [candle_time(c) for c in candles]
+        state = self.get(symbol)
+        if state.last_time is not None and (not times or times[0] > state.last_time):
+            del self.states[symbol]
+            self.reseeds += 1
+            state = self.get(symbol)
+        start = 0 if state.last_time is None else bisect_right(times, state.last_time)
+        end = start if closed_until is None else max(start, bisect_right(times, closed_until))
+        for bar in _rows(candles, start, end):
+            state.on_bar(bar)
+        forming = None
+        if end < len(times) and (state.last_time is None or times[end] > state.last_time):
+            forming = _rows(candles, end, end + 1)[0]
+        return state, forming
+
+    def on_bar(self, symbol: str, candle: Dict) -> Optional[SymbolState]:
+        """A closed bar from the push feed; ignored until sync() has seeded the symbol from history."""
+        state = self.states.get(symbol)
+        if state is None or state.last_time is None:
+            return None
+        ts = candle_time(candle)
+        if ts <= state.last_time:
+            return state
+        if self.period and ts > state.last_time + self.period:
+            del self.states[symbol]
+            self.reseeds += 1
+            return None
+        state.on_bar(candle)
+        return state
+
+    def on_tick(self, symbol: str, price: float) -> Dict:
+        return self.get(symbol).on_tick(price)
+
+    def stats(self) -> Dict:
+        return {"symbols": len(self.states), "reseeds": self.reseeds}
+
+
+def _rows(candles, start: int, end: int) -> List[Dict]:
+    if hasattr(candles, "to_candles"):
+        return candles[start:end].to_candles()
+    return list(candles[start:end])
@@ -0,0 +1,184 @@
+""" Parameter sweep for the fusion / engine strategies - process pool over shared-memory candles """
+
+import itertools
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from backtest import ENGINE, FUSION, run_backtest
+from columnar import CandleArray
+import logging
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("open", "high", "low", "close", "volume", "timestamp")
+FUSION_KEYS = ("ailength", "aimultiplier", "session_active", "atr_mode")
+ENGINE_KEYS = ("risk_reward", "min_displacement", "min_gap", "use_zone_index")
+
+# Defaults mirror smc_indicator.get_rahulyadav_ai and the live Config thresholds
+DEFAULT_SPACE = {
+    FUSION: {
+        "ailength": [5, 10, 14, 20],
+        "aimultiplier": [0.1, 0.2, 0.3, 0.45, 3.0],
+        "session_active": [True]
+    },
+    ENGINE: {
+        "risk_reward": [1.5, 2.0, 2.5, 3.0],
+        "min_displacement": [0.005, 0.01, 0.015],
+        "min_gap": [0.001, 0.002, 0.003]
+    }
+}
+
+_worker_candles: Optional[CandleArray] = None
+_worker_shm: Optional[shared_memory.SharedMemory] = None
+
+
+def grid(space: Dict[str, List]) -> List[Dict]:
+    keys = sorted(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def random_search(space: Dict[str, Iterable], n: int, seed: int = 0) -> List[Dict]:
+    """Lists are sampled as choices, (low, high) tuples uniformly (ints stay ints)."""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        params = {}
+        for key in sorted(space):
+            values = space[key]
+            if isinstance(values, tuple):
+                low, high = values
+                params[key] = rng.randint(low, high) if isinstance(low, int) and isinstance(high, int) else rng.uniform(low, high)
+            else:
+                params[key] = rng.choice(list(values))
+        out.append(params)
+    return out
+
+
+def param_key(strategy: str, params: Dict, backtest: Dict) -> str:
+    return json.dumps({"strategy": strategy, "params": params, "backtest": backtest}, sort_keys=True)
+
+
+def _share(candles: CandleArray) -> shared_memory.SharedMemory:
+    n = len(candles)
+    shm = shared_memory.SharedMemory(create=True, size=max(len(COLUMNS) * n * 8, 1))
+    block = np.ndarray((len(COLUMNS), n), dtype=np.float64, buffer=shm.buf)
+    for row, name in enumerate(COLUMNS):
+        block[row] = getattr(candles, name)
+    return shm
+
+
+def _attach(name: str, n: int):
+    # Worker initializer: map the parent's block once, views only - nothing pickled per task
+    global _worker_candles, _worker_shm
+    _worker_shm = shared_memory.SharedMemory(name=name)
+    block = np.ndarray((len(COLUMNS), n), dtype=np.float64, buffer=_worker_shm.buf)
+    _worker_candles = CandleArray(*block)
+
+
+def _evaluate(strategy: str, params: Dict, base: Dict) -> Dict:
+    if strategy == FUSION:
+        config = {k: params[k] for k in FUSION_KEYS if k in params}
+        result = run_backtest(_worker_candles, FUSION, config=config, **base)
+    else:
+        thresholds = {k: params[k] for k in ENGINE_KEYS if k in params}
+        result = run_backtest(_worker_candles, ENGINE, **base, **thresholds)
+    return {"strategy": strategy, "params": params, "backtest": base, "stats": result["stats"]}
+
+
+def rank(results: List[Dict], max_drawdown: Optional[float] = None, min_trades: int = 1) -> List[Dict]:
+    """Best expectancy first, shallower drawdown breaks ties.
+
+    Configurations with fewer than min_trades trades have no meaningful expectancy: they
+    are listed after the ranked ones, most trades first, rather than left out. Only a
+    max_drawdown breach removes a result.
+    """
+    kept = [r for r in results if max_drawdown is None or r["stats"]["max_drawdown"] <= max_drawdown]
+    ranked = sorted((r for r in kept if r["stats"]["trades"] >= min_trades),
+                    key=lambda r: (-r["stats"]["expectancy"], r["stats"]["max_drawdown"]))
+    idle = sorted((r for r in kept if r["stats"]["trades"] < min_trades), key=lambda r: -r["stats"]["trades"])
+    return ranked + idle
+
+
+def engine_defaults(config) -> Dict:
+    """Engine thresholds from a Config-like object, for candidates that leave some out."""
+    return {"risk_reward": config.MIN_RISK_REWARD, "min_displacement": config.MIN_DISPLACEMENT,
+            "min_gap": config.MIN_FVG_SIZE, "use_zone_index": config.USE_ZONE_INDEX}
+
+
+def load_results(path: str) -> List[Dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run_sweep(
+    candles,
+    strategy: str = FUSION,
+    candidates: Optional[List[Dict]] = None,
+    results_path: str = "sweep_results.jsonl",
+    workers: Optional[int] = None,
+    defaults: Optional[Dict] = None,
+    **backtest_kwargs
+) -> List[Dict]:
+    """Evaluate every candidate not already in results_path; returns all results ranked.
+
+    Each finished configuration is appended to results_path immediately, so an
+    interrupted sweep resumes where it stopped. For the engine strategy every candidate
+    needs all of ENGINE_KEYS; defaults (e.g. engine_defaults(Config)) fills the rest.
+    """
+    if not isinstance(candles, CandleArray):
+        candles = CandleArray.from_candles(candles)
+    candidates = candidates if candidates is not None else grid(DEFAULT_SPACE[strategy])
+    if defaults:
+        candidates = [dict(defaults, **c) for c in candidates]
+    if strategy == ENGINE:
+        incomplete = sorted({k for c in candidates for k in ENGINE_KEYS if k not in c})
+        if incomplete:
+            raise ValueError(f"Engine candidates need {', '.join(incomplete)}: pass them or defaults=")
+
+    results = load_results(results_path)
+    results = [r for r in results if r["strategy"] == strategy and r.get("backtest", {}) == backtest_kwargs]
+    done = {param_key(r["strategy"], r["params"], backtest_kwargs) for r in results}
+    pending = [c for c in candidates if param_key(strategy, c, backtest_kwargs) not in done]
+    logger.info(f"Sweep {strategy}: {len(pending)} pending, {len(candidates) - len(pending)} already done")
+    if not pending:
+        return rank(results)
+
+    shm = _share(candles)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_attach,
+            initargs=(shm.name, len(candles))
+        ) as pool, open(results_path, "a") as out:
+            futures = [pool.submit(_evaluate, strategy, params, backtest_kwargs) for params in pending]
+            for future in as_completed(futures):
+                result = future.result()
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                results.append(result)
+    finally:
+        shm.close()
+        shm.unlink()
+    return rank(results)
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    with open(sys.argv[1]) as f:
+        history = json.load(f)
+    strategy = sys.argv[2] if len(sys.argv) > 2 else FUSION
+    defaults = None
+    if strategy == ENGINE:
+        # Only this process reads the live configuration; workers get plain values
+        from app import Config
+        defaults = engine_defaults(Config)
+    ranked = run_sweep(history, strategy, defaults=defaults)
+    for r in ranked[:10]:
+        print(json.dumps(r))
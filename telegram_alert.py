@@ -1,5 +1,273 @@
-import requests
+""" Non-blocking Telegram delivery - one pooled connection, burst batching, 429 / retry handling """
+
+import asyncio
+import atexit
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import httpx
+import logging
+from metrics import STAGE_LATENCY, UPSTREAM_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+MAX_MESSAGE_LENGTH = 4096
+SEPARATOR = "\n\n━━━━━━━━━━\n\n"
+
+
+class TelegramQueue:
+    def __init__(
+        self,
+        bot_token: str,
+        base_url: str = TELEGRAM_API_URL,
+        batch_window: float = 0.5,
+        max_batch: int = 10,
+        max_retries: int = 5,
+        max_backoff: float = 30.0,
+        timeout: float = 10.0
+    ):
+        self.bot_token = bot_token
+        self.base_url = base_url
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.delivered = 0
+        self.failed = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.messages_sent = 0
+        self.latency_last = 0.0
+        self.latency_max = 0.0
+        self._latency_total = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Run the worker on the current event loop (FastAPI lifespan)."""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._task = self._loop.create_task(self._worker())
+
+    def start_in_thread(self):
+        """Run the worker on a private loop in a daemon thread, for callers without one."""
+        ready = threading.Event()
+
+        def runner():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+
+            async def main():
+                self.start()
+                ready.set()
+                try:
+                    await self._task
+                except asyncio.CancelledError:
+                    pass
+                if self._client is not None:
+                    await self._client.aclose()
+                    self._client = None
+
+            loop.run_until_complete(main())
+
+        self._thread = threading.Thread(target=runner, name="telegram-queue", daemon=True)
+        self._thread.start()
+        ready.wait()
+        # A script that alerts and exits would otherwise kill the daemon thread with the batch unsent
+        atexit.register(self.close)
+
+    def submit(self, chat_id: str, text: str):
+        """Thread-safe, never blocks on the network."""
+        with self._lock:
+            if not self.running:
+                self.start_in_thread()
+        item = (chat_id, text, time.monotonic())
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        if current is self._loop:
+            self._queue.put_nowait(item)
+        else:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+        self.enqueued += 1
+
+    async def stop(self, timeout: float = 5.0):
+        """Drain what is queued (bounded by timeout), then stop the worker."""
+        if not self.running or self._loop is not asyncio.get_running_loop():
+            return
+        await self._drain(timeout)
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def close(self, timeout: float = 5.0):
+        """Blocking drain for the thread-mode worker; registered with atexit by start_in_thread."""
+        if not self.running or self._thread is None or threading.current_thread() is self._thread:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._drain(timeout), self._loop)
+        try:
+            future.result(timeout + 1)
+        except Exception as e:
+            logger.warning(f"Telegram queue did not drain: {e}")
+        self._loop.call_soon_threadsafe(self._task.cancel)
+        self._thread.join(timeout)
+
+    async def _drain(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Telegram queue stopped with {self._queue.qsize()} undelivered")
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=1, max_keepalive_connections=1)
+            )
+        return self._client
+
+    async def _worker(self):
+        while True:
+            batch = [await self._queue.get()]
+            # Collect whatever else arrives within the window into the same send
+            deadline = self._loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                for chat_id, text, queued in self._merge(batch):
+                    await self._deliver(chat_id, text, queued)
+            except Exception as e:
+                logger.error(f"Telegram worker error: {e}")
+                self.failed += len(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _merge(self, batch: List[Tuple[str, str, float]]) -> List[Tuple[str, str, List[float]]]:
+        merged: List[Tuple[str, str, List[float]]] = []
+        by_chat: Dict[str, int] = {}
+        for chat_id, text, queued in batch:
+            i = by_chat.get(chat_id)
+            if i is not None and len(merged[i][1]) + len(SEPARATOR) + len(text) <= MAX_MESSAGE_LENGTH:
+                _, joined, times = merged[i]
+                merged[i] = (chat_id, joined + SEPARATOR + text, times + [queued])
+            else:
+                by_chat[chat_id] = len(merged)
+                merged.append((chat_id, text[:MAX_MESSAGE_LENGTH], [queued]))
+        return merged
+
+    async def _deliver(self, chat_id: str, text: str, queued: List[float]) -> bool:
+        backoff = 1.0
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = await self.client.post(
+                    f"/bot{self.bot_token}/sendMessage",
+                    json={"chat_id": chat_id, "text": text}
+                )
+                STAGE_LATENCY.observe("telegram_send", value=time.perf_counter() - started)
+                UPSTREAM_REQUESTS.inc("telegram", "sendMessage", str(response.status_code))
+                if response.status_code == 200:
+                    self._record_delivery(queued)
+                    return True
+                if response.status_code == 429:
+                    self.rate_limited += 1
+                    wait = _retry_after(response) or backoff
+                    error = f"rate limited, retry after {wait}s"
+                elif response.status_code < 500:
+                    logger.error(f"Telegram rejected message: {response.status_code} {response.text[:200]}")
+                    self.failed += len(queued)
+                    return False
+                else:
+                    wait = backoff
+                    error = f"HTTP {response.status_code}"
+            except httpx.HTTPError as e:
+                UPSTREAM_REQUESTS.inc("telegram", "sendMessage", "error")
+                wait = backoff
+                error = str(e) or e.__class__.__name__
+            attempt += 1
+            if attempt > self.max_retries:
+                logger.error(f"Telegram delivery failed after {attempt} attempts: {error}")
+                self.failed += len(queued)
+                return False
+            self.retries += 1
+            await asyncio.sleep(wait + random.uniform(0, 0.1 * wait))
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _record_delivery(self, queued: List[float]):
+        now = time.monotonic()
+        self.messages_sent += 1
+        for t in queued:
+            latency = now - t
+            self.delivered += 1
+            self.latency_last = latency
+            self.latency_max = max(self.latency_max, latency)
+            self._latency_total += latency
+
+    def stats(self) -> Dict:
+        return {
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "messages_sent": self.messages_sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "latency_last_ms": round(self.latency_last * 1000, 3),
+            "latency_avg_ms": round(self._latency_total / self.delivered * 1000, 3) if self.delivered else 0.0,
+            "latency_max_ms": round(self.latency_max * 1000, 3)
+        }
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        value = response.json().get("parameters", {}).get("retry_after")
+    except ValueError:
+        value = None
+    value = value or response.headers.get("Retry-After")
+    return float(value) if value else None
+
+
+_queues: Dict[str, TelegramQueue] = {}
+_queues_lock = threading.Lock()
+
+
+def get_queue(token: str, base_url: Optional[str] = None) -> TelegramQueue:
+    """One queue (and one pooled connection) per bot token, shared process-wide."""
+    with _queues_lock:
+        queue = _queues.get(token)
+        if queue is None:
+            queue = _queues[token] = TelegramQueue(token, base_url or TELEGRAM_API_URL)
+        return queue
+
 
 def send_telegram_alert(token, chat_id, msg):
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    requests.post(url, json={"chat_id": chat_id, "text": msg})
+    get_queue(token).submit(chat_id, msg)
@@ -0,0 +1,134 @@
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from columnar import CandleArray  # noqa: E402
+
+
+def make_candles(n, seed, start=1_600_000_000, period=3600):
+    # Random walk with frequent large bodies and price jumps, so zones form and get mitigated
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.012, n)))
+    open_ = np.empty(n)
+    open_[0] = 100.0
+    open_[1:] = close[:-1] * (1 + rng.normal(0, 0.004, n - 1))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.003, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.003, n)))
+    volume = rng.lognormal(1.0, 0.5, n)
+    return CandleArray(open_, high, low, close, volume, start + np.arange(n) * period).to_candles()
+
+
+class FakeHTTPServer:
+    """Local HTTP server: records every request and answers from a script, then 200 {"ok": true}."""
+
+    def __init__(self):
+        self.requests = []
+        self.responses = []
+        self.routes = {}
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, as the real APIs: the client port shows which pooled connection was used
+            protocol_version = "HTTP/1.1"
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode() if length else ""
+                fake.requests.append({"method": self.command, "path": self.path, "headers": dict(self.headers), "body": body,
+                                     "client_port": self.client_address[1]})
+                route = fake.routes.get((self.command, self.path.split("?")[0]))
+                if route is not None:
+                    status, payload, headers = route(self.path, body)
+                elif fake.responses:
+                    status, payload, headers = fake.responses.pop(0)
+                else:
+                    status, payload, headers = 200, {"ok": True}, {}
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_DELETE = _handle
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def json_bodies(self):
+        return [json.loads(r["body"]) for r in self.requests if r["body"]]
+
+
+@pytest.fixture
+def http_server():
+    server = FakeHTTPServer()
+    server.thread.start()
+    yield server
+    server.server.shutdown()
+    server.server.server_close()
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    # app opens its journal and reads config at import: keep both away from the working tree
+    os.environ["SCANNER_ENABLED"] = "false"
+    os.environ["MARKET_FEED_ENABLED"] = "false"
+    os.environ["STATE_BACKEND"] = "memory"
+    os.environ["JOURNAL_PATH"] = str(tmp_path_factory.mktemp("journal") / "journal.db")
+    import app
+    return app
+
+
+class LocalServer:
+    """An ASGI app served by uvicorn on a free local port, in a background thread."""
+
+    def __init__(self, asgi_app):
+        import socket
+        import uvicorn
+        self.socket = socket.socket()
+        self.socket.bind(("127.0.0.1", 0))
+        self.url = f"http://127.0.0.1:{self.socket.getsockname()[1]}"
+        self.server = uvicorn.Server(uvicorn.Config(asgi_app, log_level="warning", lifespan="off"))
+        self.thread = threading.Thread(target=self.server.run, kwargs={"sockets": [self.socket]}, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(5)
+        self.socket.close()
+
+
+@pytest.fixture
+def mock_exchange(monkeypatch):
+    import mock_exchange as exchange
+    monkeypatch.setattr(exchange, "API_KEY", "KEY")
+    monkeypatch.setattr(exchange, "API_SECRET", "SECRET")
+    monkeypatch.setattr(exchange, "ACK_DELAY_MS", 0)
+    monkeypatch.setattr(exchange, "REJECT_SYMBOLS", set())
+    monkeypatch.setattr(exchange, "REJECT_STOP_TYPES", set())
+    monkeypatch.setattr(exchange, "FILL_LIMIT_ORDERS", False)
+    exchange.orders.clear()
+    server = LocalServer(exchange.app)
+    server.start()
+    server.exchange = exchange
+    yield server
+    server.stop()
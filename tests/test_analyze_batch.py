@@ -0,0 +1,105 @@
+import asyncio
+import warnings
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic.warnings import PydanticDeprecatedSince20
+
+from scanner import SessionScanner
+
+
+class Scripted:
+    """Stands in for TradingEngine._analyze_shared: records calls and how many ran at once."""
+
+    def __init__(self):
+        self.signal = None
+        self.calls = []
+        self.running = 0
+        self.peak = 0
+
+    async def __call__(self, symbol):
+        self.calls.append(symbol)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            if symbol == "BAD":
+                raise RuntimeError("upstream 502")
+            await asyncio.sleep(1.0 if symbol == "SLOW" else 0.02)
+            return {"signal": self.signal if symbol == "SIG" else None, "fetch_ms": 1.0, "detect_ms": 0.5}
+        finally:
+            self.running -= 1
+
+
+@pytest.fixture
+def script(app_module, monkeypatch):
+    script = Scripted()
+    monkeypatch.setattr(app_module.trading_engine, "_analyze_shared", script)
+    monkeypatch.setattr(app_module.trading_engine, "_can_analyze", lambda: True)
+    return script
+
+
+@pytest.fixture
+def engine(app_module, script):
+    return app_module.trading_engine
+
+
+def by_symbol(results):
+    return {r["symbol"]: r for r in results}
+
+
+def test_concurrency_is_capped(engine, script):
+    symbols = [f"S{i}" for i in range(10)]
+    results = asyncio.run(engine.analyze_many(symbols, concurrency=3))
+    assert [r["symbol"] for r in results] == symbols
+    assert script.peak == 3
+
+
+def test_slow_and_failing_symbols_do_not_sink_the_batch(engine):
+    results = by_symbol(asyncio.run(engine.analyze_many(["BTCUSD", "SLOW", "BAD", "ETHUSD"], timeout=0.2)))
+    assert results["SLOW"]["status"] == "timeout"
+    assert results["BAD"]["status"] == "error" and results["BAD"]["error"] == "upstream 502"
+    assert results["BTCUSD"]["status"] == results["ETHUSD"]["status"] == "no_signal"
+    assert results["BTCUSD"]["fetch_ms"] == 1.0 and results["BTCUSD"]["total_ms"] < 200
+
+
+def test_duplicate_symbols_are_analyzed_once(engine, script):
+    results = asyncio.run(engine.analyze_many(["BTCUSD", "ETHUSD", "BTCUSD"]))
+    assert [r["symbol"] for r in results] == ["BTCUSD", "ETHUSD"]
+    assert sorted(script.calls) == ["BTCUSD", "ETHUSD"]
+
+
+def test_batch_route(app_module, script):
+    client = TestClient(app_module.app)
+    response = client.post("/analyze/batch", json={"symbols": ["BTCUSD", "BAD"], "concurrency": 2})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["signals"] == [] and [r["status"] for r in body["results"]] == ["no_signal", "error"]
+    too_many = [f"S{i}" for i in range(app_module.Config.BATCH_MAX_SYMBOLS + 1)]
+    assert client.post("/analyze/batch", json={"symbols": too_many}).status_code == 422
+    assert client.post("/analyze/batch", json={"symbols": ["BTCUSD"], "concurrency": 0}).status_code == 422
+    assert script.calls == ["BTCUSD", "BAD"]
+
+
+def test_signals_serialize_without_deprecated_pydantic_calls(app_module, engine, script, monkeypatch):
+    script.signal = app_module.FuturesSignal(
+        symbol="SIG", trade_type=app_module.TradeType.FUTURES_LONG, entry_price=100.0, stop_loss=95.0,
+        target_price=110.0, confidence=0.8, leverage=1, session=app_module.SessionType.CRYPTO_PRIME, reasons=[]
+    )
+    published = []
+
+    async def publish(signal):
+        published.append(signal.symbol)
+        return True
+
+    monkeypatch.setattr(app_module, "publish_signal", publish)
+    client = TestClient(app_module.app)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", PydanticDeprecatedSince20)
+        batch = client.post("/analyze/batch", json={"symbols": ["SIG"]}).json()
+        single = client.get("/analyze/SIG").json()
+        scanner = SessionScanner(engine, ["SIG"], publish=publish)
+        asyncio.run(scanner.scan())
+    expected = script.signal.model_dump(mode="json")
+    assert batch["signals"] == [expected] and single == {"status": "signal", "data": expected}
+    assert scanner.latest("SIG")["signal"] == script.signal.model_dump()
+    assert published == ["SIG", "SIG", "SIG"]
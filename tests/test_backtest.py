@@ -0,0 +1,55 @@
+import pytest
+
+from backtest import ENGINE, FUSION, run_backtest
+from conftest import make_candles
+
+RULES = {"risk_reward": 2.0, "min_displacement": 0.01, "min_gap": 0.002}
+
+
+def assert_same_trades(fast, reference):
+    assert len(fast["trades"]) == len(reference["trades"])
+    for a, b in zip(fast["trades"], reference["trades"]):
+        assert (a["side"], a["entry_index"], a["exit_index"], a["reason"]) == \
+            (b["side"], b["entry_index"], b["exit_index"], b["reason"])
+        # Wilder stops are carried in a different summation order: last-bit differences only
+        for key in ("entry", "stop", "target", "exit", "return"):
+            assert a[key] == pytest.approx(b[key], rel=1e-12)
+    assert fast["equity"] == pytest.approx(reference["equity"], rel=1e-12)
+
+
+@pytest.fixture(scope="module")
+def engine(app_module):
+    return app_module.TradingEngine()
+
+
+@pytest.mark.parametrize("seed", [21, 22])
+@pytest.mark.parametrize("use_zone_index", [True, False])
+def test_engine_fast_matches_reference_loop(engine, seed, use_zone_index):
+    candles = make_candles(400, seed)
+    fast = run_backtest(candles, ENGINE, engine=engine, use_zone_index=use_zone_index)
+    reference = run_backtest(candles, ENGINE, engine=engine, use_zone_index=use_zone_index, fast=False)
+    assert_same_trades(fast, reference)
+    assert reference["stats"]["trades"] > 0
+    if use_zone_index:
+        assert {t["side"] for t in reference["trades"]} == {"long", "short"}
+
+
+@pytest.mark.parametrize("config", [
+    {"ailength": 10, "aimultiplier": 0.3},
+    {"ailength": 5, "aimultiplier": 0.5, "atr_mode": "wilder"}
+])
+def test_fusion_fast_matches_reference_loop(config):
+    candles = make_candles(1500, 23)
+    fast = run_backtest(candles, FUSION, config=config)
+    reference = run_backtest(candles, FUSION, config=config, fast=False)
+    assert_same_trades(fast, reference)
+    assert reference["stats"]["trades"] > 0
+
+
+def test_engine_needs_an_engine_or_every_rule():
+    candles = make_candles(50, 24)
+    with pytest.raises(ValueError):
+        run_backtest(candles, ENGINE, **RULES)
+    with pytest.raises(ValueError):
+        run_backtest(candles, ENGINE, use_zone_index=True, fast=False, **RULES)
+    assert run_backtest(candles, ENGINE, use_zone_index=True, **RULES)["equity"].size == 50
@@ -0,0 +1,58 @@
+import json
+import logging
+import os
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import run as bench  # noqa: E402
+from synthetic import REGIMES, generate  # noqa: E402
+
+QUICK = ["--cases", "detect_fvg_np", "--sizes", "100", "--regimes", "trending"]
+
+
+@pytest.fixture(autouse=True)
+def restore_logging():
+    # main() silences warnings for clean output: not for the tests after this module
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def test_synthetic_regimes_are_seeded_and_well_formed():
+    for regime in REGIMES:
+        a, b = generate(500, regime, seed=3), generate(500, regime, seed=3)
+        assert (a.close == b.close).all() and (a.timestamp == b.timestamp).all()
+        assert (a.high >= a.close).all() and (a.low <= a.open).all()
+        assert (a.timestamp[1:] > a.timestamp[:-1]).all()
+    with pytest.raises(ValueError):
+        generate(10, "sideways")
+
+
+def test_compare_flags_only_slowdowns_beyond_threshold_and_floor():
+    baseline = {"a/trending/100": {"median_s": 0.010}, "b/trending/100": {"median_s": 0.010},
+                "c/trending/100": {"median_s": 0.00001}}
+    results = {"a/trending/100": {"median_s": 0.012}, "b/trending/100": {"median_s": 0.020},
+               "c/trending/100": {"median_s": 0.00005}, "d/trending/100": {"median_s": 1.0}}
+    regressions = bench.compare(results, baseline, threshold=0.25, floor=0.00005)
+    # a within 25%, c under the noise floor, d has no baseline
+    assert len(regressions) == 1 and regressions[0].startswith("b/trending/100")
+
+
+def test_gate_saves_compares_and_requires_a_baseline(tmp_path):
+    path = str(tmp_path / "baseline.json")
+    assert bench.main(QUICK + ["--baseline", path]) == 0
+    assert bench.main(QUICK + ["--baseline", path, "--require-baseline"]) == 2
+    assert bench.main(QUICK + ["--baseline", path, "--save"]) == 0
+    with open(path) as f:
+        saved = json.load(f)
+    assert list(saved["results"]) == ["detect_fvg_np/trending/100"]
+    assert bench.main(QUICK + ["--baseline", path, "--require-baseline"]) == 0
+    # A baseline no real run can match: the gate fails
+    saved["results"]["detect_fvg_np/trending/100"]["median_s"] = 1e-9
+    with open(path, "w") as f:
+        json.dump(saved, f)
+    assert bench.main(QUICK + ["--baseline", path, "--floor-ms", "0"]) == 1
@@ -0,0 +1,125 @@
+import asyncio
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from candle_store import CandleStore
+from scheduler import RequestScheduler
+
+HOUR = 3600
+
+
+class Exchange:
+    """Candle history route for FakeHTTPServer: hourly bars up to the previous hour, so a test can open one more."""
+
+    def __init__(self, bars=10):
+        now = int(time.time()) // HOUR * HOUR - HOUR
+        self.bars = [self.bar(now - (bars - 1 - i) * HOUR, 100.0 + i) for i in range(bars)]
+        self.fail = False
+        self.queries = []
+
+    @staticmethod
+    def bar(t, close):
+        return {"time": t, "open": 100.0, "high": max(100.0, close), "low": min(100.0, close), "close": close, "volume": 1.0}
+
+    def __call__(self, path, body):
+        query = {k: v[0] for k, v in parse_qs(urlparse(path).query).items()}
+        self.queries.append(query)
+        if self.fail:
+            return 500, {"error": "upstream down"}, {}
+        bars = [b for b in self.bars
+                if b["time"] >= int(query.get("start", 0)) and b["time"] <= int(query.get("end", 2**40))]
+        # Delta returns the newest bars first
+        return 200, {"result": bars[-int(query["limit"]):][::-1]}, {}
+
+
+@pytest.fixture
+def exchange(http_server):
+    route = Exchange()
+    http_server.routes[("GET", "/v2/history/candles")] = route
+    return route
+
+
+@pytest.fixture
+def with_store(app_module, http_server, exchange):
+    """Run scenario(store) in one event loop, against the real async client and the fake exchange."""
+    def run(scenario, **kwargs):
+        async def main():
+            client = app_module.AsyncDeltaClient(
+                "KEY", "SECRET", base_url=http_server.url, scheduler=RequestScheduler(rate=1000, burst=1000)
+            )
+            try:
+                store = CandleStore(client, **kwargs)
+                await scenario(store)
+                return store
+            finally:
+                await client.aclose()
+        return asyncio.run(main())
+    return run
+
+
+def closes(candles):
+    return [c["close"] for c in candles]
+
+
+def test_hits_fetch_only_from_the_last_cached_bar(with_store, exchange):
+    async def scenario(store):
+        assert closes(await store.get_candles("BTCUSD", "60", 5)) == [105.0, 106.0, 107.0, 108.0, 109.0]
+        assert "start" not in exchange.queries[0]
+        # The forming bar moves on, then the next bar opens
+        exchange.bars[-1] = exchange.bar(exchange.bars[-1]["time"], 111.0)
+        window = await store.get_candles("BTCUSD", "60", 5)
+        assert exchange.queries[1]["start"] == str(exchange.bars[-1]["time"])
+        assert closes(window) == [105.0, 106.0, 107.0, 108.0, 111.0]
+        exchange.bars.append(exchange.bar(exchange.bars[-1]["time"] + HOUR, 112.0))
+        assert closes(await store.get_candles("BTCUSD", "60", 5)) == [106.0, 107.0, 108.0, 111.0, 112.0]
+
+    store = with_store(scenario)
+    assert store.stats() == {"series": 1, "hits": 2, "misses": 1, "hit_rate": pytest.approx(2 / 3),
+                             "evictions": 0, "bars_fetched": 5 + 1 + 2, "gaps": 0, "fetch_errors": 0}
+
+
+def test_failed_refresh_serves_the_tail_for_max_stale_only(with_store, exchange):
+    async def scenario(store):
+        window = await store.get_candles("BTCUSD", "60", 5)
+        exchange.fail = True
+        assert await store.get_candles("BTCUSD", "60", 5) == window
+        assert store.stats()["fetch_errors"] == 1
+        store._series[("BTCUSD", "60")].refreshed_at -= 61.0
+        assert await store.get_candles("BTCUSD", "60", 5) == []
+        assert store.stats()["fetch_errors"] == 2
+        exchange.fail = False
+        assert (await store.get_candles("BTCUSD", "60", 5))[-1]["close"] == 109.0
+
+    with_store(scenario, max_stale=60.0)
+
+
+def test_failed_first_fetch_caches_nothing(with_store, exchange):
+    async def scenario(store):
+        exchange.fail = True
+        assert await store.get_candles("BTCUSD") == []
+
+    stats = with_store(scenario).stats()
+    assert stats["series"] == 0 and stats["fetch_errors"] == 1
+
+
+def test_least_recently_used_series_go_beyond_max_series(with_store):
+    async def scenario(store):
+        for symbol in ("BTCUSD", "ETHUSD", "BTCUSD", "SOLUSD"):
+            await store.get_candles(symbol)
+
+    store = with_store(scenario, max_series=2)
+    assert {symbol for symbol, _ in store._series} == {"BTCUSD", "SOLUSD"}
+    assert store.stats()["evictions"] == 1
+
+
+def test_idle_series_expire(with_store):
+    async def scenario(store):
+        await store.get_candles("BTCUSD")
+        await asyncio.sleep(0.25)
+        await store.get_candles("ETHUSD")
+
+    store = with_store(scenario, idle_ttl=0.2)
+    assert {symbol for symbol, _ in store._series} == {"ETHUSD"}
+    assert store.stats()["evictions"] == 1
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from coalesce import MISS, BarCache, SignalDeduper, SingleFlight, last_closed_bar
+
+
+def test_concurrent_callers_share_one_execution():
+    calls = []
+
+    async def work(symbol):
+        calls.append(symbol)
+        await asyncio.sleep(0.01)
+        return {"symbol": symbol}
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.run("BTCUSD", work, "BTCUSD") for _ in range(5)),
+                                       flight.run("ETHUSD", work, "ETHUSD"))
+        return flight, results
+
+    flight, results = asyncio.run(main())
+    assert sorted(calls) == ["BTCUSD", "ETHUSD"]
+    assert results[0] is results[4] and results[5] == {"symbol": "ETHUSD"}
+    assert flight.stats() == {"in_flight": 0, "leaders": 2, "followers": 4}
+
+
+def test_followers_share_the_exception_and_the_key_is_released():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def ok():
+        return "fresh"
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(flight.run("k", fail), flight.run("k", fail), return_exceptions=True)
+        return results, await flight.run("k", ok)
+
+    results, retried = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert retried == "fresh"
+
+
+def test_a_caller_giving_up_does_not_cancel_the_shared_work():
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        flight = SingleFlight()
+        impatient = asyncio.ensure_future(flight.run("k", slow))
+        patient = asyncio.ensure_future(flight.run("k", slow))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        return await patient
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_result_is_valid_until_the_next_bar_closes():
+    cache = BarCache(60.0)
+    # At 10:02:30 the last closed bar opened at 10:01:00
+    now = 36_150.0
+    cache.put("BTCUSD", 36_060.0, "result")
+    assert cache.get("BTCUSD", now) == "result"
+    assert cache.get("BTCUSD", 36_179.0) == "result"
+    assert cache.get("BTCUSD", 36_180.0) is MISS
+    # A result built before its bar closed is never cached as current
+    cache.put("ETHUSD", 36_000.0, "stale")
+    assert cache.get("ETHUSD", now) is MISS
+    cache.put("SOLUSD", None, "no bars")
+    assert cache.get("SOLUSD", now) is MISS
+    assert cache.stats() == {"entries": 2, "hits": 2, "misses": 3}
+
+
+def test_last_closed_bar_skips_the_forming_bar():
+    candles = [{"time": t} for t in (0, 60, 120)]
+    assert last_closed_bar(candles, 60.0, now=150.0) == 60
+    assert last_closed_bar(candles, 60.0, now=180.0) == 120
+    assert last_closed_bar(candles, 60.0, now=59.0) is None
+
+
+def test_setup_is_alerted_once_per_ttl():
+    dedup = SignalDeduper(ttl=100.0)
+    key = ("BTCUSD", "FUTURES_LONG", 95.0)
+    assert dedup.first(key, now=0.0)
+    assert not dedup.first(key, now=99.0)
+    assert dedup.first(("BTCUSD", "FUTURES_SHORT", 105.0), now=99.0)
+    assert dedup.first(key, now=100.0)
+    assert dedup.stats() == {"tracked": 2, "suppressed": 1}
+
+
+def test_engine_reuses_the_result_for_the_current_bar(app_module, monkeypatch):
+    engine = app_module.trading_engine
+    fetches = []
+
+    async def fresh(symbol):
+        fetches.append(symbol)
+        await asyncio.sleep(0.01)
+        return {"signal": None}
+
+    async def main():
+        first = await asyncio.gather(*(engine._analyze_shared("XRPUSD") for _ in range(3)))
+        return first, await engine._analyze_shared("XRPUSD")
+
+    monkeypatch.setattr(engine, "_analyze_fresh", fresh)
+    monkeypatch.setattr(engine, "results", BarCache(60.0))
+    first, _ = asyncio.run(main())
+    # Not put in the cache by the stub: a second round is a new computation, but still one per round
+    assert fetches == ["XRPUSD", "XRPUSD"] and first[0] is first[2]
+    engine.results.put("XRPUSD", engine.results.expected_bar(), {"signal": None})
+    assert asyncio.run(engine._analyze_shared("XRPUSD")) == {"signal": None, "cached": True}
+    assert fetches == ["XRPUSD", "XRPUSD"]
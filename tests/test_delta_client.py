@@ -0,0 +1,125 @@
+import asyncio
+import hashlib
+import hmac
+import time
+
+import httpx
+import pytest
+
+from execution import OrderRejected
+from scheduler import RequestScheduler
+
+CANDLES = [{"time": 1_600_000_000, "open": 1, "high": 2, "low": 0.5, "close": 1.5, "volume": 10}]
+
+
+@pytest.fixture
+def make_client(app_module):
+    def make(url, **kwargs):
+        kwargs.setdefault("scheduler", RequestScheduler(rate=1000, burst=1000, max_retries=2))
+        return app_module.AsyncDeltaClient("KEY", "SECRET", base_url=url, **kwargs)
+    return make
+
+
+def run(client, coro):
+    async def main():
+        try:
+            return await coro()
+        finally:
+            await client.aclose()
+    return asyncio.run(main())
+
+
+def test_requests_reuse_pooled_connections(http_server, make_client):
+    http_server.routes[("GET", "/v2/tickers/BTCUSD")] = lambda path, body: (200, {"result": {"close": 1}}, {})
+    client = make_client(http_server.url, max_connections=4)
+
+    async def calls():
+        for _ in range(5):
+            await client.get_ticker("BTCUSD")
+        await asyncio.gather(*(client.get_ticker("BTCUSD") for _ in range(20)))
+
+    run(client, calls)
+    ports = [r["client_port"] for r in http_server.requests]
+    assert len(ports) == 25
+    # Sequential calls share one keep-alive connection; a burst never opens more than the pool allows
+    assert len(set(ports[:5])) == 1
+    assert len(set(ports)) <= 4
+
+
+def test_snapshot_fetches_candles_and_ticker_concurrently(http_server, make_client):
+    def slow(payload):
+        def route(path, body):
+            time.sleep(0.3)
+            return 200, {"result": payload}, {}
+        return route
+
+    http_server.routes[("GET", "/v2/history/candles")] = slow(CANDLES)
+    http_server.routes[("GET", "/v2/tickers/ETHUSD")] = slow({"close": 1.5})
+    client = make_client(http_server.url)
+    started = time.monotonic()
+    candles, ticker = run(client, lambda: client.get_snapshot("ETHUSD", "60", 100))
+    assert candles == CANDLES and ticker == {"close": 1.5}
+    assert time.monotonic() - started < 0.55
+    query = next(r["path"] for r in http_server.requests if r["path"].startswith("/v2/history"))
+    assert "symbol=ETHUSD" in query and "resolution=60" in query and "limit=100" in query
+
+
+def test_429_is_retried_after_the_advertised_wait(http_server, make_client):
+    http_server.responses.append((429, {"error": "rate_limited"}, {"Retry-After": "0.2"}))
+    http_server.responses.append((200, {"result": {"close": 2}}, {}))
+    client = make_client(http_server.url)
+    started = time.monotonic()
+    assert run(client, lambda: client.get_ticker("BTCUSD")) == {"close": 2}
+    assert time.monotonic() - started >= 0.2
+    assert len(http_server.requests) == 2
+    assert client.scheduler.rate_limited == 1
+
+
+def test_429_backs_off_exponentially_until_retries_run_out(http_server, make_client):
+    for _ in range(3):
+        http_server.responses.append((429, {}, {}))
+    client = make_client(http_server.url, scheduler=RequestScheduler(rate=1000, burst=1000, max_retries=2, max_backoff=0.4))
+    started = time.monotonic()
+    assert run(client, lambda: client.get_ticker("BTCUSD")) is None
+    # No Retry-After: 1s then 2s, both capped by max_backoff
+    assert time.monotonic() - started >= 0.8
+    assert len(http_server.requests) == 3
+
+
+def test_errors_map_to_empty_results_or_exceptions(http_server, make_client):
+    http_server.responses.extend([(500, {}, {})] * 3)
+    http_server.responses.append((400, {"success": False, "error": {"code": "insufficient_margin"}}, {}))
+    client = make_client(http_server.url)
+
+    async def calls():
+        assert await client.get_candles("BTCUSD") == []
+        assert await client.get_ticker("BTCUSD") is None
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.fetch_candles("BTCUSD")
+        with pytest.raises(OrderRejected, match="insufficient_margin"):
+            await client.place_order({"product_symbol": "BTCUSD", "size": 1, "side": "buy"})
+
+    run(client, calls)
+    order = http_server.requests[-1]
+    headers = {name.lower(): value for name, value in order["headers"].items()}
+    message = "POST" + headers["timestamp"] + "/v2/orders" + order["body"]
+    assert headers["api-key"] == "KEY"
+    assert headers["signature"] == hmac.new(b"SECRET", message.encode(), hashlib.sha256).hexdigest()
+
+
+def test_engine_has_only_the_async_client(app_module):
+    engine = app_module.trading_engine
+    assert not hasattr(app_module, "DeltaClient") and not hasattr(engine, "delta_client")
+    assert not hasattr(engine, "analyze")
+
+
+def test_unreachable_host_is_an_empty_result(make_client):
+    client = make_client("http://127.0.0.1:9")
+
+    async def calls():
+        assert await client.get_candles("BTCUSD") == []
+        assert await client.get_ticker("BTCUSD") is None
+        with pytest.raises(httpx.HTTPError):
+            await client.fetch_candles("BTCUSD")
+
+    run(client, calls)
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from columnar import CandleArray
+from conftest import make_candles
+from smc_indicator import get_rahulyadav_ai, get_smc_structure, get_zero_to_millionaire_signal
+
+
+def windows(seed, count=60):
+    # Random lengths, short ones included: both versions must agree on "not enough bars" too
+    candles = make_candles(400, seed)
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        end = int(rng.integers(1, len(candles) + 1))
+        start = max(0, end - int(rng.integers(1, 120)))
+        yield candles[start:end]
+
+
+@pytest.mark.parametrize("seed", [31, 32, 33, 34])
+def test_vectorized_ict_detectors_match_list_loops(app_module, seed):
+    detector = app_module.ICTDetector()
+    found = {"order_block": 0, "fvg": 0}
+    for rows in windows(seed):
+        array = CandleArray.from_candles(rows)
+        ob = detector.detect_order_block(rows)
+        fvg = detector.detect_fvg(rows)
+        assert detector.detect_order_block(array) == ob
+        assert detector.detect_fvg(array) == fvg
+        found["order_block"] += ob is not None
+        found["fvg"] += fvg is not None
+    assert all(found.values())
+
+
+@pytest.mark.parametrize("seed", [35, 36])
+@pytest.mark.parametrize("config", [{}, {"ailength": 5, "aimultiplier": 0.5}])
+def test_vectorized_structure_and_supertrend_match_list_loops(seed, config):
+    sides = set()
+    for rows in windows(seed):
+        array = CandleArray.from_candles(rows)
+        assert get_smc_structure(array) == get_smc_structure(rows)
+        assert get_rahulyadav_ai(array, config) == get_rahulyadav_ai(rows, config)
+        fused = get_zero_to_millionaire_signal(rows, config)
+        assert get_zero_to_millionaire_signal(rows, dict(config, vectorized=True)) == fused
+        sides.add(get_smc_structure(rows)["side"])
+    assert sides == {"buy", "sell", "hold"}
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import time
+
+from events import EventHub, format_event
+
+
+async def subscribe(hub, **kwargs):
+    # Start a stream and run it up to its first await on the queue
+    stream = hub.stream(**kwargs)
+    first = asyncio.ensure_future(stream.__anext__())
+    await asyncio.sleep(0)
+    return stream, first
+
+
+def test_one_frame_fans_out_to_every_subscriber():
+    async def main():
+        hub = EventHub(heartbeat=5)
+        a, a_next = await subscribe(hub)
+        b, b_next = await subscribe(hub)
+        hub.publish("signal", {"symbol": "BTCUSD"})
+        frames = await asyncio.gather(a_next, b_next)
+        stats = hub.stats()
+        await a.aclose()
+        await b.aclose()
+        return frames, stats, hub.stats()
+
+    frames, stats, after = asyncio.run(main())
+    assert frames == [format_event("signal", {"symbol": "BTCUSD"})] * 2
+    assert stats == {"subscribers": 2, "published": 1, "dropped": 0}
+    assert after["subscribers"] == 0
+
+
+def test_snapshot_first_then_keepalive_when_idle():
+    async def main():
+        hub = EventHub(heartbeat=0.05)
+        stream = hub.stream(snapshot=lambda: {"active_trades": 0})
+        frames = [await stream.__anext__(), await stream.__anext__()]
+        await stream.aclose()
+        return frames
+
+    snapshot, keepalive = asyncio.run(main())
+    assert snapshot == format_event("snapshot", {"active_trades": 0})
+    assert keepalive == ": keepalive\n\n"
+
+
+def test_slow_subscriber_drops_its_oldest_frames():
+    async def main():
+        hub = EventHub(queue_size=2, heartbeat=5)
+        # The snapshot frame is yielded once the subscriber's queue is registered
+        stream = hub.stream(snapshot=dict)
+        await stream.__anext__()
+        for i in range(5):
+            hub.publish("tick", i)
+        frames = [await stream.__anext__(), await stream.__anext__()]
+        await stream.aclose()
+        return frames, hub.stats()
+
+    frames, stats = asyncio.run(main())
+    assert frames == [format_event("tick", 3), format_event("tick", 4)]
+    assert stats["dropped"] == 3
+
+
+def test_publish_from_a_worker_thread_wakes_the_subscriber():
+    # Sync routes run in the threadpool: the frame must reach the loop without waiting for a heartbeat
+    async def main():
+        hub = EventHub(heartbeat=5)
+        stream, first = await subscribe(hub)
+        started = time.monotonic()
+        # Published once the loop is idle in select, waiting on the heartbeat timer
+        threading.Timer(0.1, hub.publish, args=("close", {"symbol": "ETHUSD"})).start()
+        frame = await asyncio.wait_for(first, 2)
+        await stream.aclose()
+        return frame, time.monotonic() - started
+
+    frame, elapsed = asyncio.run(main())
+    assert frame == format_event("close", {"symbol": "ETHUSD"})
+    assert elapsed < 1
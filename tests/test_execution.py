@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+from execution import ACCEPTED, FLATTENED, PARTIAL, REJECTED, ExecutionQueue, bracket_orders
+
+
+@pytest.fixture
+def client_class(app_module):
+    return app_module.AsyncDeltaClient
+
+
+def run_order(client_class, url, legs, **kwargs):
+    alerts = []
+
+    async def main():
+        client = client_class("KEY", "SECRET", base_url=url)
+        queue = ExecutionQueue(client, workers=1, alert=alerts.append, **kwargs)
+        order = queue.submit(legs)
+        await order.done
+        await queue.stop()
+        await client.aclose()
+        return order, queue
+
+    order, queue = asyncio.run(main())
+    return order, queue, alerts
+
+
+def by_leg(exchange):
+    placed = {}
+    for order in exchange.orders.values():
+        placed.setdefault(order["stop_order_type"] if order.get("stop_order_type") else
+                          "close" if order.get("reduce_only") else "entry", []).append(order)
+    return placed
+
+
+def test_full_fill_places_all_three_legs(mock_exchange, client_class):
+    legs = bracket_orders(3, "buy", entry=100.0, stop=95.0, target=110.0, product_symbol="BTCUSD")
+    order, queue, alerts = run_order(client_class, mock_exchange.url, legs)
+    assert order.status == ACCEPTED
+    assert [r["status"] for r in order.results] == [ACCEPTED] * 3
+    placed = by_leg(mock_exchange.exchange)
+    assert placed["entry"][0]["limit_price"] == "100.0"
+    assert placed["stop_loss_order"][0]["side"] == "sell" and placed["stop_loss_order"][0]["reduce_only"]
+    assert placed["take_profit_order"][0]["stop_price"] == "110.0"
+    assert queue.stats()["accepted"] == 1 and not alerts
+
+
+def test_entry_reject_cancels_the_protective_legs(mock_exchange, client_class):
+    mock_exchange.exchange.REJECT_STOP_TYPES.add("none")
+    legs = bracket_orders(1, "sell", stop=2100.0, target=1900.0, product_symbol="ETHUSD")
+    order, queue, alerts = run_order(client_class, mock_exchange.url, legs)
+    assert order.status == REJECTED
+    assert [r["status"] for r in order.results] == [REJECTED, "cancelled", "cancelled"]
+    placed = by_leg(mock_exchange.exchange)
+    assert "entry" not in placed
+    assert placed["stop_loss_order"][0]["state"] == "cancelled"
+    assert placed["take_profit_order"][0]["state"] == "cancelled"
+    assert queue.stats()["rejected"] == 1 and not alerts
+
+
+def test_protective_leg_reject_flattens_and_alerts(mock_exchange, client_class):
+    mock_exchange.exchange.REJECT_STOP_TYPES.add("stop_loss_order")
+    legs = bracket_orders(2, "buy", stop=95.0, target=110.0, product_symbol="BTCUSD")
+    order, queue, alerts = run_order(client_class, mock_exchange.url, legs, protect_retries=2)
+    assert order.status == FLATTENED
+    stop = next(r for r in order.results if r["leg"] == "stop_loss")
+    assert stop["status"] == REJECTED and stop["retries"] == 2
+    placed = by_leg(mock_exchange.exchange)
+    # The market entry filled: the take profit is pulled, the position is closed reduce-only
+    assert placed["entry"][0]["state"] == "closed"
+    assert placed["take_profit_order"][0]["state"] == "cancelled"
+    close = placed["close"][0]
+    assert (close["side"], close["size"], close["order_type"]) == ("sell", 2, "market_order")
+    assert queue.stats()["flattened"] == 1
+    assert len(alerts) == 1 and "flattened" in alerts[0]
+
+
+def test_unfilled_limit_entry_is_pulled_without_a_flatten(mock_exchange, client_class):
+    mock_exchange.exchange.REJECT_STOP_TYPES.add("stop_loss_order")
+    legs = bracket_orders(2, "buy", entry=100.0, stop=95.0, target=110.0, product_symbol="BTCUSD")
+    order, queue, alerts = run_order(client_class, mock_exchange.url, legs, protect_retries=1)
+    assert order.status == REJECTED
+    placed = by_leg(mock_exchange.exchange)
+    assert placed["entry"][0]["state"] == "cancelled"
+    assert placed["take_profit_order"][0]["state"] == "cancelled"
+    # Nothing was bought, so there is nothing to close and nothing to alert about
+    assert "close" not in placed and not alerts
+    assert queue.stats()["rejected"] == 1 and queue.stats()["flattened"] == 0
+
+
+def test_filled_limit_entry_is_flattened(mock_exchange, client_class):
+    mock_exchange.exchange.REJECT_STOP_TYPES.add("stop_loss_order")
+    mock_exchange.exchange.FILL_LIMIT_ORDERS = True
+    legs = bracket_orders(3, "sell", entry=100.0, stop=105.0, target=90.0, product_symbol="BTCUSD")
+    order, queue, alerts = run_order(client_class, mock_exchange.url, legs, protect_retries=1)
+    assert order.status == FLATTENED
+    placed = by_leg(mock_exchange.exchange)
+    # A filled entry is not cancelled, it is closed
+    assert placed["entry"][0]["state"] == "closed"
+    assert (placed["close"][0]["side"], placed["close"][0]["size"]) == ("buy", 3)
+    assert len(alerts) == 1 and "flattened" in alerts[0]
+
+
+def test_limit_entry_that_cannot_be_pulled_is_reported(mock_exchange, client_class):
+    mock_exchange.exchange.REJECT_STOP_TYPES.add("stop_loss_order")
+
+    class NoCancel(client_class):
+        async def cancel_order(self, order_id, **kwargs):
+            raise ConnectionError("exchange unreachable")
+
+    legs = bracket_orders(1, "buy", entry=100.0, stop=95.0, target=110.0, product_symbol="BTCUSD")
+    order, queue, alerts = run_order(NoCancel, mock_exchange.url, legs, protect_retries=1)
+    assert order.status == PARTIAL and "close" not in by_leg(mock_exchange.exchange)
+    assert "MAY OPEN UNPROTECTED" in alerts[0]
+
+
+def test_failed_flatten_is_reported_unprotected(mock_exchange, client_class):
+    mock_exchange.exchange.REJECT_STOP_TYPES.add("stop_loss_order")
+
+    class NoClose(client_class):
+        async def place_order(self, order):
+            if order.get("reduce_only") and not order.get("stop_order_type"):
+                raise ConnectionError("exchange unreachable")
+            return await super().place_order(order)
+
+    alerts = []
+
+    async def main():
+        client = NoClose("KEY", "SECRET", base_url=mock_exchange.url)
+        queue = ExecutionQueue(client, workers=1, protect_retries=1, alert=alerts.append)
+        order = queue.submit(bracket_orders(1, "buy", stop=95.0, target=110.0, product_symbol="BTCUSD"))
+        await order.done
+        await client.aclose()
+        return order, queue
+
+    order, queue = asyncio.run(main())
+    assert order.status == PARTIAL and queue.stats()["partial"] == 1
+    assert "UNPROTECTED" in alerts[0]
+
+
+def test_zero_entry_price_is_a_limit_order():
+    legs = bracket_orders(1, "buy", entry=0.0, product_symbol="BTCUSD")
+    assert legs[0]["order_type"] == "limit_order" and legs[0]["limit_price"] == "0.0"
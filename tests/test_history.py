@@ -0,0 +1,125 @@
+import asyncio
+import os
+
+import numpy as np
+import pytest
+
+import history
+from columnar import CandleArray
+from conftest import make_candles
+from history import HistoryStore
+
+START = 1_600_000_000 // 60 * 60
+
+
+class FakeClient:
+    """fetch_candles over a fixed 1 minute series; fail_at pages raise."""
+
+    def __init__(self, candles, fail_at=()):
+        self.candles = candles
+        self.fail_at = set(fail_at)
+        self.calls = []
+
+    async def fetch_candles(self, symbol, resolution, limit, start=None, end=None, lane=None):
+        self.calls.append((start, end, lane))
+        if len(self.calls) in self.fail_at:
+            raise ConnectionError("upstream reset")
+        page = [c for c in self.candles if start <= c["time"] <= end]
+        # Newest first, as Delta returns them
+        return page[::-1][:limit]
+
+
+@pytest.fixture
+def candles():
+    return make_candles(1000, 61, start=START, period=60)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    async def instant(_):
+        pass
+    monkeypatch.setattr(history.asyncio, "sleep", instant)
+
+
+def download(store, client, start, end, **kwargs):
+    return asyncio.run(store.download(client, "BTCUSD", "1", start, end, **kwargs))
+
+
+def test_download_pages_and_serves_mapped_ranges(tmp_path, candles):
+    store, client = HistoryStore(str(tmp_path)), FakeClient(candles)
+    assert download(store, client, START, START + 999 * 60, page_size=100) == 1000
+    assert len(client.calls) == 10 and {lane for _, _, lane in client.calls} == {"backfill"}
+    assert store.info("BTCUSD", "1") == {"symbol": "BTCUSD", "resolution": "1", "bars": 1000,
+                                         "first": START, "last": START + 999 * 60}
+    part = store.load("BTCUSD", "1", START + 100 * 60, START + 199 * 60)
+    assert not part.close.flags.owndata and len(part) == 100  # a view onto the mapped file
+    assert part.to_candles() == candles[100:200]
+
+
+def test_interrupted_download_resumes_from_the_stored_tail(tmp_path, candles):
+    store = HistoryStore(str(tmp_path))
+    with pytest.raises(ConnectionError):
+        download(store, FakeClient(candles, fail_at={4}), START, START + 999 * 60, page_size=100, max_retries=0)
+    assert store.count("BTCUSD", "1") == 300
+    client = FakeClient(candles)
+    assert download(store, client, START, START + 999 * 60, page_size=100) == 700
+    assert client.calls[0][0] == START + 300 * 60 and len(client.calls) == 7
+    assert store.load("BTCUSD", "1").to_candles() == candles
+
+
+def test_failed_pages_are_retried(tmp_path, candles):
+    store, client = HistoryStore(str(tmp_path)), FakeClient(candles, fail_at={2, 3})
+    assert download(store, client, START, START + 299 * 60, page_size=100, max_retries=2) == 300
+    assert len(client.calls) == 5
+
+
+def test_earlier_range_is_prepended(tmp_path, candles):
+    store = HistoryStore(str(tmp_path))
+    download(store, FakeClient(candles), START + 500 * 60, START + 999 * 60, page_size=250)
+    assert download(store, FakeClient(candles), START, START + 999 * 60, page_size=250) == 500
+    assert store.load("BTCUSD", "1").to_candles() == candles
+
+
+def test_interrupted_prepend_resumes_from_the_staged_pages(tmp_path, candles):
+    store = HistoryStore(str(tmp_path))
+    download(store, FakeClient(candles), START + 500 * 60, START + 999 * 60, page_size=250)
+    with pytest.raises(ConnectionError):
+        download(store, FakeClient(candles, fail_at={3}), START, START + 999 * 60, page_size=100, max_retries=0)
+    # The stored series is untouched; the two pages that arrived are kept aside
+    assert store.bounds("BTCUSD", "1") == (START + 500 * 60, START + 999 * 60)
+    staged = HistoryStore(str(tmp_path / history.STAGING))
+    assert staged.count("BTCUSD", "1") == 200
+    client = FakeClient(candles)
+    assert download(store, client, START, START + 999 * 60, page_size=100) == 500
+    assert client.calls[0][0] == START + 200 * 60 and len(client.calls) == 3
+    assert store.load("BTCUSD", "1").to_candles() == candles
+    assert not os.path.exists(staged.path("BTCUSD", "1"))
+
+
+def test_staged_pages_from_a_later_start_are_discarded(tmp_path, candles):
+    store = HistoryStore(str(tmp_path))
+    download(store, FakeClient(candles), START + 500 * 60, START + 999 * 60, page_size=250)
+    with pytest.raises(ConnectionError):
+        download(store, FakeClient(candles, fail_at={2}), START + 300 * 60, START + 999 * 60,
+                 page_size=100, max_retries=0)
+    client = FakeClient(candles)
+    assert download(store, client, START, START + 999 * 60, page_size=100) == 500
+    assert client.calls[0][0] == START
+    assert store.load("BTCUSD", "1").to_candles() == candles
+
+
+def test_torn_append_is_hidden_then_repaired(tmp_path, candles):
+    store = HistoryStore(str(tmp_path))
+    store.append("BTCUSD", "1", candles[:10])
+    # An append interrupted after the first column: one extra value in open.f64 only
+    with open(os.path.join(store.path("BTCUSD", "1"), "open.f64"), "ab") as f:
+        f.write(np.float64(1.0).tobytes())
+    assert store.count("BTCUSD", "1") == 10
+    assert store.append("BTCUSD", "1", candles[5:20]) == 10
+    loaded = store.load("BTCUSD", "1")
+    assert loaded.to_candles() == CandleArray.from_candles(candles[:20]).to_candles()
+
+
+def test_symbols_cannot_escape_the_root(tmp_path):
+    with pytest.raises(ValueError):
+        HistoryStore(str(tmp_path)).path("../etc", "1")
@@ -0,0 +1,107 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from columnar import CandleArray
+from conftest import make_candles
+from indicators import ATR, SMA, SuperTrend, sma, supertrend, true_range, wilder_atr
+
+
+@pytest.fixture(scope="module")
+def bars():
+    return CandleArray.from_candles(make_candles(600, 31))
+
+
+def reference_tr(high, low, close):
+    return [high[0] - low[0]] + [max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+                                 for i in range(1, len(high))]
+
+
+def reference_atr(high, low, close, length):
+    # The textbook definition, one bar at a time: SMA seed, then Wilder smoothing
+    tr = reference_tr(high, low, close)
+    out = [math.nan] * (length - 1) + [sum(tr[:length]) / length]
+    for value in tr[length:]:
+        out.append((out[-1] * (length - 1) + value) / length)
+    return np.array(out)
+
+
+def replay(indicator, bars, start=0, end=None):
+    return [indicator.update(h, l, c) for h, l, c in zip(bars.high[start:end], bars.low[start:end], bars.close[start:end])]
+
+
+def test_true_range_uses_the_previous_close(bars):
+    assert true_range(bars.high, bars.low, bars.close).tolist() == pytest.approx(
+        reference_tr(bars.high, bars.low, bars.close), rel=1e-15)
+
+
+@pytest.mark.parametrize("length", [1, 5, 14, 50])
+def test_wilder_atr_matches_the_recursion(bars, length):
+    atr = wilder_atr(bars.high, bars.low, bars.close, length)
+    expected = reference_atr(bars.high, bars.low, bars.close, length)
+    assert np.isnan(atr[:length - 1]).all()
+    np.testing.assert_allclose(atr[length - 1:], expected[length - 1:], rtol=1e-12)
+
+
+def test_wilder_atr_is_seeded_with_the_sma_then_smoothed(bars):
+    tr = true_range(bars.high, bars.low, bars.close)
+    atr, plain = wilder_atr(bars.high, bars.low, bars.close, 14), sma(tr, 14)
+    assert atr[13] == pytest.approx(plain[13], rel=1e-15)
+    # From there Wilder carries every bar with weight 1/14; the SMA forgets bars after 14
+    assert not np.allclose(atr[14:], plain[14:])
+
+
+def test_short_series_is_all_warm_up(bars):
+    assert np.isnan(wilder_atr(bars.high[:9], bars.low[:9], bars.close[:9], 10)).all()
+    assert np.isnan(sma(bars.close[:9], 10)).all()
+    st = supertrend(bars.high[:9], bars.low[:9], bars.close[:9], 10)
+    assert np.isnan(st["upper"]).all() and not st["trend"].any()
+
+
+@pytest.mark.parametrize("length", [1, 14])
+def test_incremental_atr_matches_full_series(bars, length):
+    full = wilder_atr(bars.high, bars.low, bars.close, length)
+    values = replay(ATR(length), bars)
+    assert values[:length - 1] == [None] * (length - 1)
+    np.testing.assert_allclose(np.array(values[length - 1:], dtype=float), full[length - 1:], rtol=1e-12)
+
+
+@pytest.mark.parametrize("length, multiplier", [(10, 3.0), (5, 0.5)])
+def test_incremental_supertrend_matches_full_series(bars, length, multiplier):
+    full = supertrend(bars.high, bars.low, bars.close, length, multiplier)
+    values = replay(SuperTrend(length, multiplier), bars)
+    assert values[:length - 1] == [None] * (length - 1)
+    for key in ("atr", "upper", "lower"):
+        np.testing.assert_allclose([v[key] for v in values[length - 1:]], full[key][length - 1:], rtol=1e-12)
+    assert [v["trend"] for v in values[length - 1:]] == full["trend"][length - 1:].tolist()
+    assert set(full["trend"][length - 1:].tolist()) == {-1, 1}
+
+
+def test_incremental_sma_matches_full_series(bars):
+    full = sma(bars.volume, 20)
+    s = SMA(20)
+    values = [s.update(v) for v in bars.volume]
+    assert values[:19] == [None] * 19
+    np.testing.assert_allclose(np.array(values[19:], dtype=float), full[19:], rtol=1e-9)
+
+
+@pytest.mark.parametrize("split", [3, 14, 300])
+def test_state_round_trips_through_json(bars, split):
+    def resumed(make, feed):
+        first = make()
+        head = feed(first, 0, split)
+        restored = type(first).from_state(json.loads(json.dumps(first.state())))
+        return head + feed(restored, split, None)
+
+    def candles(indicator, start, end):
+        return replay(indicator, bars, start, end)
+
+    def volumes(indicator, start, end):
+        return [indicator.update(v) for v in bars.volume[start:end]]
+
+    assert resumed(lambda: ATR(14), candles) == replay(ATR(14), bars)
+    assert resumed(lambda: SuperTrend(10, 3.0), candles) == replay(SuperTrend(10, 3.0), bars)
+    s = SMA(20)
+    assert resumed(lambda: SMA(20), volumes) == [s.update(v) for v in bars.volume]
@@ -0,0 +1,83 @@
+import sqlite3
+import time
+
+from journal import TradeJournal
+
+BRAIN = {"total_trades": 1, "success_rate": 100.0}
+
+
+def wait_written(journal, count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while journal.written + journal.failed < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def write_trades(journal, symbols, close=()):
+    journal.start()
+    for symbol in symbols:
+        journal.record_signal({"symbol": symbol})
+        journal.record_open(symbol, {"symbol": symbol, "entry_price": 100.0})
+    for symbol in close:
+        journal.record_close(symbol, 105.0, True, brain=BRAIN, pnl=5.0, risk={"realized_total": 5.0})
+    journal.stop()
+
+
+def test_replay_rebuilds_state_from_the_log(tmp_path):
+    path = str(tmp_path / "journal.db")
+    write_trades(TradeJournal(path, snapshot_every=0), ["BTCUSD", "ETHUSD"], close=["BTCUSD"])
+    journal = TradeJournal(path)
+    state = journal.replay()
+    assert list(state["active_trades"]) == ["ETHUSD"]
+    assert state["signals"] == 2 and state["brain"] == BRAIN and state["risk"] == {"realized_total": 5.0}
+    assert journal.replayed == 5 and journal.snapshot_seq == 0
+
+
+def test_snapshot_restore_replays_only_the_tail(tmp_path):
+    path = str(tmp_path / "journal.db")
+    first = TradeJournal(path, snapshot_every=4, batch_size=1)
+    write_trades(first, ["BTCUSD", "ETHUSD", "SOLUSD"], close=["ETHUSD"])
+    # Snapshots compact the log: what is left is the tail after the last one
+    assert first.snapshots >= 1
+    journal = TradeJournal(path)
+    state = journal.replay()
+    assert sorted(state["active_trades"]) == ["BTCUSD", "SOLUSD"]
+    assert state["signals"] == 3 and state["brain"] == BRAIN
+    assert journal.snapshot_seq == first.snapshot_seq == first.last_seq
+    assert journal.replayed == 0
+    # New events after a restore land on top of the snapshot
+    write_trades(journal, ["XRPUSD"])
+    assert sorted(TradeJournal(path).replay()["active_trades"]) == ["BTCUSD", "SOLUSD", "XRPUSD"]
+
+
+def test_a_failing_record_is_dropped_and_the_writer_keeps_going(tmp_path):
+    path = str(tmp_path / "journal.db")
+    TradeJournal(path).replay()
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TRIGGER no_bad BEFORE INSERT ON events WHEN NEW.payload LIKE '%BADUSD%' "
+                 "BEGIN SELECT RAISE(ABORT, 'refused'); END")
+    conn.commit()
+    conn.close()
+    journal = TradeJournal(path, snapshot_every=0)
+    journal.start()
+    journal.record_open("BTCUSD", {"symbol": "BTCUSD"})
+    journal.record_open("BADUSD", {"symbol": "BADUSD"})
+    journal.record_open("ETHUSD", {"symbol": "ETHUSD"})
+    wait_written(journal, 3)
+    assert journal.running
+    stats = journal.stats()
+    assert (stats["written"], stats["failed"], stats["pending"]) == (2, 1, 0)
+    assert "refused" in stats["last_error"]
+    journal.record_open("SOLUSD", {"symbol": "SOLUSD"})
+    journal.stop()
+    assert sorted(journal.state["active_trades"]) == ["BTCUSD", "ETHUSD", "SOLUSD"]
+    assert sorted(TradeJournal(path).replay()["active_trades"]) == ["BTCUSD", "ETHUSD", "SOLUSD"]
+
+
+def test_a_writer_that_cannot_start_is_reported(tmp_path, caplog):
+    journal = TradeJournal(str(tmp_path / "missing" / "journal.db"))
+    journal.start()
+    journal._thread.join(5)
+    assert not journal.running
+    assert journal.stats()["last_error"].startswith("OperationalError")
+    journal.record_signal({"symbol": "BTCUSD"})
+    assert "not persisted" in caplog.text
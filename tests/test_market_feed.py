@@ -0,0 +1,179 @@
+import asyncio
+import json
+import socket
+
+import pytest
+
+from candle_store import CandleStore
+from market_feed import MarketFeed, parse_candle, serve_replay
+
+HOUR = 3600
+T0 = 1_700_000_000 // HOUR * HOUR
+
+
+def candle(symbol, start, close, micros=True):
+    return {"type": "candlestick_1h", "symbol": symbol, "candle_start_time": start * 1_000_000 if micros else start,
+            "open": 100, "high": max(100, close), "low": min(100, close), "close": close, "volume": 1}
+
+
+MESSAGES = [
+    candle("BTCUSD", T0, 101),
+    {"type": "v2/ticker", "symbol": "BTCUSD", "mark_price": "101.5"},
+    candle("BTCUSD", T0, 102),
+    candle("ETHUSD", T0, 99, micros=False),
+    candle("BTCUSD", T0 + HOUR, 103),
+    # Late update for a bar that has already closed: ignored
+    candle("BTCUSD", T0, 90),
+    candle("BTCUSD", T0 + HOUR, 104),
+    {"type": "subscriptions", "payload": {}},
+]
+
+
+class RecordingStore:
+    def __init__(self):
+        self.updates = []
+        self.invalidated = []
+
+    def update(self, symbol, resolution, candles):
+        self.updates.append((symbol, resolution, candles[0]["time"], candles[0]["close"]))
+
+    def invalidate(self, symbol, resolution):
+        self.invalidated.append((symbol, resolution))
+
+
+class Upstream:
+    """REST side of the exchange: hourly bars from T0, the newest `available` of them published so far."""
+
+    def __init__(self, available):
+        self.available = available
+        self.calls = []
+
+    async def fetch_candles(self, symbol, resolution, limit, start=None, end=None):
+        self.calls.append((limit, start))
+        bars = [{"time": T0 + i * HOUR, "open": 100, "high": 101, "low": 99, "close": 100 + i, "volume": 1}
+                for i in range(self.available)]
+        if start is not None:
+            bars = [b for b in bars if b["time"] >= start]
+        return bars[-limit:]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def until(predicate, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def write_replay(path, messages):
+    path.write_text("\n".join(json.dumps(m) for m in messages) + "\n")
+    return str(path)
+
+
+@pytest.fixture
+def replay_file(tmp_path):
+    return write_replay(tmp_path / "feed.jsonl", MESSAGES)
+
+
+def test_parse_candle_normalises_microseconds():
+    assert parse_candle(candle("BTCUSD", T0, 101))["time"] == T0
+    assert parse_candle(candle("BTCUSD", T0, 101, micros=False))["time"] == T0
+
+
+def test_replayed_feed_aggregates_bars_and_survives_a_reconnect(replay_file):
+    port = free_port()
+    store, closed = RecordingStore(), []
+
+    async def main():
+        feed = MarketFeed(f"ws://127.0.0.1:{port}", ["BTCUSD", "ETHUSD"], store, resolution="60",
+                          on_bar_close=lambda symbol, bar: closed.append((symbol, bar["time"], bar["close"])),
+                          min_backoff=0.01, max_backoff=0.05)
+        server = asyncio.ensure_future(serve_replay(replay_file, port=port))
+        await asyncio.sleep(0.1)
+        feed.start()
+        try:
+            await until(lambda: feed.messages == 7)
+            first = (list(closed), list(store.updates), feed.forming("BTCUSD"), feed.ticker("BTCUSD"))
+            # Server goes away mid-session, then comes back and replays from the start
+            server.cancel()
+            await asyncio.gather(server, return_exceptions=True)
+            await until(lambda: not feed.connected)
+            server = asyncio.ensure_future(serve_replay(replay_file, port=port))
+            await until(lambda: feed.messages == 14)
+            return first, feed.stats()
+        finally:
+            await feed.stop()
+            server.cancel()
+            await asyncio.gather(server, return_exceptions=True)
+
+    (closed_before, updates, forming, ticker), stats = asyncio.run(main())
+    assert closed_before == [("BTCUSD", T0, 102.0)]
+    assert updates == [("BTCUSD", "60", T0, 101.0), ("BTCUSD", "60", T0, 102.0), ("ETHUSD", "60", T0, 99.0),
+                       ("BTCUSD", "60", T0 + HOUR, 103.0), ("BTCUSD", "60", T0 + HOUR, 104.0)]
+    assert forming["time"] == T0 + HOUR and forming["close"] == 104.0
+    assert ticker["mark_price"] == "101.5"
+    # The replayed history after reconnecting is older than the forming bar: no bar closes twice
+    assert closed == closed_before
+    assert stats["reconnects"] >= 1 and stats["connected"] and stats["symbols"] == 1
+    assert ("BTCUSD", "60") in store.invalidated
+
+
+def test_pushed_bar_past_a_gap_sends_the_next_read_upstream():
+    upstream = Upstream(available=5)
+    store = CandleStore(upstream, capacity=50)
+    assert len(asyncio.run(store.get_candles("BTCUSD", limit=20))) == 5
+    # Next bar: contiguous, merged
+    assert store.update("BTCUSD", "60", [parse_candle(candle("BTCUSD", T0 + 5 * HOUR, 105))]) == 1
+    assert len(store.peek("BTCUSD", limit=20)) == 6
+    # Three bars never arrived
+    assert store.update("BTCUSD", "60", [parse_candle(candle("BTCUSD", T0 + 9 * HOUR, 109))]) == 0
+    assert store.peek("BTCUSD") == [] and store.stats()["gaps"] == 1
+    upstream.available = 10
+    window = asyncio.run(store.get_candles("BTCUSD", limit=20))
+    assert upstream.calls[-1][1] == T0 + 5 * HOUR
+    assert [c["time"] for c in window] == [T0 + i * HOUR for i in range(10)]
+    assert len(store.peek("BTCUSD", limit=20)) == 10
+
+
+def test_bars_missed_across_a_reconnect_are_refetched(tmp_path):
+    port = free_port()
+    upstream = Upstream(available=5)
+    store = CandleStore(upstream, capacity=50)
+    before = write_replay(tmp_path / "before.jsonl", [candle("BTCUSD", T0 + 4 * HOUR, 104),
+                                                      candle("BTCUSD", T0 + 5 * HOUR, 105)])
+    # Bars 6..8 closed while disconnected; the feed resumes at bar 9
+    after = write_replay(tmp_path / "after.jsonl", [candle("BTCUSD", T0 + 9 * HOUR, 109)])
+
+    async def main():
+        await store.get_candles("BTCUSD", limit=20)
+        feed = MarketFeed(f"ws://127.0.0.1:{port}", ["BTCUSD"], store, resolution="60",
+                          min_backoff=0.01, max_backoff=0.05)
+        server = asyncio.ensure_future(serve_replay(before, port=port))
+        await asyncio.sleep(0.1)
+        feed.start()
+        try:
+            await until(lambda: feed.messages == 2)
+            live = len(store.peek("BTCUSD", limit=20))
+            server.cancel()
+            await asyncio.gather(server, return_exceptions=True)
+            await until(lambda: not feed.connected)
+            upstream.available = 10
+            server = asyncio.ensure_future(serve_replay(after, port=port))
+            await until(lambda: feed.messages == 3)
+            stale = store.peek("BTCUSD", limit=20)
+            window = await store.get_candles("BTCUSD", limit=20)
+            return live, stale, window
+        finally:
+            await feed.stop()
+            server.cancel()
+            await asyncio.gather(server, return_exceptions=True)
+
+    live, stale, window = asyncio.run(main())
+    assert live == 6
+    assert stale == []
+    assert [c["time"] for c in window] == [T0 + i * HOUR for i in range(10)]
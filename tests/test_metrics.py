@@ -0,0 +1,49 @@
+from fastapi.testclient import TestClient
+
+from conftest import make_candles
+from metrics import Registry
+
+
+def test_histogram_buckets_are_cumulative_on_render():
+    registry = Registry()
+    latency = registry.histogram("stage_seconds", "Stage latency", ("stage",), buckets=(0.01, 0.1, 1.0))
+    for value in (0.005, 0.01, 0.05, 0.5, 3.0):
+        latency.observe("fvg", value=value)
+    with latency.time("zones"):
+        pass
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP stage_seconds Stage latency", "# TYPE stage_seconds histogram"]
+    assert lines[2:8] == [
+        'stage_seconds_bucket{stage="fvg",le="0.01"} 2',
+        'stage_seconds_bucket{stage="fvg",le="0.1"} 3',
+        'stage_seconds_bucket{stage="fvg",le="1"} 4',
+        'stage_seconds_bucket{stage="fvg",le="+Inf"} 5',
+        'stage_seconds_sum{stage="fvg"} 3.565',
+        'stage_seconds_count{stage="fvg"} 5',
+    ]
+    assert latency.count("zones") == 1 and 'stage_seconds_bucket{stage="zones",le="0.01"} 1' in lines
+
+
+def test_counters_and_collectors_render_labels_escaped():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests", ("endpoint", "status"))
+    requests.inc("candles", "200")
+    requests.inc("candles", "200", amount=2)
+    requests.inc("ticker", "error")
+    registry.add_collector(lambda: [("queue_depth", "gauge", "Depth", [({"name": 'a"b'}, 4)])])
+    text = registry.render()
+    assert 'requests_total{endpoint="candles",status="200"} 3' in text
+    assert 'requests_total{endpoint="ticker",status="error"} 1' in text
+    assert 'queue_depth{name="a\\"b"} 4' in text
+    assert text.endswith("\n")
+
+
+def test_metrics_route_reports_stage_latency(app_module):
+    engine = app_module.TradingEngine()
+    candles = make_candles(150, 41)
+    engine._evaluate("TEST", candles, {"close": candles[-1]["close"]})
+    text = TestClient(app_module.app).get("/metrics").text
+    assert "# TYPE trading_stage_latency_seconds histogram" in text
+    assert 'trading_stage_latency_seconds_count{stage="zones"}' in text
+    for name in ("trading_active_trades", "trading_scheduler_queue_depth", "trading_journal_writer_up"):
+        assert f"# TYPE {name} " in text
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from risk import STOP_LOSS, RiskEngine
+
+
+@pytest.fixture
+def client(app_module):
+    yield TestClient(app_module.app)
+    app_module.active_trades.clear()
+    for symbol in list(app_module.trading_engine.risk.positions):
+        app_module.trading_engine.risk.discard(symbol)
+
+
+def open_trade(app_module, symbol, direction, entry, stop, target):
+    risk = app_module.trading_engine.risk
+    position = risk.open(symbol, direction, entry, stop, target)
+    assert position is not None
+    assert app_module.claim_trade(symbol, {"symbol": symbol, "entry_price": entry, "size": position.size,
+                                           "trade_type": "FUTURES_LONG" if direction > 0 else "FUTURES_SHORT"})
+    return position
+
+
+async def mark_and_settle(app_module, symbol, price):
+    reason = app_module.trading_engine.risk.mark(symbol, price)
+    await asyncio.gather(*app_module.tick_tasks)
+    return reason
+
+
+def test_manual_close_runs_on_the_event_loop(app_module, client, monkeypatch):
+    risk = app_module.trading_engine.risk
+    position = open_trade(app_module, "BTCUSD", 1, 100.0, 95.0, 110.0)
+    seen = []
+    discard = risk.discard
+
+    def on_loop_discard(symbol):
+        # Raises in a threadpool worker: no running loop there
+        seen.append(asyncio.get_running_loop() is not None)
+        return discard(symbol)
+
+    monkeypatch.setattr(risk, "discard", on_loop_discard)
+    response = client.post("/close/BTCUSD", params={"exit_price": 104.0})
+    assert response.status_code == 200
+    assert seen == [True]
+    assert response.json()["pnl"] == pytest.approx(4.0 * position.size)
+    assert client.post("/close/BTCUSD", params={"exit_price": 104.0}).status_code == 404
+
+
+def test_running_totals_follow_marks_and_closes(app_module, client):
+    risk = app_module.trading_engine.risk
+    long = open_trade(app_module, "BTCUSD", 1, 100.0, 95.0, 110.0)
+    short = open_trade(app_module, "ETHUSD", -1, 50.0, 52.0, 45.0)
+    risk.mark("BTCUSD", 102.0)
+    risk.mark("ETHUSD", 49.0)
+    assert risk.unrealized == pytest.approx(2.0 * long.size + 1.0 * short.size)
+    assert risk.open_risk == pytest.approx(long.risk + short.risk)
+    # Target crossed: on_exit takes the position off the book now and settles the trade in a task
+    asyncio.run(mark_and_settle(app_module, "BTCUSD", 111.0))
+    assert "BTCUSD" not in app_module.active_trades
+    assert risk.unrealized == pytest.approx(1.0 * short.size)
+    assert risk.open_risk == pytest.approx(short.risk)
+    assert client.post("/close/ETHUSD", params={"exit_price": 48.0}).status_code == 200
+    assert risk.unrealized == pytest.approx(0.0) and risk.open_risk == pytest.approx(0.0)
+
+
+def test_size_risks_a_fixed_share_of_equity_over_the_stop_distance():
+    risk = RiskEngine(1000.0, max_risk_per_trade=0.02, daily_loss_limit=0.05, leverage=10)
+    # 2% of 1000 over a 5 point stop
+    assert risk.size("BTCUSD", 100.0, 95.0) == (pytest.approx(4.0), "ok")
+    assert risk.size("BTCUSD", 100.0, 104.0) == (pytest.approx(5.0), "ok")
+    # A very tight stop is capped by leverage: 10 x 1000 of notional at 100
+    assert risk.size("BTCUSD", 100.0, 99.99) == (pytest.approx(100.0), "ok")
+    assert risk.size("BTCUSD", 100.0, 100.0) == (None, "no_stop")
+    risk.open("BTCUSD", 1, 100.0, 95.0, 110.0)
+    assert risk.size("BTCUSD", 100.0, 95.0) == (None, "position_open")
+
+
+def test_daily_loss_limit_counts_realized_losses_and_open_stops():
+    risk = RiskEngine(1000.0, max_risk_per_trade=0.02, daily_loss_limit=0.05)
+    assert risk.open("BTCUSD", 1, 100.0, 95.0, 110.0).risk == pytest.approx(20.0)
+    assert risk.open("ETHUSD", 1, 100.0, 95.0, 110.0).risk == pytest.approx(20.0)
+    # 50 a day, 40 already at stake: the third trade may only risk the remaining 10
+    assert risk.open("SOLUSD", 1, 100.0, 95.0, 110.0).size == pytest.approx(2.0)
+    for symbol in ("BTCUSD", "ETHUSD", "SOLUSD"):
+        risk.close(symbol, 95.0)
+    assert risk.ledger()["realized_today"] == pytest.approx(-50.0)
+    assert risk.open("XRPUSD", 1, 100.0, 95.0, 110.0) is None
+    assert risk.blocked == {"daily_loss_limit": 1}
+
+
+def test_size_rounds_down_to_whole_contracts():
+    risk = RiskEngine(1000.0, max_risk_per_trade=0.02, lots={"BTCUSD": 3.0, "ETHUSD": 5.0, "SOLUSD": 0.1})
+    # 4 units allowed: one 3-unit contract, never two
+    assert risk.size("BTCUSD", 100.0, 95.0) == (pytest.approx(3.0), "ok")
+    assert risk.size("ETHUSD", 100.0, 95.0) == (None, "below_lot")
+    assert risk.size("SOLUSD", 100.0, 95.0) == (pytest.approx(4.0), "ok")
+
+
+def test_stop_out_from_a_mark_reaches_the_brain(app_module, client):
+    brain = app_module.trading_engine.ai_brain
+    before = brain.total_trades
+    position = open_trade(app_module, "BTCUSD", 1, 100.0, 95.0, 110.0)
+    assert asyncio.run(mark_and_settle(app_module, "BTCUSD", 94.0)) == STOP_LOSS
+    assert brain.total_trades == before + 1
+    assert brain.trade_history[-1]["pnl"] == pytest.approx(-6.0 * position.size)
+    assert brain.trade_history[-1]["profitable"] is False
+    assert "BTCUSD" not in app_module.active_trades
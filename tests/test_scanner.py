@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import scanner as scanner_module
+from scanner import SessionScanner, next_bar_close
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeEngine:
+    def __init__(self, statuses):
+        self.statuses = statuses
+
+    async def analyze_many(self, symbols):
+        return [{"symbol": s, "status": self.statuses[s], "signal": None} for s in symbols]
+
+
+def test_next_bar_close():
+    assert next_bar_close(3599.0, 3600.0) == 3600.0
+    assert next_bar_close(3600.0, 3600.0) == 7200.0
+
+
+def test_results_expire_when_the_next_bar_closes(monkeypatch):
+    clock = Clock(7300.0)
+    monkeypatch.setattr(scanner_module.time, "time", clock)
+    scanner = SessionScanner(FakeEngine({"BTCUSD": "no_signal"}), ["BTCUSD"], period_seconds=3600.0, grace_seconds=2.0)
+    asyncio.run(scanner.scan())
+    assert scanner.results["BTCUSD"]["valid_until"] == 10_802.0
+    clock.now = 10_801.9
+    assert scanner.latest("BTCUSD")["status"] == "no_signal"
+    clock.now = 10_802.0
+    assert scanner.latest("BTCUSD") is None
+    assert scanner.latest("ETHUSD") is None
+    assert scanner.stats()["scans"] == 1
+
+
+@pytest.fixture
+def client(app_module):
+    yield TestClient(app_module.app)
+    app_module.scanner.results.clear()
+
+
+def cache(app_module, symbol, status):
+    app_module.scanner.results[symbol] = {"symbol": symbol, "status": status, "signal": None,
+                                          "valid_until": float("inf")}
+
+
+def test_analyze_answers_from_a_current_scan(app_module, client, monkeypatch):
+    async def fail(symbol):
+        raise AssertionError("served live despite a current scan")
+
+    monkeypatch.setattr(app_module.trading_engine, "analyze_async", fail)
+    cache(app_module, "BTCUSD", "no_signal")
+    assert client.get("/analyze/BTCUSD").json() == {"status": "no_signal", "message": "No setup found", "cached": True}
+
+
+@pytest.mark.parametrize("status", ["timeout", "error", "skipped"])
+def test_failed_scans_are_retried_live(app_module, client, monkeypatch, status):
+    live = []
+
+    async def analyze_async(symbol):
+        live.append(symbol)
+        return None
+
+    monkeypatch.setattr(app_module.trading_engine, "analyze_async", analyze_async)
+    cache(app_module, "BTCUSD", status)
+    assert client.get("/analyze/BTCUSD").json() == {"status": "no_signal", "message": "No setup found"}
+    assert live == ["BTCUSD"]
@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+import pytest
+
+from scheduler import BACKFILL, LIVE, ORDERS, SCAN, RequestScheduler, retry_after
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def drained(rate, burst=4.0, spend=4):
+    scheduler = RequestScheduler(rate=rate, burst=burst)
+    for _ in range(spend):
+        scheduler.acquire_sync(LIVE)
+    return scheduler
+
+
+def test_retry_after_headers():
+    assert retry_after(Response(429, {"Retry-After": "2"})) == 2.0
+    assert retry_after(Response(429, {"X-RATE-LIMIT-RESET": "1500"})) == 1.5
+    assert retry_after(Response(429, {"Retry-After": "soon"})) is None
+    assert retry_after(Response(429)) is None
+
+
+def test_waiting_lanes_are_served_highest_first():
+    async def main():
+        scheduler = drained(rate=50.0)
+        served = []
+
+        async def take(lane):
+            await scheduler.acquire(lane)
+            served.append(lane)
+
+        await asyncio.gather(*(take(lane) for lane in (BACKFILL, SCAN, LIVE, SCAN, ORDERS)))
+        return scheduler, served
+
+    scheduler, served = asyncio.run(main())
+    assert served == [ORDERS, LIVE, SCAN, SCAN, BACKFILL]
+    assert scheduler.stats()["lanes"][SCAN] == {"queue_depth": 0, "granted": 2, "throttled": 0}
+
+
+def test_backfill_leaves_the_reserve_to_other_lanes():
+    async def main():
+        # No meaningful refill: one token left, the backfill reserve is one more
+        scheduler = drained(rate=0.001, spend=3)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(scheduler.acquire(BACKFILL), 0.05)
+        await asyncio.wait_for(scheduler.acquire(LIVE), 0.05)
+        return scheduler.stats()["lanes"][BACKFILL]
+
+    # The abandoned backfill waiter is dropped from its queue
+    assert asyncio.run(main()) == {"queue_depth": 0, "granted": 0, "throttled": 0}
+
+
+def test_429_pauses_every_lane():
+    async def main():
+        scheduler = RequestScheduler(rate=1000.0, burst=10.0)
+        responses = iter([Response(429, {"Retry-After": "0.2"}), Response(200)])
+        started = time.monotonic()
+
+        async def request():
+            return next(responses)
+
+        async def order():
+            await asyncio.sleep(0.05)
+            await scheduler.acquire(ORDERS)
+            return time.monotonic() - started
+
+        response, order_waited = await asyncio.gather(scheduler.send(SCAN, request), order())
+        return scheduler.stats(), response, order_waited, time.monotonic() - started
+
+    stats, response, order_waited, elapsed = asyncio.run(main())
+    assert response.status_code == 200 and elapsed >= 0.2
+    # Orders never got a 429 but still waited out the pause
+    assert order_waited >= 0.19
+    assert stats["rate_limited"] == 1 and stats["lanes"][SCAN]["throttled"] == 1
+
+
+def test_sync_callers_share_the_pause_and_give_up_after_max_retries():
+    scheduler = RequestScheduler(rate=1000.0, burst=10.0, max_retries=2)
+    calls = []
+
+    def request():
+        calls.append(time.monotonic())
+        return Response(429, {"Retry-After": "0.05"})
+
+    assert scheduler.send_sync(LIVE, request).status_code == 429
+    assert len(calls) == 3 and all(b - a >= 0.05 for a, b in zip(calls, calls[1:]))
+    assert scheduler.stats()["rate_limited"] == 2
@@ -0,0 +1,162 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from risk import MANUAL, STOP_LOSS
+from shared_state import SharedDeduper, SharedState, SharedTrades
+
+
+@pytest.fixture
+def workers(tmp_path):
+    # Two connections to one file, as two uvicorn workers would hold
+    states = [SharedState(str(tmp_path / "state.db")) for _ in range(2)]
+    yield states
+    for state in states:
+        state.close()
+
+
+def race(fns):
+    barrier = threading.Barrier(len(fns))
+    results = [None] * len(fns)
+
+    def run(i):
+        barrier.wait()
+        results[i] = fns[i]()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(fns))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_one_worker_wins_each_claim(workers):
+    trades = [SharedTrades(state) for state in workers]
+    for n in range(20):
+        symbol = f"SYM{n}"
+        won = race([lambda t=t: t.add(symbol, {"worker": id(t)}) for t in trades])
+        assert sorted(won) == [False, True]
+        assert trades[0][symbol] == trades[1][symbol]
+    popped = race([lambda t=t: t.pop("SYM0", None) for t in trades])
+    assert sum(p is not None for p in popped) == 1
+
+
+def test_one_worker_alerts_each_setup(workers):
+    dedupers = [SharedDeduper(state, ttl=60.0) for state in workers]
+    for n in range(20):
+        key = ("BTCUSD", "FUTURES_LONG", float(n))
+        assert sorted(race([lambda d=d: d.first(key) for d in dedupers])) == [False, True]
+    assert dedupers[0].suppressed + dedupers[1].suppressed == 20
+
+
+def test_updates_from_both_workers_are_never_lost(workers):
+    def bump(state):
+        for _ in range(50):
+            state.update("count", lambda v: {"n": (v or {"n": 0})["n"] + 1})
+
+    race([lambda s=s: bump(s) for s in workers])
+    assert workers[0].get("count") == workers[1].get("count") == {"n": 100}
+
+
+def test_lease_has_one_holder(workers):
+    # Same process here: tell the two owners apart
+    workers[1].owner = "other:1"
+    assert sorted(race([lambda s=s: s.acquire("scanner", 30.0) for s in workers])) == [False, True]
+
+
+@pytest.fixture
+def shared_app(app_module, workers, monkeypatch):
+    engine = app_module.trading_engine
+    monkeypatch.setattr(app_module, "shared_state", workers[0])
+    monkeypatch.setattr(app_module, "active_trades", SharedTrades(workers[0]))
+    monkeypatch.setattr(engine, "deduper", SharedDeduper(workers[0]))
+    monkeypatch.setattr(engine, "ai_brain", app_module.SharedBrain(workers[0]))
+    monkeypatch.setattr(engine.risk, "store", workers[0])
+    monkeypatch.setattr(app_module.Config, "EXECUTION_ENABLED", False)
+    monkeypatch.setattr(engine.telegram, "send_signal", lambda signal: None)
+    yield app_module
+    for symbol in list(engine.risk.positions):
+        engine.risk.discard(symbol)
+
+
+def while_locked(state, work):
+    """Run the coroutine work() while another connection holds the write lock for 0.2s.
+
+    Returns how often the loop got to run meanwhile, and work's result.
+    """
+    locked, release = threading.Event(), threading.Event()
+
+    def other_worker():
+        with state.transaction():
+            locked.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=other_worker)
+    holder.start()
+    locked.wait(5)
+
+    async def main():
+        ticks = 0
+        working = asyncio.ensure_future(work())
+        started = time.perf_counter()
+        while time.perf_counter() - started < 0.2:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        release.set()
+        return ticks, await working
+
+    try:
+        return asyncio.run(main())
+    finally:
+        release.set()
+        holder.join()
+
+
+def long_signal(app_module, symbol="BTCUSD"):
+    return app_module.FuturesSignal(
+        symbol=symbol, trade_type=app_module.TradeType.FUTURES_LONG, entry_price=100.0, stop_loss=95.0,
+        target_price=110.0, confidence=0.8, leverage=1, session=app_module.SessionType.CRYPTO_PRIME, reasons=[]
+    )
+
+
+def test_publish_waits_for_another_workers_lock_off_the_loop(shared_app, workers):
+    ticks, published = while_locked(workers[1], lambda: shared_app.publish_signal(long_signal(shared_app)))
+    assert ticks > 5
+    assert published and "BTCUSD" in SharedTrades(workers[1])
+
+
+def test_close_waits_for_another_workers_lock_off_the_loop(shared_app, workers):
+    assert asyncio.run(shared_app.publish_signal(long_signal(shared_app)))
+    size = shared_app.trading_engine.risk.positions["BTCUSD"].size
+    ticks, pnl = while_locked(workers[1], lambda: shared_app.close_position("BTCUSD", 104.0, MANUAL))
+    assert ticks > 5
+    assert pnl == pytest.approx(4.0 * size)
+    assert "BTCUSD" not in SharedTrades(workers[1])
+    assert workers[1].get("risk")["realized_today"] == pytest.approx(4.0 * size)
+    assert workers[1].get("brain")["total_trades"] == 1
+
+
+def test_tick_exit_settles_off_the_loop(shared_app, workers):
+    assert asyncio.run(shared_app.publish_signal(long_signal(shared_app)))
+
+    async def stop_out():
+        assert shared_app.trading_engine.risk.mark("BTCUSD", 94.0) == STOP_LOSS
+        # Off the book at once: a second tick cannot exit it again
+        assert shared_app.trading_engine.risk.mark("BTCUSD", 93.0) is None
+        await asyncio.gather(*shared_app.tick_tasks)
+
+    ticks, _ = while_locked(workers[1], stop_out)
+    assert ticks > 5
+    assert "BTCUSD" not in SharedTrades(workers[1])
+    assert workers[1].get("brain")["consecutive_losses"] == 1
+
+
+def test_several_workers_refuse_in_memory_state(app_module, monkeypatch):
+    monkeypatch.setattr(app_module.Config, "WEB_CONCURRENCY", 2)
+    with pytest.raises(RuntimeError, match="STATE_BACKEND=sqlite"):
+        with TestClient(app_module.app):
+            pass
@@ -0,0 +1,145 @@
+import pytest
+
+from columnar import CandleArray
+from conftest import make_candles
+from smc_indicator import get_rahulyadav_ai, get_smc_structure
+from streaming import StreamRegistry, SymbolState
+from zones import ZoneIndex
+
+MIN_DISPLACEMENT = 0.01
+MIN_GAP = 0.002
+
+
+def probe_prices(candle):
+    # The close, plus prices in and around the bar's range
+    return [candle["close"], candle["open"], candle["high"], candle["low"],
+            candle["low"] * 0.99, candle["high"] * 1.01]
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_zones_match_batch_index_bar_for_bar(seed):
+    candles = make_candles(300, seed)
+    array = CandleArray.from_candles(candles)
+    state = SymbolState(min_displacement=MIN_DISPLACEMENT, min_gap=MIN_GAP)
+    entries = 0
+    for i, candle in enumerate(candles):
+        state.on_bar(candle)
+        batch = ZoneIndex.build(array[:i + 1], MIN_DISPLACEMENT, MIN_GAP)
+        assert state.live_zones() == batch.live()
+        for price in probe_prices(candle):
+            assert state.entry(price) == batch.entry(price)
+            entries += state.entry(price)[0] is not None
+    assert entries > 0
+
+
+@pytest.mark.parametrize("seed", [4, 5, 6])
+def test_forming_bar_matches_batch_index_over_it(seed):
+    candles = make_candles(300, seed)
+    array = CandleArray.from_candles(candles)
+    state = SymbolState(min_displacement=MIN_DISPLACEMENT, min_gap=MIN_GAP)
+    gaps = 0
+    for i, candle in enumerate(candles):
+        batch = ZoneIndex.build(array[:i + 1], MIN_DISPLACEMENT, MIN_GAP)
+        for price in probe_prices(candle):
+            streamed = state.entry(price, forming=candle)
+            assert streamed == batch.entry(price)
+            gaps += streamed[1] is not None
+        state.on_bar(candle)
+    assert gaps > 0
+
+
+def test_long_history_entry_matches_batch_index():
+    # Enough live zones for several lifting levels in the order block stacks
+    candles = make_candles(4000, 12)
+    array = CandleArray.from_candles(candles)
+    state = SymbolState(min_displacement=MIN_DISPLACEMENT, min_gap=MIN_GAP)
+    for i, candle in enumerate(candles):
+        if i % 250 == 0:
+            batch = ZoneIndex.build(array[:i + 1], MIN_DISPLACEMENT, MIN_GAP)
+            zones = batch.live()
+            prices = [p for z in zones for p in (z.bottom, z.top, (z.bottom + z.top) / 2)]
+            for price in prices:
+                assert state.entry(price, forming=candle) == batch.entry(price)
+        state.on_bar(candle)
+    assert len(state.live_zones()) > 32
+
+
+@pytest.mark.parametrize("config", [{}, {"atr_mode": "wilder"}, {"ailength": 5, "aimultiplier": 2.0}])
+def test_structure_and_supertrend_match_batch(config):
+    candles = make_candles(200, 7)
+    state = SymbolState(config)
+    for i, candle in enumerate(candles):
+        state.on_bar(candle)
+        assert state.smc_structure() == get_smc_structure(candles[:i + 1])
+        # Wilder bands are carried in a different summation order: last-bit differences only
+        assert state.rahulyadav_ai() == pytest.approx(get_rahulyadav_ai(candles[:i + 1], config), rel=1e-12)
+
+
+def test_registry_sync_feeds_only_new_closed_bars():
+    candles = make_candles(120, 8)
+    registry = StreamRegistry(period=3600, min_displacement=MIN_DISPLACEMENT, min_gap=MIN_GAP)
+    state, forming = registry.sync("BTCUSD", candles[:100], candles[98]["time"])
+    assert state.count == 99 and forming == candles[99]
+    # Overlapping window: only the bars after the state's last one are applied
+    state, forming = registry.sync("BTCUSD", candles[10:110], candles[109]["time"])
+    assert state.count == 110 and forming is None
+    reference = SymbolState(min_displacement=MIN_DISPLACEMENT, min_gap=MIN_GAP)
+    for candle in candles[:110]:
+        reference.on_bar(candle)
+    assert state.live_zones() == reference.live_zones()
+
+
+def test_registry_push_bars_and_gaps():
+    candles = make_candles(60, 9)
+    registry = StreamRegistry(period=3600)
+    # Not seeded yet: a lone pushed bar is not a history
+    assert registry.on_bar("ETHUSD", candles[0]) is None
+    registry.sync("ETHUSD", candles[:50], candles[49]["time"])
+    assert registry.on_bar("ETHUSD", candles[49]).count == 50  # already seen
+    assert registry.on_bar("ETHUSD", candles[50]).count == 51
+    # A missed bar drops the state; the next sync rebuilds it from the window
+    assert registry.on_bar("ETHUSD", candles[52]) is None
+    state, _ = registry.sync("ETHUSD", candles[40:60], candles[59]["time"])
+    assert state.count == 20 and registry.stats()["reseeds"] == 1
+
+
+def signal_fields(signal):
+    return None if signal is None else (
+        signal.trade_type, signal.entry_price, signal.stop_loss, signal.target_price, signal.confidence
+    )
+
+
+def test_evaluate_reads_streamed_state_like_the_batch_index(app_module):
+    engine = app_module.TradingEngine()
+    candles = make_candles(400, 10)
+    signals = 0
+    # Each scan sees a window one bar longer, as the candle store serves it
+    for end in range(100, len(candles)):
+        window = candles[max(0, end - 100):end]
+        price = window[-1]["close"]
+        streamed = engine._evaluate("TEST", window, {"close": price})
+        assert engine.streams.states["TEST"].count == end
+        ob, fvg = engine.ict_detector.detect_zones(CandleArray.from_candles(candles[:end]), price)
+        batch = engine._signal("TEST", price, ob, fvg)
+        assert signal_fields(streamed) == signal_fields(batch)
+        signals += streamed is not None
+    assert signals > 0
+
+
+def test_feed_ticks_and_bars_drive_the_streamed_state(app_module):
+    engine = app_module.TradingEngine()
+    engine._is_valid_session = lambda: True
+    published = []
+    engine.on_signal = published.append
+    candles = make_candles(300, 11)
+    engine.sync_stream("TEST", candles[:250])
+    state = engine.streams.states["TEST"]
+    engine.on_bar("TEST", candles[250])
+    assert state.count == 251
+    zone = next(z for z in reversed(state.live_zones()) if z.kind == "order_block")
+    price = (zone.bottom + zone.top) / 2
+    engine.on_ticker("TEST", {"close": price, "mark_price": price})
+    engine.on_ticker("TEST", {"close": price, "mark_price": price})
+    ob, fvg = engine.ict_detector.zone_models(*state.entry(price))
+    assert len(published) == 1
+    assert signal_fields(published[0]) == signal_fields(engine._signal("TEST", price, ob, fvg))
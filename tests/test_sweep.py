@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+import sweep
+from backtest import ENGINE, FUSION, run_backtest
+from columnar import CandleArray
+from conftest import make_candles
+from sweep import grid, random_search, rank, run_sweep
+
+CANDIDATES = [{"ailength": 10, "aimultiplier": 0.3}, {"ailength": 5, "aimultiplier": 0.5},
+              {"ailength": 14, "aimultiplier": 3.0}]
+
+
+@pytest.fixture(scope="module")
+def candles():
+    return CandleArray.from_candles(make_candles(800, 41))
+
+
+def lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_grid_and_random_search():
+    assert grid({"b": [1, 2], "a": ["x"]}) == [{"a": "x", "b": 1}, {"a": "x", "b": 2}]
+    drawn = random_search({"n": (1, 3), "x": (0.0, 1.0), "c": ["p", "q"]}, 20, seed=1)
+    assert drawn == random_search({"n": (1, 3), "x": (0.0, 1.0), "c": ["p", "q"]}, 20, seed=1)
+    assert all(isinstance(d["n"], int) and 1 <= d["n"] <= 3 and 0.0 <= d["x"] <= 1.0 for d in drawn)
+
+
+def test_workers_match_the_in_process_backtest(candles, tmp_path):
+    results = run_sweep(candles, FUSION, CANDIDATES, str(tmp_path / "r.jsonl"), workers=2, leverage=5)
+    assert len(results) == 3
+    for result in results:
+        expected = run_backtest(candles, FUSION, config=result["params"], leverage=5)["stats"]
+        assert result["stats"] == pytest.approx(expected, rel=1e-12)
+        assert result["backtest"] == {"leverage": 5}
+
+
+def test_sweep_resumes_from_the_results_file(candles, tmp_path, monkeypatch):
+    path = str(tmp_path / "r.jsonl")
+    run_sweep(candles, FUSION, CANDIDATES[:2], path, workers=1)
+    assert len(lines(path)) == 2
+    # Only the new candidate runs; a different backtest setting is a different result
+    run_sweep(candles, FUSION, CANDIDATES, path, workers=1)
+    assert [r["params"] for r in lines(path)][2:] == [CANDIDATES[2]]
+    run_sweep(candles, FUSION, CANDIDATES[:1], path, workers=1, leverage=3)
+    assert len(lines(path)) == 4
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("everything was already done")
+
+    monkeypatch.setattr(sweep, "ProcessPoolExecutor", no_pool)
+    assert len(run_sweep(candles, FUSION, CANDIDATES, path)) == 3
+
+
+def result(name, trades, expectancy, drawdown):
+    return {"params": {"name": name},
+            "stats": {"trades": trades, "expectancy": expectancy, "max_drawdown": drawdown}}
+
+
+def test_rank_orders_by_expectancy_and_reports_idle_configs():
+    results = [result("flat", 0, 0.0, 0.0), result("ok", 5, 0.01, 0.2), result("best", 8, 0.02, 0.3),
+               result("tie", 4, 0.01, 0.1), result("deep", 9, 0.05, 0.6), result("rare", 1, 0.5, 0.0)]
+    assert [r["params"]["name"] for r in rank(results)] == ["rare", "deep", "best", "tie", "ok", "flat"]
+    assert [r["params"]["name"] for r in rank(results, max_drawdown=0.5, min_trades=3)] == \
+        ["best", "tie", "ok", "rare", "flat"]
+
+
+def test_engine_candidates_need_every_threshold(candles, tmp_path):
+    path = str(tmp_path / "r.jsonl")
+    with pytest.raises(ValueError, match="min_gap"):
+        run_sweep(candles, ENGINE, [{"risk_reward": 2.0}], path)
+    defaults = {"risk_reward": 2.0, "min_displacement": 0.01, "min_gap": 0.002, "use_zone_index": True}
+    results = run_sweep(candles, ENGINE, [{"risk_reward": 1.5}, {"risk_reward": 3.0}], path, workers=1, defaults=defaults)
+    assert sorted(r["params"]["risk_reward"] for r in results) == [1.5, 3.0]
+    assert all(r["params"]["min_gap"] == 0.002 for r in results)
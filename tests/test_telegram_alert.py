@@ -0,0 +1,58 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+from conftest import ROOT
+from telegram_alert import SEPARATOR, TelegramQueue
+
+
+def run_queue(url, messages, **kwargs):
+    queue = TelegramQueue("TOKEN", base_url=url, **kwargs)
+
+    async def main():
+        queue.start()
+        for text in messages:
+            queue.submit("42", text)
+        await queue.stop(timeout=10)
+
+    asyncio.run(main())
+    return queue
+
+
+def test_burst_is_merged_into_one_message(http_server):
+    queue = run_queue(http_server.url, ["one", "two", "three"], batch_window=0.2)
+    bodies = http_server.json_bodies()
+    assert len(bodies) == 1
+    assert bodies[0] == {"chat_id": "42", "text": SEPARATOR.join(["one", "two", "three"])}
+    assert http_server.requests[0]["path"] == "/botTOKEN/sendMessage"
+    assert queue.stats()["delivered"] == 3
+    assert queue.stats()["messages_sent"] == 1
+
+
+def test_429_waits_for_retry_after_then_delivers(http_server):
+    http_server.responses.append((429, {"ok": False, "parameters": {"retry_after": 0.3}}, {}))
+    started = time.monotonic()
+    queue = run_queue(http_server.url, ["alert"], batch_window=0.01)
+    assert time.monotonic() - started >= 0.3
+    assert len(http_server.requests) == 2
+    stats = queue.stats()
+    assert stats["delivered"] == 1
+    assert stats["rate_limited"] == 1
+    assert stats["retries"] == 1
+
+
+def test_client_error_is_not_retried(http_server):
+    http_server.responses.append((400, {"ok": False, "description": "chat not found"}, {}))
+    queue = run_queue(http_server.url, ["alert"], batch_window=0.01)
+    assert len(http_server.requests) == 1
+    assert queue.stats()["failed"] == 1
+
+
+def test_standalone_script_delivers_before_exit(http_server):
+    # Thread-mode queue: the script exits right after submitting, atexit must drain it
+    script = "from telegram_alert import send_telegram_alert; send_telegram_alert('TOKEN', '42', 'from a script')"
+    env = dict(os.environ, TELEGRAM_API_URL=http_server.url)
+    subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env, check=True, timeout=30)
+    assert http_server.json_bodies() == [{"chat_id": "42", "text": "from a script"}]
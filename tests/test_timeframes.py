@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from columnar import CandleArray
+from conftest import make_candles
+from timeframes import SECONDS, MultiTimeframe, resample
+from zones import BEARISH, BULLISH
+
+# 5 minute bars starting on a day boundary
+START = 1_600_041_600
+
+
+def naive_resample(candles, seconds):
+    groups = {}
+    for c in candles:
+        groups.setdefault(c["time"] // seconds * seconds, []).append(c)
+    return [
+        (t, g[0]["open"], max(c["high"] for c in g), min(c["low"] for c in g), g[-1]["close"], sum(c["volume"] for c in g))
+        for t, g in sorted(groups.items())
+    ]
+
+
+def rows(array):
+    return [(int(c["time"]), c["open"], c["high"], c["low"], c["close"], c["volume"]) for c in array.to_candles()]
+
+
+@pytest.mark.parametrize("resolution", ["15", "60", "240", "D"])
+def test_resample_matches_grouping_by_bucket(resolution):
+    candles = make_candles(2000, 51, start=START, period=300)
+    # Missing bars: buckets with fewer base bars than usual
+    candles = [c for i, c in enumerate(candles) if i % 37 not in (5, 6)]
+    resampled = resample(CandleArray.from_candles(candles), SECONDS[resolution])
+    expected = naive_resample(candles, SECONDS[resolution])
+    assert [r[:5] for r in rows(resampled)] == [e[:5] for e in expected]
+    assert np.allclose(resampled.volume, [e[5] for e in expected])
+
+
+def test_incremental_updates_equal_a_full_resample():
+    candles = make_candles(1500, 52, start=START, period=300)
+    mtf = MultiTimeframe("5", ["15", "60", "240"], capacity=1000)
+    for end in range(100, len(candles) + 1, 7):
+        window = [dict(c) for c in candles[max(0, end - 300):end]]
+        # The newest base bar is still forming: its close moves between polls
+        window[-1]["close"] *= 1.001
+        frames = mtf.update("BTCUSD", window)
+        seen = [dict(c) for c in candles[:end]]
+        seen[-1]["close"] *= 1.001
+        for resolution, bars in frames.items():
+            full = resample(CandleArray.from_candles(seen), SECONDS[resolution])
+            assert rows(bars) == rows(full)
+
+
+def test_bias_needs_enough_closed_bars():
+    mtf = MultiTimeframe("5", ["60"], bias_length=5)
+    candles = make_candles(24 * 12, 53, start=START, period=300)
+    mtf.update("ETHUSD", candles[:5 * 12])
+    # Five hourly buckets, the last still forming: four closed bars
+    assert mtf.bias("ETHUSD", "60") is None
+    mtf.update("ETHUSD", candles)
+    assert mtf.bias("ETHUSD", "60") in (BULLISH, BEARISH)
+    assert mtf.bias("SOLUSD", "60") is None
+
+
+def test_resolutions_must_be_multiples_of_the_base():
+    with pytest.raises(ValueError):
+        MultiTimeframe("15", ["5"])
+    with pytest.raises(ValueError):
+        MultiTimeframe("5", ["7"])
@@ -0,0 +1,144 @@
+import numpy as np
+import pytest
+
+from columnar import CandleArray
+from conftest import make_candles
+from zones import BEARISH, BULLISH, FVG, ORDER_BLOCK, Zone, ZoneIndex
+
+KINDS = [(ORDER_BLOCK, BULLISH), (ORDER_BLOCK, BEARISH), (FVG, BULLISH), (FVG, BEARISH)]
+
+
+def scan_zones(candles, min_displacement, min_gap):
+    # One bar at a time, mitigation by walking forward from the confirming bar
+    zones = []
+    for i in range(1, len(candles)):
+        prev, bar = candles[i - 1], candles[i]
+        up = (bar["close"] - bar["open"]) / bar["open"]
+        down = (bar["open"] - bar["close"]) / bar["open"]
+        if prev["close"] < prev["open"] and bar["close"] > bar["open"] and up > min_displacement:
+            zones.append((ORDER_BLOCK, BULLISH, prev["low"], prev["high"], i, up))
+        if prev["close"] > prev["open"] and bar["close"] < bar["open"] and down > min_displacement:
+            zones.append((ORDER_BLOCK, BEARISH, prev["low"], prev["high"], i, down))
+        if i < 2:
+            continue
+        first = candles[i - 2]
+        bull_gap = (bar["low"] - first["high"]) / first["high"]
+        bear_gap = (first["low"] - bar["high"]) / first["low"]
+        if bar["low"] > first["high"] and bull_gap > min_gap:
+            zones.append((FVG, BULLISH, first["high"], bar["low"], i, bull_gap))
+        if bar["high"] < first["low"] and bear_gap > min_gap:
+            zones.append((FVG, BEARISH, bar["high"], first["low"], i, bear_gap))
+    found = []
+    for kind, bias, bottom, top, formed, size in zones:
+        mitigated = -1
+        for j in range(formed + 1, len(candles)):
+            if candles[j]["low"] < bottom if bias == BULLISH else candles[j]["high"] > top:
+                mitigated = j
+                break
+        found.append(Zone(kind, bias, bottom, top, formed, size, mitigated))
+    return found
+
+
+def scan_containing(zones, price, kind=None, bias=None):
+    return [z for z in zones if z.live and z.bottom <= price <= z.top
+            and (kind is None or z.kind == kind) and (bias is None or z.bias == bias)]
+
+
+def scan_above(zones, price, kind, bias):
+    above = [z for z in zones if z.live and (z.kind, z.bias) == (kind, bias) and z.bottom > price]
+    nearest = min((z.bottom for z in above), default=None)
+    return [z for z in above if z.bottom == nearest]
+
+
+def scan_below(zones, price, kind, bias):
+    below = [z for z in zones if z.live and (z.kind, z.bias) == (kind, bias) and z.top < price]
+    nearest = max((z.top for z in below), default=None)
+    return [z for z in below if z.top == nearest]
+
+
+def assert_nearest(found, candidates):
+    # Zones sharing the nearest edge are equally near: any of them is a correct answer
+    assert found in candidates if candidates else found is None
+
+
+def scan_entry(zones, price):
+    blocks = scan_containing(zones, price, kind=ORDER_BLOCK)
+    if not blocks:
+        return None, None
+    zone = max(blocks, key=lambda z: z.formed_at)
+    if zone.bias == BULLISH:
+        return zone, scan_above(zones, price, FVG, zone.bias)
+    return zone, scan_below(zones, price, FVG, zone.bias)
+
+
+def probes(zones, low, high, count=200):
+    # A grid across the range plus every live edge, so inclusive bounds get hit exactly
+    edges = [edge for z in zones if z.live for edge in (z.bottom, z.top)]
+    return np.linspace(low * 0.95, high * 1.05, count).tolist() + edges
+
+
+def key(zone):
+    return zone.formed_at, zone.kind, zone.bias
+
+
+def assert_queries_match(index, zones, prices):
+    for price in prices:
+        assert sorted(index.containing(price), key=key) == sorted(scan_containing(zones, price), key=key)
+        for kind, bias in KINDS:
+            assert sorted(index.containing(price, kind, bias), key=key) == \
+                sorted(scan_containing(zones, price, kind, bias), key=key)
+            assert_nearest(index.nearest_above(price, kind, bias), scan_above(zones, price, kind, bias))
+            assert_nearest(index.nearest_below(price, kind, bias), scan_below(zones, price, kind, bias))
+        zone, gap = index.entry(price)
+        expected_zone, gaps = scan_entry(zones, price)
+        assert zone == expected_zone
+        if zone is not None:
+            assert_nearest(gap, gaps)
+
+
+@pytest.mark.parametrize("seed,min_displacement,min_gap", [
+    (11, 0.01, 0.002), (12, 0.01, 0.002), (13, 0.004, 0.0005), (14, 0.002, 0.0)
+])
+def test_build_matches_a_bar_by_bar_scan(seed, min_displacement, min_gap):
+    candles = make_candles(600, seed)
+    index = ZoneIndex.build(CandleArray.from_candles(candles), min_displacement, min_gap)
+    expected = scan_zones(candles, min_displacement, min_gap)
+    assert sorted(index.zones, key=key) == sorted(expected, key=key)
+    assert [z.formed_at for z in index.zones] == sorted(z.formed_at for z in index.zones)
+    assert index.live() == [z for z in index.zones if z.live]
+    # Both branches of mitigation, and both kinds, actually occur
+    assert {(z.kind, z.bias) for z in index.zones} == set(KINDS)
+    assert any(z.live for z in index.zones) and any(not z.live for z in index.zones)
+
+
+@pytest.mark.parametrize("seed", [21, 22, 23])
+def test_queries_match_a_linear_scan(seed):
+    candles = make_candles(600, seed)
+    index = ZoneIndex.build(CandleArray.from_candles(candles), 0.004, 0.0005)
+    low = min(c["low"] for c in candles)
+    high = max(c["high"] for c in candles)
+    prices = probes(index.zones, low, high) + [c["close"] for c in candles]
+    assert_queries_match(index, index.zones, prices)
+    assert any(index.entry(price)[0] is not None for price in prices)
+
+
+@pytest.mark.parametrize("seed", [31, 32])
+def test_interval_tree_matches_a_linear_scan_on_overlapping_zones(seed):
+    # Dense, heavily nested intervals with shared edges and some mitigated zones mixed in
+    rng = np.random.default_rng(seed)
+    edges = np.round(rng.uniform(90, 110, 40), 1)
+    zones = []
+    for formed in range(400):
+        bottom, top = sorted(rng.choice(edges, 2))
+        kind, bias = KINDS[rng.integers(len(KINDS))]
+        mitigated = -1 if rng.random() < 0.7 else formed + 1
+        zones.append(Zone(kind, bias, float(bottom), float(top), formed, 0.0, mitigated))
+    index = ZoneIndex(zones)
+    assert_queries_match(index, zones, probes(zones, 90, 110, 400))
+
+
+def test_short_or_flat_history_has_no_zones():
+    assert ZoneIndex.build(CandleArray.from_candles(make_candles(1, 1))).zones == []
+    flat = [dict(c, open=100.0, high=100.0, low=100.0, close=100.0) for c in make_candles(50, 1)]
+    index = ZoneIndex.build(CandleArray.from_candles(flat))
+    assert index.zones == [] and index.entry(100.0) == (None, None)
@@ -0,0 +1,123 @@
+""" Multi-timeframe bars - one base series per symbol, higher timeframes resampled locally and incrementally """
+
+from typing import Dict, List, Optional
+import numpy as np
+from candle_store import SECONDS, candle_time
+from columnar import CandleArray
+from indicators import supertrend
+from zones import BEARISH, BULLISH
+
+
+def resample(candles: CandleArray, seconds: int) -> CandleArray:
+    """Bucket bars by timestamp // seconds (UTC aligned); the last bucket may still be forming."""
+    if len(candles) == 0:
+        return candles
+    buckets = (candles.timestamp // seconds) * seconds
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(candles)] - 1
+    return CandleArray(
+        candles.open[starts],
+        np.maximum.reduceat(candles.high, starts),
+        np.minimum.reduceat(candles.low, starts),
+        candles.close[ends],
+        np.add.reduceat(candles.volume, starts),
+        buckets[starts]
+    )
+
+
+def _concat(head: CandleArray, tail: CandleArray) -> CandleArray:
+    return CandleArray(*(np.concatenate((getattr(head, c), getattr(tail, c))) for c in CandleArray.__slots__))
+
+
+class Resampler:
+    def __init__(self, seconds: int, capacity: int = 500):
+        self.seconds = seconds
+        self.capacity = capacity
+        self.bars: Optional[CandleArray] = None
+
+    @property
+    def since(self) -> Optional[float]:
+        """Start of the last (possibly forming) bucket: the oldest base bar the next update needs."""
+        return float(self.bars.timestamp[-1]) if self.bars is not None and len(self.bars) else None
+
+    def update(self, base: CandleArray) -> CandleArray:
+        """base must hold every base bar from `since` on; only that suffix is re-bucketed."""
+        since = self.since
+        if len(base) == 0:
+            return self.bars if self.bars is not None else base
+        if since is None or base.timestamp[0] > since:
+            self.bars = resample(base, self.seconds)
+        else:
+            i = int(np.searchsorted(base.timestamp, since))
+            self.bars = _concat(self.bars[:len(self.bars) - 1], resample(base[i:], self.seconds))
+        if len(self.bars) > self.capacity:
+            self.bars = self.bars[len(self.bars) - self.capacity:]
+        return self.bars
+
+    def closed(self) -> CandleArray:
+        # The newest bucket can still change; bias is read from completed bars only
+        return self.bars[:max(0, len(self.bars) - 1)]
+
+
+class SymbolTimeframes:
+    def __init__(self, resolutions: List[str], capacity: int = 500):
+        self.resamplers = {r: Resampler(SECONDS[r], capacity) for r in resolutions}
+
+    def update(self, candles: List[Dict]) -> Dict[str, CandleArray]:
+        # Convert only the base bars some resampler still needs (a handful after the first call)
+        needed = [r.since for r in self.resamplers.values()]
+        if None in needed:
+            start = 0
+        else:
+            since = min(needed)
+            start = len(candles)
+            while start > 0 and candle_time(candles[start - 1]) >= since:
+                start -= 1
+            # One bar before `since` shows the window still reaches back past the bucket start
+            start = max(0, start - 1)
+        base = CandleArray.from_candles(candles[start:])
+        return {r: resampler.update(base) for r, resampler in self.resamplers.items()}
+
+
+class MultiTimeframe:
+    def __init__(
+        self,
+        base_resolution: str = "5",
+        resolutions: Optional[List[str]] = None,
+        capacity: int = 500,
+        bias_length: int = 5,
+        bias_multiplier: float = 3.0
+    ):
+        self.base_resolution = base_resolution
+        self.resolutions = list(resolutions or ["15", "60", "240", "D"])
+        for r in [base_resolution] + self.resolutions:
+            if r not in SECONDS:
+                raise ValueError(f"Unsupported resolution: {r}")
+            if SECONDS[r] % SECONDS[base_resolution]:
+                raise ValueError(f"Resolution {r} is not a multiple of base {base_resolution}")
+        self.capacity = capacity
+        self.bias_length = bias_length
+        self.bias_multiplier = bias_multiplier
+        self.symbols: Dict[str, SymbolTimeframes] = {}
+
+    def update(self, symbol: str, candles: List[Dict]) -> Dict[str, CandleArray]:
+        """Feed the full base window (e.g. CandleStore.get_candles); returns every derived timeframe."""
+        frames = self.symbols.get(symbol)
+        if frames is None:
+            frames = self.symbols[symbol] = SymbolTimeframes(self.resolutions, self.capacity)
+        return frames.update(candles)
+
+    def bars(self, symbol: str, resolution: str) -> Optional[CandleArray]:
+        frames = self.symbols.get(symbol)
+        return frames.resamplers[resolution].bars if frames is not None else None
+
+    def bias(self, symbol: str, resolution: str) -> Optional[str]:
+        """SuperTrend direction of the closed bars, None until there are enough of them."""
+        frames = self.symbols.get(symbol)
+        if frames is None:
+            return None
+        closed = frames.resamplers[resolution].closed()
+        if len(closed) < self.bias_length:
+            return None
+        trend = supertrend(closed.high, closed.low, closed.close, self.bias_length, self.bias_multiplier)["trend"]
+        return BULLISH if trend[-1] == 1 else BEARISH
@@ -0,0 +1,189 @@
+""" Full-history order block / FVG zone index with mitigation tracking """
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+from columnar import CandleArray
+
+ORDER_BLOCK = "order_block"
+FVG = "fvg"
+BULLISH = "BULLISH"
+BEARISH = "BEARISH"
+
+
+class Zone(NamedTuple):
+    kind: str
+    bias: str
+    bottom: float
+    top: float
+    formed_at: int        # index of the bar that confirmed the zone
+    size: float           # displacement (order block) or relative gap size (FVG)
+    mitigated_at: int     # first bar that traded through the far edge, -1 while live
+
+    @property
+    def live(self) -> bool:
+        return self.mitigated_at < 0
+
+
+def _sparse_min(values: np.ndarray) -> List[np.ndarray]:
+    # table[k][i] = min(values[i : i + 2**k])
+    table = [values]
+    span = 1
+    while span * 2 <= len(values):
+        prev = table[-1]
+        table.append(np.minimum(prev[:-span], prev[span:]))
+        span *= 2
+    return table
+
+
+def _first_below(table: List[np.ndarray], start: np.ndarray, threshold: np.ndarray) -> np.ndarray:
+    """For every zone, first index >= start whose value is < threshold (binary lifting), -1 if none."""
+    n = len(table[0])
+    pos = start.astype(np.int64)
+    for level in range(len(table) - 1, -1, -1):
+        span = 1 << level
+        block = table[level]
+        fits = pos + span <= n
+        clean = block[np.minimum(pos, len(block) - 1)] >= threshold
+        pos = np.where(fits & clean, pos + span, pos)
+    return np.where(pos < n, pos, -1)
+
+
+class _Node:
+    __slots__ = ("center", "by_bottom", "by_top", "left", "right")
+
+
+def _build_tree(zones: List[Zone]) -> Optional[_Node]:
+    # Centered interval tree: stabbing queries in O(log n + k)
+    if not zones:
+        return None
+    mids = sorted((z.bottom + z.top) / 2 for z in zones)
+    node = _Node()
+    node.center = mids[len(mids) // 2]
+    here = [z for z in zones if z.bottom <= node.center <= z.top]
+    node.by_bottom = sorted(here, key=lambda z: z.bottom)
+    node.by_top = sorted(here, key=lambda z: z.top, reverse=True)
+    node.left = _build_tree([z for z in zones if z.top < node.center])
+    node.right = _build_tree([z for z in zones if z.bottom > node.center])
+    return node
+
+
+class ZoneIndex:
+    def __init__(self, zones: List[Zone]):
+        self.zones = zones
+        live = [z for z in zones if z.live]
+        self._tree = _build_tree(live)
+        # Per (kind, bias): live zones sorted by bottom and by top for nearest-edge lookups
+        self._by_bottom: Dict[Tuple[str, str], Tuple[List[float], List[Zone]]] = {}
+        self._by_top: Dict[Tuple[str, str], Tuple[List[float], List[Zone]]] = {}
+        for key in ((ORDER_BLOCK, BULLISH), (ORDER_BLOCK, BEARISH), (FVG, BULLISH), (FVG, BEARISH)):
+            group = [z for z in live if (z.kind, z.bias) == key]
+            group.sort(key=lambda z: z.bottom)
+            self._by_bottom[key] = ([z.bottom for z in group], group)
+            group = sorted(group, key=lambda z: z.top)
+            self._by_top[key] = ([z.top for z in group], group)
+
+    @classmethod
+    def build(
+        cls,
+        candles: CandleArray,
+        min_displacement: float = 0.01,
+        min_gap: float = 0.002
+    ) -> "ZoneIndex":
+        n = len(candles)
+        if n < 2:
+            return cls([])
+        o, h, l, c = candles.open, candles.high, candles.low, candles.close
+        kinds, biases, bottoms, tops, formed, sizes = [], [], [], [], [], []
+
+        def collect(kind, bias, mask, bottom, top, size, offset):
+            idx = np.flatnonzero(mask)
+            kinds.append(np.full(idx.size, kind, dtype=object))
+            biases.append(np.full(idx.size, bias, dtype=object))
+            bottoms.append(bottom[idx])
+            tops.append(top[idx])
+            formed.append(idx + offset)
+            sizes.append(size[idx])
+
+        # Order blocks: opposite candle at i, displacement candle at i + 1
+        up = (c[1:] - o[1:]) / o[1:]
+        down = (o[1:] - c[1:]) / o[1:]
+        collect(ORDER_BLOCK, BULLISH, (c[:-1] < o[:-1]) & (c[1:] > o[1:]) & (up > min_displacement),
+                l[:-1], h[:-1], up, 1)
+        collect(ORDER_BLOCK, BEARISH, (c[:-1] > o[:-1]) & (c[1:] < o[1:]) & (down > min_displacement),
+                l[:-1], h[:-1], down, 1)
+        # FVGs: gap between bar i - 2 and bar i
+        if n >= 3:
+            bull_gap = (l[2:] - h[:-2]) / h[:-2]
+            bear_gap = (l[:-2] - h[2:]) / l[:-2]
+            collect(FVG, BULLISH, (l[2:] > h[:-2]) & (bull_gap > min_gap), h[:-2], l[2:], bull_gap, 2)
+            collect(FVG, BEARISH, (h[2:] < l[:-2]) & (bear_gap > min_gap), h[2:], l[:-2], bear_gap, 2)
+
+        kinds, biases = np.concatenate(kinds), np.concatenate(biases)
+        bottoms, tops = np.concatenate(bottoms), np.concatenate(tops)
+        formed, sizes = np.concatenate(formed), np.concatenate(sizes)
+
+        # Bullish zones are mitigated by a low through the bottom, bearish by a high through the top
+        bullish = biases == BULLISH
+        mitigated = np.full(formed.size, -1, dtype=np.int64)
+        if bullish.any():
+            mitigated[bullish] = _first_below(_sparse_min(l), formed[bullish] + 1, bottoms[bullish])
+        if (~bullish).any():
+            mitigated[~bullish] = _first_below(_sparse_min(-h), formed[~bullish] + 1, -tops[~bullish])
+
+        order = np.argsort(formed, kind="stable")
+        zones = [
+            Zone(k, b, lo, hi, f, s, m)
+            for k, b, lo, hi, f, s, m in zip(
+                kinds[order].tolist(), biases[order].tolist(), bottoms[order].tolist(),
+                tops[order].tolist(), formed[order].tolist(), sizes[order].tolist(),
+                mitigated[order].tolist()
+            )
+        ]
+        return cls(zones)
+
+    def live(self) -> List[Zone]:
+        return [z for z in self.zones if z.live]
+
+    def containing(self, price: float, kind: Optional[str] = None, bias: Optional[str] = None) -> List[Zone]:
+        found = []
+        node = self._tree
+        while node is not None:
+            if price < node.center:
+                for z in node.by_bottom:
+                    if z.bottom > price:
+                        break
+                    found.append(z)
+                node = node.left
+            elif price > node.center:
+                for z in node.by_top:
+                    if z.top < price:
+                        break
+                    found.append(z)
+                node = node.right
+            else:
+                found.extend(node.by_bottom)
+                break
+        return [z for z in found if (kind is None or z.kind == kind) and (bias is None or z.bias == bias)]
+
+    def entry(self, price: float) -> Tuple[Optional[Zone], Optional[Zone]]:
+        """Most recent live order block containing price, plus the nearest live FVG in its direction."""
+        containing = self.containing(price, kind=ORDER_BLOCK)
+        if not containing:
+            return None, None
+        zone = max(containing, key=lambda z: z.formed_at)
+        if zone.bias == BULLISH:
+            return zone, self.nearest_above(price, FVG, zone.bias)
+        return zone, self.nearest_below(price, FVG, zone.bias)
+
+    def nearest_above(self, price: float, kind: str, bias: str) -> Optional[Zone]:
+        """Live zone with the lowest bottom strictly above price."""
+        bottoms, group = self._by_bottom[(kind, bias)]
+        i = bisect_right(bottoms, price)
+        return group[i] if i < len(group) else None
+
+    def nearest_below(self, price: float, kind: str, bias: str) -> Optional[Zone]:
+        """Live zone with the highest top strictly below price."""
+        tops, group = self._by_top[(kind, bias)]
+        i = bisect_left(tops, price)
+        return group[i - 1] if i > 0 else None